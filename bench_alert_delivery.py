@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""
+╔══════════════════════════════════════════════════════════════╗
+║     Alert Delivery Benchmark — local SMTP stand-in server    ║
+╚══════════════════════════════════════════════════════════════╝
+
+Runs a minimal SMTP server on localhost (no mail leaves the machine) that
+can add per-message latency and reject or drop a share of the messages,
+then pushes bursts of unknown-face alerts through EmailAlerter two ways:
+  - per-alert:  a fresh connection for every email and no digests
+                (what the old one-thread-per-alert sender did)
+  - pooled:     one reused connection, bursts folded into digests
+
+and reports, per mode: emails, SMTP connections, failed sends, alerts
+delivered, and the time until the outbox was empty.
+
+USAGE:
+  python bench_alert_delivery.py
+  python bench_alert_delivery.py --alerts 200 --burst 20 --latency-ms 50 --fail 0.2 --drop 0.05
+"""
+
+import argparse
+import random
+import socketserver
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from face_emotion_cv import EmailAlerter, SmtpTransport
+
+
+class StandInSMTP(socketserver.ThreadingTCPServer):
+    """Just enough SMTP for smtplib: EHLO/HELO, MAIL, RCPT, DATA, RSET, NOOP, QUIT."""
+    daemon_threads      = True
+    allow_reuse_address = True
+
+    def __init__(self, latency_ms: float, fail: float, drop: float, seed: int = 0):
+        super().__init__(("127.0.0.1", 0), _SMTPHandler)
+        self.latency_ms, self.fail, self.drop = latency_ms, fail, drop
+        self.rng      = random.Random(seed)
+        self.lock     = threading.Lock()
+        self.accepted = 0
+        self.images   = 0
+        self.sessions = 0
+
+
+class _SMTPHandler(socketserver.StreamRequestHandler):
+    def reply(self, line: str):
+        self.wfile.write(line.encode() + b"\r\n")
+
+    def handle(self):
+        srv = self.server
+        with srv.lock:
+            srv.sessions += 1
+        self.reply("220 stand-in ESMTP")
+        while line := self.rfile.readline():
+            cmd = line.decode(errors="replace").strip().upper()
+            if cmd.startswith(("EHLO", "HELO")):
+                self.reply("250 stand-in")
+            elif cmd.startswith(("MAIL", "RCPT", "RSET", "NOOP")):
+                self.reply("250 OK")
+            elif cmd == "DATA":
+                self.reply("354 End data with <CR><LF>.<CR><LF>")
+                images = 0
+                while (body := self.rfile.readline()) not in (b".\r\n", b""):
+                    images += body.lower().startswith(b"content-type: image/")
+                time.sleep(srv.latency_ms / 1000)
+                with srv.lock:
+                    roll = srv.rng.random()
+                if roll < srv.drop:
+                    return   # Connection lost mid-transaction
+                if roll < srv.drop + srv.fail:
+                    self.reply("451 Try again later")
+                    continue
+                with srv.lock:
+                    srv.accepted += 1
+                    srv.images   += images
+                self.reply("250 Queued")
+            elif cmd == "QUIT":
+                self.reply("221 Bye")
+                return
+            else:
+                self.reply("502 Not implemented")
+
+
+class PerAlertTransport(SmtpTransport):
+    """Connects, sends and disconnects for every email."""
+    def send(self, msg):
+        try:
+            super().send(msg)
+        finally:
+            self.close()
+
+
+def run(mode: str, args, snapshot: Path) -> dict:
+    server = StandInSMTP(args.latency_ms, args.fail, args.drop)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    host, port = server.server_address
+    cls        = PerAlertTransport if mode == "per-alert" else SmtpTransport
+    transport  = cls(host, port, user=None, use_ssl=False, timeout=5.0)
+    with tempfile.TemporaryDirectory() as outbox:
+        alerter = EmailAlerter(transport, Path(outbox), enabled=True,
+                               digest_secs=0.0 if mode == "per-alert" else args.digest_secs,
+                               digest_max=1 if mode == "per-alert" else 10, retry_secs=0.05)
+        t0 = time.perf_counter()
+        for i in range(args.alerts):
+            alerter.send_alert(i, snapshot, f"cam{i % 3}")
+            if (i + 1) % args.burst == 0:
+                time.sleep(args.gap_ms / 1000)
+        while alerter.report()["queue"] and time.perf_counter() - t0 < args.timeout:
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - t0
+        report  = alerter.report()
+        alerter.close(timeout=0)
+    server.shutdown()
+    server.server_close()
+    return {"elapsed": elapsed, "emails": report["emails"], "delivered": report["delivered"],
+            "failed": report["dropped"], "connects": server.sessions, "images": server.images}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--alerts",      type=int,   default=100,  help="alerts to deliver")
+    ap.add_argument("--burst",       type=int,   default=10,   help="alerts raised back to back")
+    ap.add_argument("--gap-ms",      type=float, default=200,  help="pause between bursts")
+    ap.add_argument("--latency-ms",  type=float, default=20,   help="server time per message")
+    ap.add_argument("--fail",        type=float, default=0.1,  help="share of messages answered 451")
+    ap.add_argument("--drop",        type=float, default=0.02, help="share of messages whose connection drops")
+    ap.add_argument("--digest-secs", type=float, default=0.5,  help="pooled mode: digest window")
+    ap.add_argument("--timeout",     type=float, default=120,  help="give up waiting for the outbox to empty")
+    args = ap.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        snapshot = Path(tmp) / "face.jpg"
+        cv2.imwrite(str(snapshot), np.random.default_rng(0).integers(0, 255, (160, 120, 3), np.uint8))
+        print(f" {args.alerts} alerts in bursts of {args.burst}, server {args.latency_ms:.0f}ms/msg, "
+              f"{args.fail:.0%} rejected, {args.drop:.0%} dropped\n")
+        print(f" {'mode':<10}{'emails':>8}{'conns':>7}{'failed':>8}{'delivered':>11}{'images':>8}{'seconds':>9}")
+        for mode in ("per-alert", "pooled"):
+            r = run(mode, args, snapshot)
+            print(f" {mode:<10}{r['emails']:>8}{r['connects']:>7}{r['failed']:>8}"
+                  f"{r['delivered']:>7}/{args.alerts:<3}{r['images']:>8}{r['elapsed']:>9.2f}")
+
+
+if __name__ == "__main__":
+    main()
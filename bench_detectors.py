@@ -0,0 +1,115 @@
+#!/usr/bin/env python3
+"""
+╔══════════════════════════════════════════════════════════════╗
+║        Face Detector Benchmark — pick a backend per box      ║
+╚══════════════════════════════════════════════════════════════╝
+
+Runs every detector backend over a folder of recorded frames (or a video)
+on this machine's CPU and reports, per backend:
+  - ms/frame (mean and p95)
+  - faces found
+  - agreement with a reference backend (precision / recall / F1 at IoU >= 0.5)
+
+DNN backends need their model files in models/ (see DETECTOR_* config in
+face_emotion_cv.py); backends that cannot load are skipped.
+
+USAGE:
+  python bench_detectors.py recorded_frames/
+  python bench_detectors.py entrance.mp4 --max 300 --scale 0.5 --reference yunet
+"""
+
+import argparse
+import time
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from face_emotion_cv import DETECTOR_BACKENDS, build_detector, iou_matrix, linear_assignment
+
+IMAGE_EXTS = {".jpg", ".jpeg", ".png", ".bmp"}
+
+
+def load_frames(source: str, limit: int, scale: float) -> list:
+    """RGB frames from an image folder or a video file."""
+    frames, path = [], Path(source)
+    if path.is_dir():
+        for f in sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTS)[:limit]:
+            img = cv2.imread(str(f))
+            if img is not None:
+                frames.append(img)
+    else:
+        cap = cv2.VideoCapture(source)
+        while len(frames) < limit:
+            ret, img = cap.read()
+            if not ret:
+                break
+            frames.append(img)
+        cap.release()
+    if scale != 1.0:
+        frames = [cv2.resize(f, (0, 0), fx=scale, fy=scale) for f in frames]
+    return [cv2.cvtColor(f, cv2.COLOR_BGR2RGB) for f in frames]
+
+
+def agreement(found: list, reference: list, thresh: float = 0.5) -> tuple[int, int, int]:
+    """(true positives, found, reference) with one-to-one IoU matching."""
+    if not found or not reference:
+        return 0, len(found), len(reference)
+    iou = iou_matrix(found, reference)
+    tp  = sum(1 for i, j in linear_assignment(1.0 - iou) if iou[i, j] >= thresh)
+    return tp, len(found), len(reference)
+
+
+def run_backend(detector, frames: list) -> tuple[list, list]:
+    detector.detect(frames[0])   # Warm-up (model load, first allocation)
+    times, boxes = [], []
+    for rgb in frames:
+        t0 = time.perf_counter()
+        boxes.append(detector.detect(rgb))
+        times.append((time.perf_counter() - t0) * 1000)
+    return times, boxes
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("source", help="folder of frames or a video file")
+    ap.add_argument("--backends",  nargs="+", default=sorted(DETECTOR_BACKENDS), choices=sorted(DETECTOR_BACKENDS))
+    ap.add_argument("--reference", default="hog", choices=sorted(DETECTOR_BACKENDS))
+    ap.add_argument("--max",   type=int,   default=500, help="frames to use")
+    ap.add_argument("--scale", type=float, default=1.0, help="resize frames before detection")
+    args = ap.parse_args()
+
+    frames = load_frames(args.source, args.max, args.scale)
+    if not frames:
+        print(f" No frames found in {args.source}")
+        return
+    h, w = frames[0].shape[:2]
+    print(f" {len(frames)} frame(s) at {w}x{h}   reference: {args.reference}\n")
+
+    results = {}
+    for name in dict.fromkeys([args.reference] + args.backends):
+        try:
+            detector = build_detector(name, fallback=None)
+        except Exception as e:
+            print(f" {name:<6} skipped: {e}")
+            continue
+        results[name] = run_backend(detector, frames)
+
+    ref = results.get(args.reference)
+    print(f"\n {'backend':<8}{'ms/frame':>10}{'p95 ms':>9}{'faces':>8}{'prec':>8}{'recall':>8}{'F1':>7}")
+    for name in args.backends:
+        if name not in results:
+            continue
+        times, boxes = results[name]
+        line = f" {name:<8}{np.mean(times):>10.1f}{np.percentile(times, 95):>9.1f}{sum(map(len, boxes)):>8}"
+        if ref is not None:
+            tp, found, expected = map(sum, zip(*(agreement(b, r) for b, r in zip(boxes, ref[1]))))
+            prec   = tp / found if found else 1.0
+            recall = tp / expected if expected else 1.0
+            f1     = 2 * prec * recall / (prec + recall) if prec + recall else 0.0
+            line  += f"{prec:>8.2f}{recall:>8.2f}{f1:>7.2f}"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+╔══════════════════════════════════════════════════════════════╗
+║     Emotion Stability Benchmark — fusion vs analysis rate    ║
+╚══════════════════════════════════════════════════════════════╝
+
+Tracks faces through recorded clips and runs the attribute models on every
+track in every frame once. It then replays those results as if each face had
+only been analysed every N frames, and compares three display strategies:
+  - last:      the latest analysis replaces the previous one (old behaviour)
+  - fused:     every analysis is folded in with fuse_attributes()
+  - adaptive:  fused, and settled tracks are analysed FUSION_STABLE_STRIDE x less
+
+For each analysis interval and strategy it reports:
+  - model calls per second of footage
+  - label flips per track-minute (lower = steadier)
+  - agreement with a reference label (majority of the dense per-frame labels
+    within +/- --window seconds)
+
+USAGE:
+  python bench_emotion_stability.py entrance.mp4
+  python bench_emotion_stability.py a.mp4 b.mp4 frames_dir/ --rates 1 5 15 30 --max 1500
+"""
+
+import argparse
+from collections import Counter
+from pathlib import Path
+
+import cv2
+import numpy as np
+
+from face_emotion_cv import (FUSION_STABLE_STRIDE, IMAGE_EXTS, BatchAttributeAnalyzer, FaceDatabase,
+                             FrameProcessor, build_detector, fuse_attributes, fusion_stable)
+
+
+def frames(source: str, limit: int, fps: float):
+    """Yields (seconds, BGR frame) from a video file or an image folder."""
+    path = Path(source)
+    if path.is_dir():
+        files = sorted(p for p in path.iterdir() if p.suffix.lower() in IMAGE_EXTS)[:limit]
+        for i, f in enumerate(files):
+            img = cv2.imread(str(f))
+            if img is not None:
+                yield i / fps, img
+        return
+    cap  = cv2.VideoCapture(source)
+    rate = cap.get(cv2.CAP_PROP_FPS) or fps
+    for i in range(limit):
+        ret, img = cap.read()
+        if not ret:
+            break
+        yield i / rate, img
+    cap.release()
+
+
+def dense_pass(source: str, args, db, detector, analyzer) -> dict:
+    """track id -> [(frame index, seconds, analysis)] with every frame analysed."""
+    proc, tracks_seen = FrameProcessor(db, detector), {}
+    for idx, (now, frame) in enumerate(frames(source, args.max, args.fps)):
+        tracks = proc.process(frame, now)
+        ids, crops = [], []
+        for t in tracks:
+            top, right, bottom, left = t.loc(now)
+            crop = frame[max(0,top-20):bottom+20, max(0,left-20):right+20]
+            if crop.size > 0:
+                ids.append(t.id)
+                crops.append(crop)
+        for tid, info in zip(ids, analyzer.analyze(crops)):
+            if info is not None:
+                tracks_seen.setdefault(tid, []).append((idx, now, info))
+    return tracks_seen
+
+
+def reference_labels(samples: list, window: float) -> list:
+    """Majority of the dense labels within +/- window seconds of each frame."""
+    times  = np.array([t for _, t, _ in samples])
+    labels = [info["emotion"] for _, _, info in samples]
+    out    = []
+    for t in times:
+        lo, hi = np.searchsorted(times, t - window), np.searchsorted(times, t + window, side="right")
+        out.append(Counter(labels[lo:hi]).most_common(1)[0][0])
+    return out
+
+
+def replay(samples: list, every: int, strategy: str) -> tuple[list, int]:
+    """Labels shown on each frame of one track, and how many analyses were used."""
+    shown, state, label, calls = [], None, None, 0
+    first = samples[0][0]
+    for idx, now, info in samples:
+        stride = every * (FUSION_STABLE_STRIDE if strategy == "adaptive" and state and fusion_stable(state) else 1)
+        if label is None or (idx - first) % stride == 0:
+            calls += 1
+            if strategy == "last":
+                label = info["emotion"]
+            else:
+                state = fuse_attributes(state, info, now)
+                label = state["emotion"]
+        shown.append(label)
+    return shown, calls
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("sources", nargs="+", help="video files or folders of frames")
+    ap.add_argument("--rates",    type=int, nargs="+", default=[1, 2, 5, 10, 15, 30],
+                    help="analysis intervals in frames")
+    ap.add_argument("--window",   type=float, default=1.0, help="reference label window, seconds")
+    ap.add_argument("--max",      type=int,   default=3000, help="frames per source")
+    ap.add_argument("--fps",      type=float, default=25.0, help="frame rate of image folders")
+    ap.add_argument("--detector", default="hog")
+    args = ap.parse_args()
+
+    db, detector, analyzer = FaceDatabase(), build_detector(args.detector), BatchAttributeAnalyzer()
+    tracks, duration = [], 0.0
+    for source in args.sources:
+        seen = dense_pass(source, args, db, detector, analyzer)
+        tracks += [s for s in seen.values() if len(s) > 1]
+        duration += max((s[-1][1] for s in seen.values()), default=0.0)
+        print(f" {source}: {len(seen)} track(s)")
+    if not tracks:
+        print(" No tracked faces found.")
+        return
+
+    refs         = [reference_labels(s, args.window) for s in tracks]
+    track_minutes = sum(s[-1][1] - s[0][1] for s in tracks) / 60 or 1e-9
+    print(f"\n {len(tracks)} track(s), {sum(map(len, tracks))} track-frames, {duration:.0f}s of footage\n")
+    print(f" {'every N':>8}  {'strategy':<9}{'calls/s':>9}{'flips/min':>11}{'agreement':>11}")
+    for every in args.rates:
+        for strategy in ("last", "fused", "adaptive"):
+            calls = flips = agree = total = 0
+            for samples, ref in zip(tracks, refs):
+                shown, n = replay(samples, every, strategy)
+                calls += n
+                flips += sum(a != b for a, b in zip(shown, shown[1:]))
+                agree += sum(a == b for a, b in zip(shown, ref))
+                total += len(shown)
+            print(f" {every:>8}  {strategy:<9}{calls / max(duration, 1e-9):>9.1f}"
+                  f"{flips / track_minutes:>11.1f}{agree / total:>11.1%}")
+
+
+if __name__ == "__main__":
+    main()
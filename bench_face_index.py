@@ -0,0 +1,88 @@
+#!/usr/bin/env python3
+"""
+╔══════════════════════════════════════════════════════════════╗
+║        Face Index Benchmark — recall / latency vs exact      ║
+╚══════════════════════════════════════════════════════════════╝
+
+Builds a synthetic gallery of dlib-like 128-d encodings (several photos per
+person) and compares each index backend against the exact scan:
+  - build time
+  - search latency per frame (a frame = a handful of probes)
+  - recall@1 and recall@k of the approximate results vs the exact ones
+
+USAGE:
+  python bench_face_index.py                        # 50k encodings
+  python bench_face_index.py --size 20000 --probes 8
+  python bench_face_index.py --gallery encodings.npy   # real (N, 128) gallery
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from face_emotion_cv import IVFIndex, make_index
+
+
+def synthetic_gallery(size: int, per_person: int, rng):
+    """People are spread ~1.1 apart; photos of one person ~0.4 apart, like dlib."""
+    people  = max(1, size // per_person)
+    centers = rng.normal(0, 0.07, (people, 128)).astype(np.float32)
+    owner   = np.repeat(np.arange(people), per_person)[:size]
+    return centers[owner] + rng.normal(0, 0.018, (len(owner), 128)).astype(np.float32), centers
+
+
+def time_search(index, probes, frame_size, k):
+    """Mean milliseconds per frame, plus all returned ids."""
+    ids, t0 = [], time.perf_counter()
+    for i in range(0, len(probes), frame_size):
+        ids.append(index.search(probes[i:i+frame_size], k)[1])
+    elapsed = time.perf_counter() - t0
+    frames  = -(-len(probes) // frame_size)
+    return elapsed * 1000 / frames, np.concatenate(ids)
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--size",       type=int, default=50_000, help="gallery size (synthetic)")
+    ap.add_argument("--per-person", type=int, default=5,      help="photos per person (synthetic)")
+    ap.add_argument("--gallery",    help="load an (N, 128) .npy gallery instead")
+    ap.add_argument("--probes",     type=int, default=2000,   help="number of probe encodings")
+    ap.add_argument("--frame",      type=int, default=4,      help="probes per frame")
+    ap.add_argument("-k",           type=int, default=5)
+    ap.add_argument("--nprobe",     type=int, nargs="+", default=[1, 4, 8, 16, 32])
+    args = ap.parse_args()
+
+    rng = np.random.default_rng(42)
+    if args.gallery:
+        gallery = np.load(args.gallery, mmap_mode="r").astype(np.float32)
+        pick    = rng.choice(len(gallery), args.probes)
+        probes  = gallery[pick] + rng.normal(0, 0.018, (args.probes, 128)).astype(np.float32)
+    else:
+        gallery, centers = synthetic_gallery(args.size, args.per_person, rng)
+        pick    = rng.choice(len(centers), args.probes)
+        probes  = centers[pick] + rng.normal(0, 0.018, (args.probes, 128)).astype(np.float32)
+    print(f" Gallery: {len(gallery):,} encodings   Probes: {len(probes):,} ({args.frame}/frame)   k={args.k}\n")
+
+    t0 = time.perf_counter()
+    exact = make_index("exact")
+    exact.build(gallery)
+    build_ms = (time.perf_counter() - t0) * 1000
+    exact_ms, truth = time_search(exact, probes, args.frame, args.k)
+    print(f" {'backend':<18}{'build ms':>10}{'ms/frame':>10}{'speedup':>9}{'R@1':>8}{'R@k':>8}")
+    print(f" {'exact':<18}{build_ms:>10.0f}{exact_ms:>10.2f}{1.0:>9.1f}{1.0:>8.3f}{1.0:>8.3f}")
+
+    ivf = IVFIndex(min_size=0)
+    t0  = time.perf_counter()
+    ivf.build(gallery)
+    build_ms = (time.perf_counter() - t0) * 1000
+    for nprobe in args.nprobe:
+        ivf.nprobe = nprobe
+        ms, found = time_search(ivf, probes, args.frame, args.k)
+        r1 = float(np.mean(found[:, 0] == truth[:, 0]))
+        rk = float(np.mean([len(set(f) & set(t)) / len(t) for f, t in zip(found, truth)]))
+        print(f" {f'ivf nprobe={nprobe}':<18}{build_ms:>10.0f}{ms:>10.2f}{exact_ms/ms:>9.1f}{r1:>8.3f}{rk:>8.3f}")
+
+
+if __name__ == "__main__":
+    main()
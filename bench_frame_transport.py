@@ -0,0 +1,117 @@
+#!/usr/bin/env python3
+"""
+╔══════════════════════════════════════════════════════════════╗
+║      Frame Transport Benchmark — shared memory vs pickling   ║
+╚══════════════════════════════════════════════════════════════╝
+
+Moves frames from a producer process to a consumer process two ways:
+  - queue:  each frame is pickled through a multiprocessing.Queue
+  - shm:    frames live in a FrameRing; only sequence numbers are queued
+
+and reports, per resolution, frames/s and CPU milliseconds per frame spent
+in each process. The producer fills every frame (as a decoder would) and the
+consumer reads a sparse grid of pixels, so the numbers are transport cost.
+
+USAGE:
+  python bench_frame_transport.py
+  python bench_frame_transport.py --frames 2000 --depth 4 --res 720p 1080p 4k
+"""
+
+import argparse
+import multiprocessing as mp
+import time
+
+import numpy as np
+
+from face_emotion_cv import FrameRing
+
+RESOLUTIONS = {"480p": (480, 640, 3), "720p": (720, 1280, 3), "1080p": (1080, 1920, 3), "4k": (2160, 3840, 3)}
+
+
+def _source(shape: tuple) -> np.ndarray:
+    return np.random.default_rng(0).integers(0, 255, shape, np.uint8)
+
+
+def queue_producer(q, shape, n, results):
+    src, cpu = _source(shape), time.process_time()
+    for i in range(n):
+        frame = src.copy()   # What a fresh cap.read() allocates and fills
+        frame[0, 0, 0] = i & 0xFF
+        q.put(frame)
+    q.put(None)
+    results.put(("producer", time.process_time() - cpu))
+
+
+def queue_consumer(q, results):
+    cpu, checksum = time.process_time(), 0
+    while (frame := q.get()) is not None:
+        checksum += int(frame[::32, ::32].sum())
+    results.put(("consumer", time.process_time() - cpu))
+
+
+def shm_producer(ring, q, shape, n, results):
+    src, cpu = _source(shape), time.process_time()
+    for i in range(n):
+        slot, view = ring.claim()
+        while slot is None:   # Every slot held by the consumer: wait for one
+            time.sleep(0.0002)
+            slot, view = ring.claim()
+        np.copyto(view, src)   # What cap.read(view) decodes in place
+        view[0, 0, 0] = i & 0xFF
+        q.put(ring.publish(slot, hold=True))
+    q.put(None)
+    results.put(("producer", time.process_time() - cpu))
+
+
+def shm_consumer(ring, q, results):
+    cpu, checksum = time.process_time(), 0
+    while (seq := q.get()) is not None:
+        checksum += int(ring.get(seq)[::32, ::32].sum())
+        ring.release(seq)
+    results.put(("consumer", time.process_time() - cpu))
+
+
+def run(transport: str, shape: tuple, n: int, depth: int) -> dict:
+    q, results = mp.Queue(depth), mp.Queue()
+    if transport == "queue":
+        ring  = None
+        procs = [mp.Process(target=queue_producer, args=(q, shape, n, results)),
+                 mp.Process(target=queue_consumer, args=(q, results))]
+    else:
+        ring  = FrameRing(shape, slots=depth + 2)
+        procs = [mp.Process(target=shm_producer, args=(ring, q, shape, n, results)),
+                 mp.Process(target=shm_consumer, args=(ring, q, results))]
+    t0 = time.perf_counter()
+    for p in procs:
+        p.start()
+    cpu = dict(results.get() for _ in procs)
+    for p in procs:
+        p.join()
+    elapsed = time.perf_counter() - t0
+    if ring is not None:
+        ring.close()
+    return {"fps": n / elapsed,
+            "producer_ms": cpu["producer"] * 1000 / n,
+            "consumer_ms": cpu["consumer"] * 1000 / n}
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--frames", type=int, default=1000, help="frames per run")
+    ap.add_argument("--depth",  type=int, default=4,    help="frames in flight (queue size)")
+    ap.add_argument("--res",    nargs="+", default=["720p", "1080p"], choices=sorted(RESOLUTIONS))
+    args = ap.parse_args()
+
+    print(f" {args.frames} frames per run, {args.depth} in flight\n")
+    print(f" {'res':<7}{'transport':<11}{'frames/s':>10}{'prod CPU ms':>13}{'cons CPU ms':>13}{'speedup':>9}")
+    for res in args.res:
+        base = None
+        for transport in ("queue", "shm"):
+            r    = run(transport, RESOLUTIONS[res], args.frames, args.depth)
+            base = base or r["fps"]
+            print(f" {res:<7}{transport:<11}{r['fps']:>10.0f}{r['producer_ms']:>13.2f}"
+                  f"{r['consumer_ms']:>13.2f}{r['fps']/base:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,137 @@
+#!/usr/bin/env python3
+"""
+╔══════════════════════════════════════════════════════════════╗
+║       Overlay Benchmark — full-frame blends vs sprites       ║
+╚══════════════════════════════════════════════════════════════╝
+
+Draws the live overlay (face boxes, name banners, emotion bars, age/gender,
+HUD panel and hint bar) onto a frame with no detection or models involved,
+two ways:
+  - legacy:  every translucent box copies and blends the whole frame and every
+             string is rasterised twice per frame (the old _render code)
+  - sprites: OverlayRenderer — ROI-only blends, cached label sprites and one
+             polylines call per colour
+
+and reports ms per frame (mean and p95) for each face count, with the share
+of sprite lookups served from the cache. Face positions jitter a few pixels
+between frames and confidences and emotion scores drift, like a live feed.
+
+USAGE:
+  python bench_overlay.py
+  python bench_overlay.py --faces 1 5 20 --frames 500 --size 1920x1080
+"""
+
+import argparse
+import time
+
+import cv2
+import numpy as np
+
+from face_emotion_cv import (EMOTION_COLORS, OverlayRenderer, draw_emotion_bar, draw_rounded_rect,
+                             text)
+
+HINT = "[R] Register  [S] Screenshot  [A] Attendance  [E] Emotion  [G] Age/Gender  [P] Pipeline  [Q] Quit"
+
+
+def legacy_filled_rect(img, x1, y1, x2, y2, color, alpha=0.6):
+    overlay = img.copy()
+    cv2.rectangle(overlay, (x1,y1), (x2,y2), color, -1)
+    cv2.addWeighted(overlay, alpha, img, 1-alpha, 0, img)
+
+
+def legacy_draw(frame, faces: list, hud: list):
+    for f in faces:
+        top, right, bottom, left = f["loc"]
+        name, color = f["name"], EMOTION_COLORS.get(f["emotion"], (180,180,180))
+        draw_rounded_rect(frame, left, top, right, bottom, color, 2)
+        for ax, ay, dx, dy in [(left,top,1,1),(right,top,-1,1),(left,bottom,1,-1),(right,bottom,-1,-1)]:
+            cv2.line(frame, (ax,ay), (ax+dx*20, ay),    color, 3)
+            cv2.line(frame, (ax,ay), (ax, ay+dy*20),    color, 3)
+        by = max(0, top-32)
+        label = f"{name}  {f['conf']*100:.0f}%" if name != "Unknown" else "⚠ Unknown"
+        (tw,th),_ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+        legacy_filled_rect(frame, left, by, left+tw+12, by+th+10, color if name != "Unknown" else (30,30,200), 0.75)
+        text(frame, label, (left+6, by+th+2), scale=0.6, color=(255,255,255))
+        for ei, (emo, sc) in enumerate(sorted(f["emotion_scores"].items(), key=lambda x:-x[1])[:5]):
+            draw_emotion_bar(frame, right+10, top+ei*18, emo, sc/100)
+        gy = top + 5*18 + 8
+        text(frame, f"Age: {f['age']}",    (right+10, gy),    scale=0.5)
+        text(frame, f"Sex: {f['gender']}", (right+10, gy+18), scale=0.5)
+    legacy_filled_rect(frame, 8, 8, 165, 8+len(hud)*22, (20,20,20), 0.65)
+    for i, (line, color) in enumerate(hud):
+        text(frame, line, (14, 26+i*22), scale=0.52, color=color)
+    h, w = frame.shape[:2]
+    legacy_filled_rect(frame, 0, h-28, w, h, (10,10,10), 0.7)
+    text(frame, HINT, (10, h-10), scale=0.42, color=(160,160,160))
+
+
+def sprite_draw(renderer, frame, faces: list, hud: list):
+    renderer.draw_faces(frame, faces)
+    renderer.draw_hud(frame, hud, 165)
+    renderer.draw_hint(frame, HINT)
+
+
+def make_faces(n: int, w: int, h: int, rng) -> list:
+    """n faces on a grid leaving room for the side panel; jitter() moves them about their base."""
+    cols  = max(1, int(np.ceil(np.sqrt(n))))
+    cell  = (w // cols, (h - 60) // -(-n // cols))
+    faces = []
+    for i in range(n):
+        x, y  = (i % cols) * cell[0] + 10, (i // cols) * cell[1] + 40
+        side  = max(40, min(cell[0] - 220, cell[1] - 60, 160))
+        emos  = list(EMOTION_COLORS)
+        raw   = rng.dirichlet(np.ones(len(emos))) * 100
+        faces.append({"base": (y, x + side, y + side, x), "name": "Unknown" if i % 4 == 3 else f"person{i}",
+                      "conf": 0.8, "emotion": emos[int(np.argmax(raw))],
+                      "emotion_scores": {e: float(s) for e, s in zip(emos, raw)},
+                      "age": str(20 + i), "gender": "Man" if i % 2 else "Woman"})
+    return faces
+
+
+def jitter(faces: list, rng) -> list:
+    out = []
+    for f in faces:
+        dy, dx = rng.integers(-2, 3, 2)
+        top, right, bottom, left = f["base"]
+        scores = {e: float(round(max(0.0, s + rng.normal(0, 2)))) for e, s in f["emotion_scores"].items()}
+        out.append(dict(f, loc=(int(top+dy), int(right+dx), int(bottom+dy), int(left+dx)),
+                        conf=float(np.clip(f["conf"] + rng.normal(0, 0.02), 0.5, 0.99)),
+                        emotion=max(scores, key=scores.get), emotion_scores=scores))
+    return out
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--faces",  type=int, nargs="+", default=[1, 5, 20])
+    ap.add_argument("--frames", type=int, default=300, help="frames per run")
+    ap.add_argument("--size",   default="1280x720", help="frame size WxH")
+    args = ap.parse_args()
+
+    w, h = map(int, args.size.split("x"))
+    rng  = np.random.default_rng(0)
+    base = rng.integers(0, 255, (h, w, 3), np.uint8)
+    hud  = [("FPS: 24.8", (180,180,180)), ("Faces: 5", (180,180,180)), ("Known: 12", (180,180,180)),
+            ("Log: ON", (0,230,120)), ("Email: OFF", (180,180,180))]
+    print(f" {args.frames} frames at {w}x{h}\n")
+    print(f" {'faces':>5}  {'renderer':<9}{'ms/frame':>10}{'p95 ms':>9}{'speedup':>9}{'hits':>7}")
+    for n in args.faces:
+        faces = make_faces(n, w, h, rng)
+        runs  = {}
+        for name in ("legacy", "sprites"):
+            renderer, times = OverlayRenderer(), []
+            for _ in range(args.frames):
+                frame, shown = base.copy(), jitter(faces, rng)
+                t0 = time.perf_counter()
+                if name == "legacy":
+                    legacy_draw(frame, shown, hud)
+                else:
+                    sprite_draw(renderer, frame, shown, hud)
+                times.append((time.perf_counter() - t0) * 1000)
+            runs[name] = np.mean(times)
+            hits = f"{renderer.report()['hit_pct']:.0f}%" if name == "sprites" else "-"
+            print(f" {n:>5}  {name:<9}{runs[name]:>10.2f}{np.percentile(times, 95):>9.2f}"
+                  f"{runs['legacy'] / runs[name]:>9.1f}{hits:>7}")
+
+
+if __name__ == "__main__":
+    main()
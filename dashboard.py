@@ -13,17 +13,268 @@ USAGE:
   3. Open browser:         http://localhost:5000
 """
 
-from flask import Flask, render_template_string, jsonify, send_from_directory
+from flask import Flask, Response, render_template_string, jsonify, request, send_from_directory
+from multiprocessing import resource_tracker, shared_memory
+from datetime import datetime
 from pathlib import Path
-import json, os
+import csv, io, json, queue, sqlite3, struct, threading, time
 
 app = Flask(__name__)
 
-LIVE_DATA_FILE    = Path("live_data.json")
-ATTENDANCE_FILE   = Path("attendance_log.csv")
+LIVE_STATS_NAME   = "facecv_live"   # Shared-memory block published by face_emotion_cv.py
+METRICS_NAME      = "facecv_metrics"   # Prometheus text published by face_emotion_cv.py
+
+STREAM_POLL_SECS  = 0.25   # How often the single producer checks for new stats / rows
+STREAM_KEEPALIVE  = 15     # Seconds between comments that keep idle connections open
+SUBSCRIBER_QUEUE  = 64     # Events buffered per client before it is dropped to resync
+
+PAGE_SIZE         = 100    # Attendance rows per page by default
+PAGE_SIZE_MAX     = 1000
+
+# Must match the rollup settings in face_emotion_cv.py
+ROLLUP_RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+ROLLUP_RETENTION   = {"minute": 2 * 86400, "hour": 90 * 86400, "day": None}
+ROLLUP_MAX_BUCKETS = 500   # Longest series one request may return
+EVENTS_DB         = Path("events.db")   # Written by face_emotion_cv.py
 SCREENSHOTS_DIR   = Path("screenshots")
 UNKNOWN_FACES_DIR = Path("unknown_faces")
 
+# ── Live stats reader ─────────────────────────────────────────────────────────
+def read_live_stats(name: str = LIVE_STATS_NAME, retries: int = 50) -> dict | None:
+    """Latest snapshot from the CV app's seqlock block, or None if it is not running."""
+    return read_live_snapshot(name, retries)[1]
+
+def read_live_snapshot(name: str = LIVE_STATS_NAME, retries: int = 50) -> tuple[int, dict | None]:
+    """(seq, snapshot) from the CV app's seqlock block; (0, None) if it is not running."""
+    seq, payload = read_block(name, retries)
+    return seq, None if payload is None else json.loads(payload)
+
+def read_block(name: str, retries: int = 50) -> tuple[int, bytes | None]:
+    """(seq, raw payload) of one of the CV app's seqlock blocks; (0, None) if it is not running.
+
+    The payload is kept only if the sequence number was even and unchanged
+    across the copy, so a snapshot is never read half-written.
+    """
+    try:
+        shm = shared_memory.SharedMemory(name=name)
+    except FileNotFoundError:
+        return 0, None
+    # Attaching registers the block with this process's resource tracker,
+    # which would unlink it when the dashboard exits; the CV app owns it.
+    resource_tracker.unregister(shm._name, "shared_memory")
+    try:
+        buf = shm.buf
+        for _ in range(retries):
+            seq, length = struct.unpack_from("<QQ", buf, 0)
+            if seq == 0:
+                return 0, None   # Nothing published yet
+            if seq % 2:
+                time.sleep(0.0005)   # Writer mid-update
+                continue
+            payload = bytes(buf[16:16 + length])
+            if struct.unpack_from("<Q", buf, 0)[0] == seq:
+                return seq, payload
+        return 0, None
+    finally:
+        del buf
+        shm.close()
+
+# ── Event store reader ────────────────────────────────────────────────────────
+_local = threading.local()
+
+def db() -> sqlite3.Connection | None:
+    """Read-only connection to the CV app's SQLite store, one per server thread."""
+    conn = getattr(_local, "conn", None)
+    if conn is None:
+        if not EVENTS_DB.exists():
+            return None
+        conn = sqlite3.connect(f"file:{EVENTS_DB}?mode=ro", uri=True)
+        conn.row_factory = sqlite3.Row
+        _local.conn = conn
+    return conn
+
+ATTENDANCE_COLUMNS = ("id, name AS Name, date AS Date, time AS Time, emotion AS Emotion, "
+                      "age AS Age, gender AS Gender, camera AS Camera")
+
+def query_attendance(limit: int = PAGE_SIZE, before: int | None = None, since: int | None = None,
+                     name: str | None = None, date: str | None = None, camera: str | None = None) -> dict:
+    """One page of attendance rows.
+
+    Default: newest first, continuing below ``before`` (the previous page's
+    next_cursor). With ``since``: rows added after that id, oldest first,
+    for incremental fetches. Every filter is served by an index.
+    """
+    conn = db()
+    if conn is None:
+        return {"rows": [], "next_cursor": None, "last_id": -1}
+    where, params = [], []
+    for clause, value in (("name = ? COLLATE NOCASE", name), ("date = ?", date), ("camera = ?", camera)):
+        if value:
+            where.append(clause)
+            params.append(value)
+    if since is not None:
+        where.append("id > ?")
+        params.append(since)
+        order = "ASC"
+    else:
+        if before is not None:
+            where.append("id < ?")
+            params.append(before)
+        order = "DESC"
+    sql  = f"SELECT {ATTENDANCE_COLUMNS} FROM attendance"
+    sql += f" WHERE {' AND '.join(where)}" if where else ""
+    rows = [dict(r) for r in conn.execute(f"{sql} ORDER BY id {order} LIMIT ?", (*params, limit + 1))]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    last = conn.execute("SELECT MAX(id) FROM attendance").fetchone()[0]
+    return {"rows": rows, "next_cursor": rows[-1]["id"] if more else None,
+            "last_id": last if last is not None else -1}
+
+def _timestamp(value: str | None) -> float | None:
+    """Epoch seconds from a number or an ISO date/datetime."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+def query_events(limit: int = PAGE_SIZE, before: str | None = None, start: float | None = None,
+                 end: float | None = None, kind: str | None = None, name: str | None = None,
+                 camera: str | None = None) -> dict:
+    """Recognition / unknown sightings in [start, end), newest first.
+
+    ``before`` is the previous page's next_cursor, "<ts>,<id>": pages are
+    keyed on (ts, id) so rows sharing a timestamp are never skipped at a
+    page boundary. Raises ValueError for a malformed cursor.
+    """
+    conn = db()
+    if conn is None:
+        return {"rows": [], "next_cursor": None}
+    where, params = [], []
+    for clause, value in (("kind = ?", kind), ("name = ? COLLATE NOCASE", name), ("camera = ?", camera),
+                          ("ts >= ?", start), ("ts < ?", end)):
+        if value is not None and value != "":
+            where.append(clause)
+            params.append(value)
+    if before:
+        ts, row_id = before.split(",")
+        where.append("(ts, id) < (?, ?)")
+        params += [float(ts), int(row_id)]
+    sql  = "SELECT id, ts, kind, name, camera, track, conf, emotion, age, gender FROM events"
+    sql += f" WHERE {' AND '.join(where)}" if where else ""
+    rows = [dict(r) for r in conn.execute(f"{sql} ORDER BY ts DESC, id DESC LIMIT ?", (*params, limit + 1))]
+    more = len(rows) > limit
+    rows = rows[:limit]
+    return {"rows": rows, "next_cursor": f"{rows[-1]['ts']!r},{rows[-1]['id']}" if more else None}
+
+def query_emotions(start: float, end: float, camera: str = "*", person: str = "*",
+                   res: str | None = None) -> dict:
+    """Emotion dwell seconds per bucket over [start, end) from the rollups.
+
+    Without ``res`` the finest resolution that is still retained and fits in
+    ROLLUP_MAX_BUCKETS is used, so the rows read are bounded whatever the range.
+    """
+    if res is None:
+        now = time.time()
+        res = next((r for r, width in ROLLUP_RESOLUTIONS.items()
+                    if (end - start) / width <= ROLLUP_MAX_BUCKETS
+                    and (ROLLUP_RETENTION[r] is None or start >= now - ROLLUP_RETENTION[r])), "day")
+    width = ROLLUP_RESOLUTIONS[res]
+    if (end - start) / width > ROLLUP_MAX_BUCKETS:
+        raise ValueError(f"range too long for res={res}")
+    series, totals = {}, {}
+    conn = db()
+    if conn is not None:
+        rows = conn.execute(
+            "SELECT bucket, emotion, seconds FROM emotion_rollup WHERE res = ? AND camera = ? AND person = ? "
+            "AND bucket >= ? AND bucket < ? ORDER BY bucket",
+            (res, camera, person, int(start // width * width), end))
+        for bucket, emotion, secs in rows:
+            series.setdefault(bucket, {})[emotion] = round(secs, 1)
+            totals[emotion] = round(totals.get(emotion, 0.0) + secs, 1)
+    return {"res": res, "camera": camera, "person": person, "totals": totals,
+            "buckets": [{"t": t, "emotions": e} for t, e in series.items()]}
+
+# ── Push stream ───────────────────────────────────────────────────────────────
+class Broadcaster:
+    """One producer thread feeding every open /api/stream connection.
+
+    The producer reads the live stats block and polls the event store for
+    attendance rows above the last id it sent, so the cost is the same for
+    one client or fifty. Each client gets a bounded queue; a client that falls that far
+    behind is disconnected and its browser reconnects and resyncs.
+    """
+    def __init__(self):
+        self.clients: set = set()
+        self.lock         = threading.Lock()
+        self.wake         = threading.Event()
+        self.last_live    = None
+        self.live_seq     = 0
+        self.last_id      = None   # Attendance row id up to which rows were sent
+        self.thread       = None
+
+    def subscribe(self) -> queue.Queue:
+        q = queue.Queue(SUBSCRIBER_QUEUE)
+        with self.lock:
+            if self.last_live is not None:
+                q.put(("live", self.last_live))   # Something to show before the next change
+            self.clients.add(q)
+            if self.thread is None:
+                self.thread = threading.Thread(target=self._run, daemon=True)
+                self.thread.start()
+        self.wake.set()
+        return q
+
+    def unsubscribe(self, q: queue.Queue):
+        with self.lock:
+            self.clients.discard(q)
+
+    def publish(self, event: str, data):
+        with self.lock:
+            if event == "live":
+                self.last_live = data
+            clients = list(self.clients)
+        for q in clients:
+            try:
+                q.put_nowait((event, data))
+            except queue.Full:
+                self.unsubscribe(q)
+                while not q.empty():
+                    q.get_nowait()
+                q.put_nowait(("close", None))   # Stream generator ends; the client reconnects
+
+    def _run(self):
+        while True:
+            self.wake.clear()   # Before the check, so a subscribe() right after it still wakes us
+            with self.lock:
+                idle = not self.clients
+            if idle:
+                self.wake.wait()
+                continue
+            seq, data = read_live_snapshot()
+            if seq and seq != self.live_seq:
+                self.live_seq = seq
+                self.publish("live", data)
+            rows = self._new_attendance()
+            if rows:
+                self.publish("attendance", rows)
+            time.sleep(STREAM_POLL_SECS)
+
+    def _new_attendance(self) -> list:
+        """Attendance rows stored since the last call."""
+        if db() is None:
+            return []
+        if self.last_id is None:   # Only rows logged after the stream started
+            self.last_id = query_attendance(limit=1)["last_id"]
+            return []
+        rows = query_attendance(limit=PAGE_SIZE_MAX, since=self.last_id)["rows"]
+        if rows:
+            self.last_id = rows[-1]["id"]
+        return rows
+
+broadcaster = Broadcaster()
+
 # ── HTML Template ─────────────────────────────────────────────────────────────
 HTML = """
 <!DOCTYPE html>
@@ -297,6 +548,21 @@ HTML = """
   /* Attendance table */
   .table-wrap { overflow-x: auto; }
 
+  .filters { display: flex; gap: 8px; margin-bottom: 16px; }
+
+  .filters input, .more, .export {
+    background: var(--bg);
+    border: 1px solid var(--border);
+    border-radius: 6px;
+    color: var(--text);
+    font-family: var(--font-mono);
+    font-size: 0.72rem;
+    padding: 6px 10px;
+  }
+
+  .more { display: none; margin: 16px auto 0; cursor: pointer; }
+  .export { margin-left: auto; text-decoration: none; }
+
   table {
     width: 100%;
     border-collapse: collapse;
@@ -420,24 +686,30 @@ HTML = """
 
     <div class="panel full">
       <div class="panel-title">Attendance Log</div>
+      <div class="filters">
+        <input id="filter-name" placeholder="Name" onchange="loadAttendance()">
+        <input id="filter-date" type="date" onchange="loadAttendance()">
+        <a class="export" href="/api/attendance.csv">Export CSV</a>
+      </div>
       <div class="table-wrap">
         <table>
           <thead>
             <tr>
               <th>Name</th><th>Date</th><th>Time</th>
-              <th>Emotion</th><th>Age</th><th>Gender</th>
+              <th>Emotion</th><th>Age</th><th>Gender</th><th>Camera</th>
             </tr>
           </thead>
           <tbody id="attendance-body">
-            <tr><td colspan="6" class="empty">No attendance records yet…</td></tr>
+            <tr><td colspan="7" class="empty">No attendance records yet…</td></tr>
           </tbody>
         </table>
       </div>
+      <button id="load-older" class="more" onclick="loadOlder()">Load older</button>
     </div>
 
   </div>
 
-  <footer>FaceCV Dashboard — Auto-refreshes every 2 seconds — Open-source Computer Vision Project</footer>
+  <footer>FaceCV Dashboard — Live updates pushed as they happen — Open-source Computer Vision Project</footer>
 </div>
 
 <script>
@@ -446,11 +718,7 @@ const EMOTION_COLORS = {
   fear:'#c084fc', surprise:'#3d9eff', disgust:'#4ade80', neutral:'#aaaaaa'
 };
 
-async function refresh() {
-  try {
-    const res  = await fetch('/api/live');
-    const data = await res.json();
-
+function renderLive(data) {
     // Status
     document.getElementById('status-dot').classList.add('live');
     document.getElementById('status-text').textContent = 'Live';
@@ -468,7 +736,7 @@ async function refresh() {
     document.getElementById('last-updated').textContent  = lu.toLocaleTimeString();
 
     // Emotion bars
-    const counts = data.emotion_counts;
+    const counts = data.emotion_seconds;   // Time on screen, not frames
     const total  = Object.values(counts).reduce((a,b) => a+b, 0) || 1;
     const sorted = Object.entries(counts).sort((a,b) => b[1]-a[1]);
     const barsEl = document.getElementById('emotion-bars');
@@ -499,19 +767,15 @@ async function refresh() {
           <div class="log-age">${e.age} / ${e.gender ? e.gender[0] : '?'}</div>
         </div>`).join('');
     }
+}
 
-  } catch(e) {
-    document.getElementById('status-dot').classList.remove('live');
-    document.getElementById('status-text').textContent = 'Disconnected';
-  }
+function setDisconnected() {
+  document.getElementById('status-dot').classList.remove('live');
+  document.getElementById('status-text').textContent = 'Disconnected';
+}
 
-  // Attendance
-  try {
-    const res2 = await fetch('/api/attendance');
-    const rows = await res2.json();
-    const tbody = document.getElementById('attendance-body');
-    if (rows.length > 0) {
-      tbody.innerHTML = rows.reverse().map(r => `
+function attendanceRow(r) {
+  return `
         <tr>
           <td style="color:var(--accent); font-weight:600">${r.Name || '—'}</td>
           <td>${r.Date || '—'}</td>
@@ -519,13 +783,98 @@ async function refresh() {
           <td><span class="badge ${r.Emotion}">${r.Emotion || '—'}</span></td>
           <td>${r.Age || '—'}</td>
           <td>${r.Gender || '—'}</td>
-        </tr>`).join('');
-    }
+          <td>${r.Camera || '—'}</td>
+        </tr>`;
+}
+
+let attendanceLastId = -1;     // Newest row id the table has caught up to
+let attendanceCursor = null;   // Where the next "Load older" page starts
+
+function attendanceUrl(extra) {
+  const params = new URLSearchParams(extra);
+  const name = document.getElementById('filter-name').value.trim();
+  const date = document.getElementById('filter-date').value;
+  if (name) params.set('name', name);
+  if (date) params.set('date', date);
+  return '/api/attendance?' + params;
+}
+
+function filtersActive() {
+  return document.getElementById('filter-name').value.trim() !== '' ||
+         document.getElementById('filter-date').value !== '';
+}
+
+function setCursor(cursor) {
+  attendanceCursor = cursor;
+  document.getElementById('load-older').style.display = cursor === null ? 'none' : 'block';
+}
+
+// First page, newest first
+async function loadAttendance() {
+  try {
+    const page  = await (await fetch(attendanceUrl({}))).json();
+    const tbody = document.getElementById('attendance-body');
+    tbody.innerHTML = page.rows.length
+      ? page.rows.map(attendanceRow).join('')
+      : '<tr><td colspan="7" class="empty">No attendance records yet…</td></tr>';
+    attendanceLastId = page.last_id;
+    setCursor(page.next_cursor);
   } catch(e) {}
 }
 
-refresh();
-setInterval(refresh, 2000);
+async function loadOlder() {
+  if (attendanceCursor === null) return;
+  const page = await (await fetch(attendanceUrl({before: attendanceCursor}))).json();
+  document.getElementById('attendance-body')
+    .insertAdjacentHTML('beforeend', page.rows.map(attendanceRow).join(''));
+  setCursor(page.next_cursor);
+}
+
+// Rows logged since the table was last current (e.g. while reconnecting)
+async function catchUp() {
+  const page = await (await fetch(attendanceUrl({since: attendanceLastId}))).json();
+  if (page.next_cursor !== null) return loadAttendance();   // Too far behind: reload
+  prependRows(page.rows);
+  attendanceLastId = page.last_id;
+}
+
+function prependRows(rows) {
+  if (rows.length === 0) return;
+  const tbody = document.getElementById('attendance-body');
+  if (tbody.querySelector('td[colspan]') !== null) tbody.innerHTML = '';
+  tbody.insertAdjacentHTML('afterbegin', rows.slice().reverse().map(attendanceRow).join(''));
+}
+
+function onPushedRows(rows) {
+  if (filtersActive()) return catchUp();   // Let the server apply the filters
+  rows = rows.filter(r => r.id > attendanceLastId);   // Already fetched by catchUp()
+  if (rows.length === 0) return;
+  prependRows(rows);
+  attendanceLastId = Math.max(attendanceLastId, rows[rows.length - 1].id);
+}
+
+async function poll() {
+  try {
+    const res  = await fetch('/api/live');
+    const data = await res.json();
+    if (data.error) throw new Error(data.error);
+    renderLive(data);
+  } catch(e) { setDisconnected(); }
+  attendanceLastId < 0 ? loadAttendance() : catchUp();
+}
+
+if (window.EventSource) {
+  // One server push stream; the browser reconnects on its own after a drop,
+  // and the attendance table catches up then so no rows are missed.
+  const stream = new EventSource('/api/stream');
+  stream.addEventListener('live', e => renderLive(JSON.parse(e.data)));
+  stream.addEventListener('attendance', e => onPushedRows(JSON.parse(e.data)));
+  stream.onopen  = () => attendanceLastId < 0 ? loadAttendance() : catchUp();
+  stream.onerror = setDisconnected;
+} else {
+  poll();
+  setInterval(poll, 2000);
+}
 </script>
 </body>
 </html>
@@ -538,21 +887,111 @@ def index():
 
 @app.route("/api/live")
 def api_live():
-    if LIVE_DATA_FILE.exists():
-        with open(LIVE_DATA_FILE) as f:
-            return jsonify(json.load(f))
+    data = read_live_stats()
+    if data is not None:
+        return jsonify(data)
     return jsonify({"error": "No data yet — is face_emotion_cv.py running?"})
 
+@app.route("/api/stream")
+def api_stream():
+    """Server-Sent Events: `live` snapshots and new `attendance` rows."""
+    def events():
+        q = broadcaster.subscribe()
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                try:
+                    event, data = q.get(timeout=STREAM_KEEPALIVE)
+                except queue.Empty:
+                    yield ": keepalive\n\n"
+                    continue
+                if event == "close":
+                    return
+                yield f"event: {event}\ndata: {json.dumps(data)}\n\n"
+        finally:
+            broadcaster.unsubscribe(q)
+    return Response(events(), mimetype="text/event-stream",
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus text: the CV app's timers, counters and gauges, plus this server's stream clients."""
+    payload = read_block(METRICS_NAME)[1]
+    if payload is None:
+        return Response("# face_emotion_cv.py is not running\n", status=503, mimetype="text/plain")
+    with broadcaster.lock:
+        clients = len(broadcaster.clients)
+    own = ("# HELP facecv_dashboard_stream_clients Open /api/stream connections\n"
+           "# TYPE facecv_dashboard_stream_clients gauge\n"
+           f"facecv_dashboard_stream_clients {clients}\n")
+    return Response(payload.decode() + own, mimetype="text/plain; version=0.0.4")
+
 @app.route("/api/attendance")
 def api_attendance():
-    if not ATTENDANCE_FILE.exists():
-        return jsonify([])
-    import csv as csv_mod
-    rows = []
-    with open(ATTENDANCE_FILE) as f:
-        reader = csv_mod.DictReader(f)
-        rows = list(reader)
-    return jsonify(rows)
+    """?limit=&before=<cursor> pages newest first; ?since=<id> fetches newer rows.
+    Both accept name= and date=YYYY-MM-DD filters."""
+    args  = request.args
+    limit = min(max(args.get("limit", PAGE_SIZE, type=int), 1), PAGE_SIZE_MAX)
+    return jsonify(query_attendance(limit=limit, before=args.get("before", type=int),
+                                    since=args.get("since", type=int), name=args.get("name"),
+                                    date=args.get("date"), camera=args.get("camera")))
+
+@app.route("/api/attendance.csv")
+def api_attendance_csv():
+    """The whole attendance table as CSV, streamed."""
+    def rows():
+        conn = db()
+        buf  = io.StringIO()
+        out  = csv.writer(buf)
+        out.writerow(["Name", "Date", "Time", "Emotion", "Age", "Gender", "Camera"])
+        if conn is not None:
+            cur = conn.execute("SELECT name, date, time, emotion, age, gender, camera FROM attendance ORDER BY id")
+            while batch := cur.fetchmany(5000):
+                out.writerows(batch)
+                yield buf.getvalue()
+                buf.seek(0)
+                buf.truncate()
+        yield buf.getvalue()
+    return Response(rows(), mimetype="text/csv",
+                    headers={"Content-Disposition": "attachment; filename=attendance_log.csv"})
+
+@app.route("/api/emotions")
+def api_emotions():
+    """Emotion mix over time: ?from=&to= (ISO or epoch; default last 24 h),
+    camera= and person= (default all), res=minute|hour|day (default auto).
+
+    Buckets are aligned to the epoch: "t" is a UTC boundary, so day buckets
+    run from UTC midnight to UTC midnight, not local midnight."""
+    args = request.args
+    res  = args.get("res")
+    if res is not None and res not in ROLLUP_RESOLUTIONS:
+        return jsonify({"error": f"res must be one of {', '.join(ROLLUP_RESOLUTIONS)}"}), 400
+    try:
+        end   = _timestamp(args.get("to"))
+        start = _timestamp(args.get("from"))
+        if end is None:   # Not "or": epoch 0 is a valid bound
+            end = time.time()
+        if start is None:
+            start = end - 86400
+        return jsonify(query_emotions(start, end, camera=args.get("camera", "*"),
+                                      person=args.get("person", "*"), res=res))
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+@app.route("/api/events")
+def api_events():
+    """Sightings: ?kind=recognized|unknown&name=&camera=&from=&to= (ISO or epoch), ?before=<cursor>."""
+    args  = request.args
+    limit = min(max(args.get("limit", PAGE_SIZE, type=int), 1), PAGE_SIZE_MAX)
+    try:
+        start, end = _timestamp(args.get("from")), _timestamp(args.get("to"))
+    except ValueError:
+        return jsonify({"error": "from/to must be ISO dates or epoch seconds"}), 400
+    try:
+        return jsonify(query_events(limit=limit, before=args.get("before"), start=start, end=end,
+                                    kind=args.get("kind"), name=args.get("name"), camera=args.get("camera")))
+    except ValueError:
+        return jsonify({"error": "before must be a next_cursor value"}), 400
 
 @app.route("/screenshots/<path:filename>")
 def screenshots(filename):
@@ -572,4 +1011,4 @@ if __name__ == "__main__":
   2. Open your browser at: http://localhost:5000
 
 """)
-    app.run(debug=False, port=5000)
+    app.run(debug=False, port=5000, threaded=True)   # One thread per open stream
@@ -9,7 +9,7 @@ NEW FEATURES:
   Email alert when unknown face detected
   Saves snapshot of unknown face and attaches to email
   Cooldown so you don't get spammed with emails
-  Writes live data to JSON file for Flask dashboard
+  Publishes live stats to shared memory for the Flask dashboard
 
 SETUP:
   1. Fill in your email details in the CONFIG section below
@@ -25,15 +25,25 @@ USAGE:
   Run dashboard separately: python dashboard.py
 """
 
+import argparse
 import cv2
 import numpy as np
 import os
 import csv
+import sqlite3
 import time
 import sys
 import json
+import struct
+import hashlib
+import queue
+import collections
+import bisect
+import multiprocessing
+from multiprocessing import shared_memory
 import smtplib
 import threading
+import atexit
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from email.mime.image import MIMEImage
@@ -66,19 +76,183 @@ EMAIL_ENABLED       = False          # Set to True once you fill in details belo
 EMAIL_SENDER        = "your_email@gmail.com"        # Your Gmail address
 EMAIL_PASSWORD      = "your_app_password_here"      # Gmail App Password (16 chars)
 EMAIL_RECEIVER      = "alert_receiver@gmail.com"    # Where to send alerts
-EMAIL_COOLDOWN_SECS = 60             # Minimum seconds between alert emails
+EMAIL_SMTP_HOST     = "smtp.gmail.com"
+EMAIL_SMTP_PORT     = 465            # SSL from the first byte (SMTP_SSL)
 
 # ── File paths ────────────────────────────────────────────────────────────────
 KNOWN_FACES_DIR   = Path("known_faces")
-ATTENDANCE_FILE   = Path("attendance_log.csv")
+ATTENDANCE_FILE   = Path("attendance_log.csv")   # CSV export of the attendance table
+EVENTS_DB         = Path("events.db")            # Attendance, recognitions, unknown sightings
 SCREENSHOTS_DIR   = Path("screenshots")
 UNKNOWN_FACES_DIR = Path("unknown_faces")
-LIVE_DATA_FILE    = Path("live_data.json")   # Read by Flask dashboard
+ENCODING_CACHE_DIR = KNOWN_FACES_DIR / ".encoding_cache"   # Persisted face encodings
+QUARANTINE_DIR     = KNOWN_FACES_DIR / "quarantine"        # Photos with no face / several faces
+ALERT_OUTBOX_DIR   = UNKNOWN_FACES_DIR / "outbox"          # Alerts not yet emailed (survive restarts)
+
+# ── Live stats channel (read by the Flask dashboard) ──────────────────────────
+LIVE_STATS_NAME   = "facecv_live"   # Shared-memory block; dashboard.py uses the same name
+LIVE_STATS_BYTES  = 1 << 20         # Room for the JSON snapshot
+LIVE_PUBLISH_HZ   = 4               # Snapshots published per second, however fast frames come
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+# Timing histograms and counters, published as Prometheus text; dashboard.py
+# serves them at /metrics.
+METRICS_NAME         = "facecv_metrics"   # Shared-memory block; dashboard.py uses the same name
+METRICS_BYTES        = 1 << 20
+METRICS_PUBLISH_SECS = 1.0     # Text re-rendered and published this often
+METRICS_SUMMARY_SECS = 60.0    # Console summary of the last interval; 0 = off
+METRICS_PROFILE_HZ   = 0       # Stack samples per second (--profile); 0 = off
+METRICS_PROFILE_TOP  = 8       # Functions listed in the console summary
+METRICS_BUCKETS_MS   = tuple(round(0.05 * 1.5 ** i, 3) for i in range(31))   # 0.05ms .. ~9.6s
+
+# ── Event store ───────────────────────────────────────────────────────────────
+EVENT_BATCH_MS    = 250     # Writer thread commits whatever arrived in this window at once
+EVENT_BATCH_MAX   = 2000    # Upper bound on rows per transaction
+EVENT_QUEUE_SIZE  = 20000   # Sightings beyond this backlog are dropped (attendance never is)
+SIGHTING_EVERY_S  = 5.0     # One recognition / unknown event per track this often
+
+# ── Emotion rollups ───────────────────────────────────────────────────────────
+# Seconds each emotion was on screen, per camera and person, in fixed buckets
+# aligned to the epoch, so hour and day buckets start on UTC boundaries.
+ROLLUP_RESOLUTIONS = {"minute": 60, "hour": 3600, "day": 86400}
+ROLLUP_RETENTION   = {"minute": 2 * 86400, "hour": 90 * 86400, "day": None}   # None = forever
+ROLLUP_FLUSH_SECS  = 10     # In-memory minute buckets are written this often
+ROLLUP_MAX_GAP     = 1.0    # A track unseen longer than this is not credited for the gap
+
+# ── Alert delivery ────────────────────────────────────────────────────────────
+ALERT_DIGEST_SECS    = 10.0    # After an email, further alerts wait this long and go out as one digest
+ALERT_DIGEST_MAX     = 10      # Snapshots per digest email
+ALERT_RETRY_SECS     = 5.0     # First retry delay after a failed send; doubles per failure
+ALERT_RETRY_MAX_SECS = 600.0
+ALERT_IDLE_SECS      = 60.0    # The SMTP connection is closed after this long with nothing to send
+ALERT_FLUSH_SECS     = 10.0    # On exit, pending alerts get this long; the rest stay in the outbox
+
+# ── Background image I/O ──────────────────────────────────────────────────────
+IO_WORKERS        = 2       # Threads encoding JPEGs and writing them (imencode releases the GIL)
+IO_QUEUE_SIZE     = 16      # Pending images before droppable ones (alert snapshots) give way
+IO_JPEG_QUALITY   = 90
 
 # ── Constants ─────────────────────────────────────────────────────────────────
-ANALYSIS_EVERY_N  = 5
 FACE_MATCH_TOL    = 0.5
 
+# ── Attribute fusion ──────────────────────────────────────────────────────────
+# Each analysis is folded into a per-track estimate instead of replacing it.
+FUSION_EMOTION_TAU    = 1.5    # Seconds; time constant of the emotion score average
+FUSION_AGE_TAU        = 10.0   # Age and gender change slowly: average over longer
+FUSION_GENDER_TAU     = 10.0
+FUSION_HYSTERESIS     = 8.0    # Points another emotion must lead by to replace the shown one
+FUSION_STABLE_SAMPLES = 3      # A track with this many samples...
+FUSION_STABLE_MARGIN  = 25.0   # ...and this lead of its top emotion is analysed less often
+FUSION_STABLE_STRIDE  = 3      # Stable tracks' results may grow this many times older
+
+# ── Analysis scheduling ───────────────────────────────────────────────────────
+# Each camera frame earns a slice of model time; the most deserving tracks spend it.
+ANALYSIS_BUDGET_MS    = 20     # Attribute-model milliseconds per camera frame
+ANALYSIS_COST_MS      = 30     # Initial guess per crop, refined from measured batches
+ANALYSIS_TARGET_AGE   = 1.0    # Seconds before a result counts as stale
+ANALYSIS_MIN_GAP      = 0.2    # Never re-analyse a track sooner than this
+ANALYSIS_NEW_PRIORITY = 10.0   # New tracks outrank any stale one
+ANALYSIS_FULL_SIZE_PX = 120    # Faces this wide or wider get full priority; smaller get less
+
+# ── Face quality ──────────────────────────────────────────────────────────────
+# Crops are scored before the expensive models see them; each track keeps its
+# best recent crop and the embedding and attribute models only run on that.
+QUALITY_MIN_SIZE_PX    = 36     # Shorter box side at which a crop becomes useless
+QUALITY_GOOD_SIZE_PX   = 90     # ...and from which more size no longer helps
+QUALITY_MIN_SHARPNESS  = 20.0   # Laplacian variance of the 64x64 crop: blur floor
+QUALITY_GOOD_SHARPNESS = 150.0
+QUALITY_DARK           = 40     # Mean grey level below which exposure starts to count against a crop
+QUALITY_BRIGHT         = 215    # ...and above which it does
+QUALITY_MAX_YAW        = 0.5    # Nose offset from the eye midpoint, in eye distances, that counts as profile
+QUALITY_MIN_SCORE      = 0.35   # Crops scoring lower never reach the models
+QUALITY_SHOT_SECS      = 2.0    # A best shot older than this is replaced by any usable crop
+QUALITY_SHOT_KEEP      = 0.85   # Before that, a newer crop must score at least this share of it
+
+# ── Unknown-face clustering ───────────────────────────────────────────────────
+# Unknown faces are grouped by embedding into persistent clusters (one per
+# stranger); each cluster keeps one best-shot JPEG and raises one alert.
+UNKNOWN_CLUSTER_TOL      = 0.5    # Embedding distance to a cluster's nearest member to join it
+UNKNOWN_MEMBER_SPREAD    = 0.2    # Encodings further than this from every member are kept as new views
+UNKNOWN_CLUSTER_MEMBERS  = 10     # Encodings kept per cluster
+UNKNOWN_CLUSTER_MAX      = 500    # Clusters kept; the least recently seen are dropped beyond this
+UNKNOWN_ALERT_SIGHTINGS  = 2      # Verified sightings before a cluster's alert goes out
+UNKNOWN_SAVE_SECS        = 10.0   # Cluster state is written at most this often (and on exit)
+
+# ── Face index ────────────────────────────────────────────────────────────────
+INDEX_BACKEND     = "exact"  # "exact" scan, or "ivf" (approximate) for very large galleries
+INDEX_TOP_K       = 3        # Candidate names kept per probe
+IVF_NLIST         = 0        # Coarse cells; 0 = sqrt(gallery size)
+IVF_NPROBE        = 8        # Cells scanned per probe (higher = better recall, slower)
+IVF_MIN_SIZE      = 2000     # Below this many encodings the IVF index just scans exactly
+
+# ── Tracking ──────────────────────────────────────────────────────────────────
+DETECT_EVERY_N     = 3       # Detection + identity checks every N frames; tracks are predicted in between
+TRACK_IOU_WEIGHT   = 0.5     # Association cost = w*(1-IoU) + (1-w)*appearance-signature drift
+TRACK_MAX_COST     = 0.75    # Detection/track pairs costlier than this are never matched
+TRACK_MIN_IOU      = 0.05    # Pairs overlapping less only match by appearance, and only a missed track
+TRACK_REACQUIRE    = 0.2     # ...whose signature drifted at most this much (back after an occlusion)
+TRACK_MAX_MISSES   = 5       # Detection rounds a track may go unseen before it is evicted
+
+# ── Detector backends ─────────────────────────────────────────────────────────
+DETECTOR_BACKEND  = "hog"    # "hog", "yunet", "ssd" or "haar" (see bench_detectors.py)
+DETECT_CONFIDENCE = 0.6      # Score threshold for the DNN backends
+MODELS_DIR        = Path("models")
+YUNET_MODEL       = MODELS_DIR / "face_detection_yunet_2023mar.onnx"
+SSD_PROTOTXT      = MODELS_DIR / "deploy.prototxt"
+SSD_WEIGHTS       = MODELS_DIR / "res10_300x300_ssd_iter_140000.caffemodel"
+
+# ── Detection scheduling ──────────────────────────────────────────────────────
+CAPTURE_WIDTH      = 1280
+CAPTURE_HEIGHT     = 720
+TARGET_FPS         = 15      # Frame rate the detection scheduler budgets for
+DETECT_FACE_PX     = 80      # Scale frames so the smallest tracked face is about this wide
+DETECT_MIN_SCALE   = 0.2
+DETECT_MAX_SCALE   = 1.0
+DETECT_IDLE_SCALE  = 0.5     # Full-scan scale when nobody is tracked (new faces of unknown size)
+ROI_EXPAND         = 0.75    # Track boxes grow by this fraction per side for ROI detection
+FULL_SCAN_EVERY_N  = 4       # Every Nth detection round scans the whole frame for arrivals
+
+# ── Identity caching ──────────────────────────────────────────────────────────
+# A track's identity is decided by accumulated votes; the 128-d encoding and
+# db lookup only run again on schedule or when the face's appearance drifts.
+IDENTITY_REVERIFY_SECS = 10.0   # Confirmed identities are re-checked this often
+IDENTITY_UNSURE_SECS   = 0.5    # Unconfirmed identities are re-checked this often
+IDENTITY_CONFIRM_VOTES = 3      # Verifications before an identity counts as confirmed
+IDENTITY_MIN_AGREEMENT = 0.7    # Share of the votes the leading name needs
+IDENTITY_VOTE_DECAY    = 0.9    # Older votes fade so a wrong early guess can be overturned
+IDENTITY_DRIFT         = 0.35   # Appearance change (1 - correlation) that forces a re-check
+
+# ── Enrollment ────────────────────────────────────────────────────────────────
+ENROLL_WORKERS         = 0     # Processes for bulk enrollment; 0 = one per CPU core
+ENROLL_PARALLEL_MIN    = 8     # Fewer new images than this are encoded in-process
+ENROLL_CHUNKSIZE       = 4     # Images handed to a worker at a time
+ENROLL_TASKS_PER_CHILD = 500   # Recycle workers so dlib/decoder memory stays bounded
+
+# ── Batch mode ────────────────────────────────────────────────────────────────
+BATCH_SEGMENT_FRAMES = 900    # Video frames (or images) per parallel work unit
+BATCH_ANALYSIS_EVERY = 5      # Video frames between attribute analyses of a track
+BATCH_IMAGE_FPS      = 1.0    # Nominal frame rate given to image folders for timestamps
+BATCH_TRACK_ID_SPAN  = 1_000_000   # Output track_id = segment * span + track id (unique across segments)
+IMAGE_EXTS           = {".jpg", ".jpeg", ".png", ".bmp"}
+
+# ── Cameras ───────────────────────────────────────────────────────────────────
+DETECT_WORKERS        = 2     # Detection threads shared by all cameras
+SOURCE_RECONNECT_SECS = 2.0   # Wait before reopening a dropped network stream
+
+# ── Pipeline ──────────────────────────────────────────────────────────────────
+# Each stage runs in its own thread; when a stage falls behind, the oldest
+# waiting item is dropped so latency stays bounded instead of growing.
+DETECT_QUEUE_SIZE    = 2     # Captured frames waiting for detection
+ANALYZE_QUEUE_SIZE   = 4     # Face-crop batches waiting for DeepFace
+RENDER_QUEUE_SIZE    = 2     # Processed frames waiting to be drawn
+ANALYSIS_PENDING_TTL = 2.0   # Seconds before a dropped analysis job may be re-queued
+FRAME_RING_SLOTS     = 8     # Shared-memory frame slots per camera (grown to cover the queues)
+ANALYSIS_BATCH_MS    = 30    # Gather crops from later frames for this long into one batch
+ANALYSIS_MAX_BATCH   = 16    # Upper bound on crops per stacked DeepFace forward pass
+
+# ── Overlay ───────────────────────────────────────────────────────────────────
+OVERLAY_SPRITE_CACHE = 1024  # Pre-rendered labels kept (least recently used evicted)
+
 EMOTION_COLORS = {
     "happy":    (0,   220, 100),
     "sad":      (200,  80,  40),
@@ -91,80 +265,724 @@ EMOTION_COLORS = {
 
 WMO_EMOTIONS = ["happy", "sad", "angry", "fear", "surprise", "disgust", "neutral"]
 
+# Output order of DeepFace's emotion model
+DEEPFACE_EMOTIONS = ["angry", "disgust", "fear", "happy", "sad", "surprise", "neutral"]
+
+
+# ── Metrics ───────────────────────────────────────────────────────────────────
+class Counter:
+    """Monotonic count."""
+    __slots__ = ("value", "_lock")
 
-# ── Email Alert System ────────────────────────────────────────────────────────
-class EmailAlerter:
     def __init__(self):
-        self.last_sent_time = 0
-        UNKNOWN_FACES_DIR.mkdir(exist_ok=True)
+        self.value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, n: int = 1):
+        with self._lock:
+            self.value += n
+
+
+class _Timing:
+    __slots__ = ("hist", "t0")
+
+    def __init__(self, hist: "Histogram"):
+        self.hist = hist
+
+    def __enter__(self):
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        self.hist.observe((time.perf_counter() - self.t0) * 1000)
+
+
+class Histogram:
+    """Millisecond timings in fixed log-spaced buckets.
+
+    observe() is a bisect and two adds, so it can sit on every hot path;
+    quantiles are interpolated within a bucket (each one is 1.5x the previous,
+    so estimates are within a few percent).
+    """
+    def __init__(self, bounds: tuple = METRICS_BUCKETS_MS):
+        self.bounds = bounds
+        self.counts = [0] * (len(bounds) + 1)   # Last one: above the largest bound
+        self.sum    = 0.0
+        self._lock  = threading.Lock()
+
+    def observe(self, ms: float):
+        i = bisect.bisect_left(self.bounds, ms)
+        with self._lock:
+            self.counts[i] += 1
+            self.sum       += ms
+
+    def time(self) -> _Timing:
+        """``with hist.time(): ...`` observes the block's wall time."""
+        return _Timing(self)
+
+    def snapshot(self) -> tuple[list, float]:
+        with self._lock:
+            return list(self.counts), self.sum
+
+    def quantile(self, q: float, counts: list | None = None) -> float:
+        """Estimated q-quantile in ms, of ``counts`` (e.g. an interval's delta) or of everything so far."""
+        counts = self.snapshot()[0] if counts is None else counts
+        rank   = q * sum(counts)
+        if not rank:
+            return 0.0
+        seen = 0
+        for i, c in enumerate(counts):
+            if c and seen + c >= rank:
+                if i == len(self.bounds):
+                    return self.bounds[-1]
+                lo = self.bounds[i-1] if i else 0.0
+                return lo + (self.bounds[i] - lo) * (rank - seen) / c
+            seen += c
+        return self.bounds[-1]
+
+
+class MetricsRegistry:
+    """Counters, callback gauges and timing histograms, rendered as Prometheus text.
+
+    A series is created on first lookup and the same object returned after
+    that, so instrumented code looks its series up once and keeps them.
+    """
+    QUANTILES = (0.5, 0.95, 0.99)
 
-    def send_alert(self, frame: np.ndarray):
-        """Send email alert with snapshot. Runs in background thread."""
-        if not EMAIL_ENABLED:
-            return
-        now = time.time()
-        if now - self.last_sent_time < EMAIL_COOLDOWN_SECS:
-            return  # Cooldown active, skip
-        self.last_sent_time = now
+    def __init__(self):
+        self.families = {}   # name -> {"type", "help", "series": {labels: Counter | Histogram | callable}}
+        self._lock    = threading.Lock()
+
+    def _series(self, kind: str, name: str, help: str, labels: dict, make, replace: bool = False):
+        key = tuple(sorted((k, str(v)) for k, v in labels.items()))
+        with self._lock:
+            fam = self.families.setdefault(name, {"type": kind, "help": help, "series": {}})
+            if replace or key not in fam["series"]:
+                fam["series"][key] = make()
+            return fam["series"][key]
+
+    def counter(self, name: str, help: str = "", **labels) -> Counter:
+        return self._series("counter", name, help, labels, Counter)
+
+    def histogram(self, name: str, help: str = "", **labels) -> Histogram:
+        return self._series("histogram", name, help, labels, Histogram)
+
+    def callback(self, name: str, fn, help: str = "", kind: str = "gauge", **labels):
+        """A series read from ``fn()`` at render time — for values something else already keeps."""
+        self._series(kind, name, help, labels, lambda: fn, replace=True)
+
+    def collect(self) -> list:
+        """[(name, type, help, [(labels, Counter | Histogram | callable)])], sorted by name."""
+        with self._lock:
+            return [(name, f["type"], f["help"], list(f["series"].items()))
+                    for name, f in sorted(self.families.items())]
+
+    @staticmethod
+    def value(series) -> float:
+        if isinstance(series, Counter):
+            return series.value
+        try:
+            return float(series())
+        except Exception:
+            return float("nan")
+
+    def render(self) -> str:
+        """Prometheus text exposition format (0.0.4).
+
+        Each histogram also gets a ``<name>_quantile`` gauge family with the
+        p50/p95/p99 estimates, for readers that don't compute them from buckets.
+        """
+        out = []
+        for name, kind, help, series in self.collect():
+            out += [f"# HELP {name} {help}", f"# TYPE {name} {kind}"]
+            quantiles = []
+            for key, s in series:
+                labels = ",".join(f'{k}="{_label_escape(v)}"' for k, v in key)
+                if kind != "histogram":
+                    out.append(f"{name}{{{labels}}} {self.value(s):g}" if labels else f"{name} {self.value(s):g}")
+                    continue
+                counts, total = s.snapshot()
+                sep, cum = "," if labels else "", 0
+                for bound, c in zip(s.bounds, counts):
+                    cum += c
+                    out.append(f'{name}_bucket{{{labels}{sep}le="{bound:g}"}} {cum}')
+                cum += counts[-1]
+                out += [f'{name}_bucket{{{labels}{sep}le="+Inf"}} {cum}',
+                        f"{name}_sum{{{labels}}} {total:.3f}", f"{name}_count{{{labels}}} {cum}"]
+                quantiles += [f'{name}_quantile{{{labels}{sep}quantile="{q:g}"}} {s.quantile(q, counts):.3f}'
+                              for q in self.QUANTILES]
+            if quantiles:
+                out += [f"# HELP {name}_quantile Estimated from {name} buckets",
+                        f"# TYPE {name}_quantile gauge"] + quantiles
+        return "\n".join(out) + "\n"
+
+
+def _label_escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _series_name(name: str, key: tuple) -> str:
+    """facecv_step_ms + (("step", "detect"),) -> step_ms{detect}, for the console."""
+    short = name.removeprefix("facecv_")
+    return f"{short}{{{','.join(v for _, v in key)}}}" if key else short
+
+
+METRICS = MetricsRegistry()   # Process-wide; the live app publishes it, batch workers just fill it
+
+
+class SamplingProfiler:
+    """Peeks at every thread's stack ``hz`` times a second.
+
+    Each sample counts the innermost function of this file the thread was in
+    (time inside OpenCV, dlib or DeepFace is charged to the app function that
+    called it) into facecv_profile_samples_total{thread, function}. Threads
+    that never entered this file are not counted, nor are samples whose
+    innermost Python frame is in threading or queue (Condition/Event waits,
+    queue.get): those threads are idle. Time blocked in C cannot be told
+    apart from work (time.sleep, a bare lock acquire, socket or camera
+    reads) and is charged to the calling function like any other. Taking a
+    sample is one sys._current_frames() call plus a short frame walk per
+    thread, so 50-100 Hz costs well under 1% of a core.
+    """
+    IDLE_FILES = {threading.__file__, queue.__file__}
+
+    def __init__(self, registry: MetricsRegistry, hz: float):
+        self.registry = registry
+        self.interval = 1.0 / hz
+        self.stopped  = threading.Event()
+        self.series   = {}   # (thread, function) -> Counter, saves a registry lookup per sample
+        self.worker   = threading.Thread(target=self._run, name="profiler", daemon=True)
+
+    def start(self):
+        self.worker.start()
+
+    def _run(self):
+        me = threading.get_ident()
+        while not self.stopped.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            for ident, frame in sys._current_frames().items():
+                if ident == me or frame.f_code.co_filename in self.IDLE_FILES:
+                    continue
+                f = frame
+                while f is not None and f.f_code.co_filename != __file__:
+                    f = f.f_back
+                if f is None:
+                    continue
+                where  = f.f_code.co_qualname
+                thread = names.get(ident, "?")
+                base, _, n = thread.rpartition("-")
+                thread = base if n.isdigit() else thread   # detect-0, detect-1 -> detect
+                counter = self.series.get((thread, where))
+                if counter is None:
+                    counter = self.series[(thread, where)] = self.registry.counter(
+                        "facecv_profile_samples_total", "Stack samples per thread and innermost app function",
+                        thread=thread, function=where)
+                counter.inc()
+
+    def stop(self):
+        self.stopped.set()
+        if self.worker.is_alive():
+            self.worker.join(timeout=1.0)
+
+
+class MetricsPublisher:
+    """Publishes the registry to shared memory and prints an interval summary to the console.
+
+    One background thread: every METRICS_PUBLISH_SECS the Prometheus text goes
+    into a StatsChannel that dashboard.py serves at /metrics; every
+    METRICS_SUMMARY_SECS the p50/p95/p99 of each timer and the counter
+    increases since the previous summary are printed.
+    """
+    def __init__(self, registry: MetricsRegistry = METRICS, profile_hz: float = METRICS_PROFILE_HZ,
+                 publish_secs: float = METRICS_PUBLISH_SECS, summary_secs: float = METRICS_SUMMARY_SECS):
+        self.registry     = registry
+        self.publish_secs = publish_secs
+        self.summary_secs = summary_secs
+        self.channel      = StatsChannel(METRICS_NAME, METRICS_BYTES)
+        self.profiler     = SamplingProfiler(registry, profile_hz) if profile_hz else None
+        self.previous     = self._totals()
+        self.t_summary    = time.time()
+        self.stopped      = threading.Event()
+        self.worker       = threading.Thread(target=self._run, name="metrics", daemon=True)
+
+    def start(self):
+        if self.profiler:
+            self.profiler.start()
+        self.worker.start()
+
+    def _run(self):
+        while not self.stopped.wait(self.publish_secs):
+            self.publish()
+            if self.summary_secs and time.time() - self.t_summary >= self.summary_secs:
+                self.summary()
+
+    def publish(self):
+        if not self.channel.publish(self.registry.render().encode()):
+            print(f" Metrics: text larger than {METRICS_BYTES} bytes, not published")
+
+    def _totals(self) -> dict:
+        """(name, labels) -> histogram bucket counts, or counter value."""
+        totals = {}
+        for name, kind, _, series in self.registry.collect():
+            for key, s in series:
+                if kind == "histogram":
+                    totals[(name, key)] = s.snapshot()[0]
+                elif kind == "counter":
+                    totals[(name, key)] = self.registry.value(s)
+        return totals
+
+    def summary(self):
+        """Prints what happened since the previous summary."""
+        now, totals  = time.time(), self._totals()
+        secs         = now - self.t_summary
+        prev         = self.previous
+        self.previous, self.t_summary = totals, now
+        timers, counts, profile = [], [], []
+        for name, kind, _, series in self.registry.collect():
+            for key, s in series:
+                cur = totals.get((name, key))
+                if kind == "histogram":
+                    delta = [a - b for a, b in zip(cur, prev.get((name, key), [0] * len(cur)))]
+                    if sum(delta):
+                        timers.append((_series_name(name, key), sum(delta),
+                                       *(s.quantile(q, delta) for q in MetricsRegistry.QUANTILES)))
+                elif kind == "counter" and cur != prev.get((name, key), 0):
+                    delta = cur - prev.get((name, key), 0)
+                    if name == "facecv_profile_samples_total":
+                        profile.append((delta, dict(key)))
+                    else:
+                        counts.append(f"{_series_name(name, key)} +{delta:g}")
+        print(f"\n ── Metrics, last {secs:.0f}s " + "─" * 44)
+        if timers:
+            print(f"   {'timer':<34}{'n':>7}{'p50':>9}{'p95':>9}{'p99':>9}  ms")
+            for label, n, p50, p95, p99 in timers:
+                print(f"   {label:<34}{n:>7}{p50:>9.1f}{p95:>9.1f}{p99:>9.1f}")
+        for i in range(0, len(counts), 4):
+            print("   " + "  ".join(counts[i:i+4]))
+        if profile:
+            total = sum(n for n, _ in profile)
+            print(f"   profile, {total:g} samples:")
+            for n, where in sorted(profile, key=lambda p: -p[0])[:METRICS_PROFILE_TOP]:
+                print(f"   {n / total:>6.1%}  {where['thread']:<10} {where['function']}")
+
+    def close(self):
+        self.stopped.set()
+        if self.profiler:
+            self.profiler.stop()
+        if self.worker.is_alive():
+            self.worker.join(timeout=self.publish_secs + 1.0)
+        if self.summary_secs:
+            self.summary()
+        self.channel.close()
+
+
+# ── Background Image I/O ──────────────────────────────────────────────────────
+class ImageWriter:
+    """Saves frames as JPEG off the frame loop.
+
+    save() copies the frame and returns at once; worker threads encode and
+    write each file under a temporary name, then rename it into place. A job
+    whose key is already pending just replaces that job's frame (coalesced).
+    When the queue is full the oldest droppable job gives way; saves the
+    user asked for (screenshots) are never dropped.
+    """
+    def __init__(self, workers: int = IO_WORKERS, maxsize: int = IO_QUEUE_SIZE,
+                 quality: int = IO_JPEG_QUALITY):
+        self.pending   = collections.deque()
+        self.cond      = threading.Condition()
+        self.maxsize   = maxsize
+        self.params    = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        self.stats     = StageStats("io")   # Encode + write latency, drops
+        self.coalesced = 0
+        self.max_ms    = 0.0
+        self.closed    = False
+        self.workers   = [threading.Thread(target=self._run, name=f"io-{i}", daemon=True)
+                          for i in range(max(1, workers))]
+        for w in self.workers:
+            w.start()
+
+    def save(self, frame: np.ndarray, path: Path, key: str | None = None,
+             droppable: bool = True, done=None) -> bool:
+        """Queues ``frame`` for ``path``; ``done(path, error)`` runs once it is on
+        disk (error None) or the write failed (error is the exception), so work
+        waiting on the image is never silently lost. Returns False if the
+        image was dropped."""
+        frame = frame.copy()   # The caller keeps drawing on / reusing its buffer
+        with self.cond:
+            if key is not None:
+                for job in self.pending:
+                    if job["key"] == key:
+                        job["frame"] = frame   # Newest frame wins
+                        job["droppable"] = job["droppable"] and droppable
+                        if done is not None:
+                            first = job["done"]
+                            job["done"] = done if first is None else (lambda p, e, a=first, b=done: (a(p, e), b(p, e)))
+                        self.coalesced += 1
+                        return True
+            if len(self.pending) >= self.maxsize:
+                victim = next((j for j in self.pending if j["droppable"]), None)
+                if victim is not None:
+                    self.pending.remove(victim)
+                    self.stats.drop()
+                elif droppable:
+                    self.stats.drop()
+                    return False
+            self.pending.append({"frame": frame, "path": Path(path), "key": key,
+                                 "droppable": droppable, "done": done})
+            self.cond.notify()
+        return True
 
-        # Save snapshot
-        ts       = datetime.now().strftime("%Y%m%d_%H%M%S")
-        img_path = UNKNOWN_FACES_DIR / f"unknown_{ts}.jpg"
-        cv2.imwrite(str(img_path), frame)
+    def _run(self):
+        while True:
+            with self.cond:
+                while not self.pending and not self.closed:
+                    self.cond.wait()
+                if not self.pending:
+                    return   # Closed and drained
+                job = self.pending.popleft()
+            t0 = time.time()
+            try:
+                ok, buf = cv2.imencode(".jpg", job["frame"], self.params)
+                if not ok:
+                    raise ValueError("JPEG encoding failed")
+                tmp = job["path"].with_name(job["path"].name + ".part")
+                with open(tmp, "wb") as f:
+                    f.write(buf)
+                os.replace(tmp, job["path"])   # Readers never see a partial image
+            except Exception as e:
+                print(f"  Could not save {job['path']}: {e}")
+                self.stats.error()
+                if job["done"]:
+                    job["done"](job["path"], e)
+                continue
+            elapsed = time.time() - t0
+            self.stats.record(elapsed)
+            self.max_ms = max(self.max_ms, elapsed * 1000)
+            if job["done"]:
+                job["done"](job["path"], None)
+
+    def depth(self) -> int:
+        return len(self.pending)
+
+    def report(self) -> dict:
+        snap = self.stats.snapshot(self.depth())
+        return {**snap, "coalesced": self.coalesced, "max_ms": round(self.max_ms, 1)}
+
+    def close(self):
+        """Writes everything still pending, then stops the workers."""
+        with self.cond:
+            self.closed = True
+            self.cond.notify_all()
+        for w in self.workers:
+            w.join()
 
-        # Send in background so it doesn't freeze the video
-        thread = threading.Thread(target=self._send, args=(str(img_path), ts), daemon=True)
-        thread.start()
 
-    def _send(self, img_path: str, timestamp: str):
-        try:
-            msg = MIMEMultipart()
-            msg["Subject"] = f"Unknown Face Detected — {timestamp}"
-            msg["From"]    = EMAIL_SENDER
-            msg["To"]      = EMAIL_RECEIVER
+# ── Email Alert System ────────────────────────────────────────────────────────
+class SmtpTransport:
+    """Sends messages over one reusable SMTP connection, reconnecting when it drops.
+
+    The alert worker only calls send() and close(), so anything with those
+    two methods (a test double, another mail API) can stand in for it.
+    """
+    def __init__(self, host: str = EMAIL_SMTP_HOST, port: int = EMAIL_SMTP_PORT, user: str | None = EMAIL_SENDER,
+                 password: str | None = EMAIL_PASSWORD, use_ssl: bool = True, timeout: float = 30.0):
+        self.host, self.port, self.user, self.password = host, port, user, password
+        self.use_ssl  = use_ssl
+        self.timeout  = timeout
+        self.conn     = None
+        self.connects = 0
+
+    def _connect(self):
+        cls  = smtplib.SMTP_SSL if self.use_ssl else smtplib.SMTP
+        conn = cls(self.host, self.port, timeout=self.timeout)
+        if self.user:
+            conn.login(self.user, self.password)
+        self.conn = conn
+        self.connects += 1
+
+    def send(self, msg):
+        for attempt in range(2):
+            if self.conn is None:
+                self._connect()
+            try:
+                self.conn.send_message(msg)
+                return
+            except smtplib.SMTPServerDisconnected:
+                # The server closed an idle connection: one fresh try
+                self.close()
+                if attempt:
+                    raise
+            except Exception:
+                self.close()
+                raise
+
+    def close(self):
+        if self.conn is not None:
+            try:
+                self.conn.quit()
+            except Exception:
+                pass
+            self.conn = None
+
 
-            body = MIMEText(f"""
+class EmailAlerter:
+    """Delivers unknown-face alerts from a durable outbox on one worker thread.
+
+    send_alert() copies the snapshot into ALERT_OUTBOX_DIR and returns. The
+    worker emails an alert straight away when the last email is at least
+    ALERT_DIGEST_SECS old; during a burst the alerts that pile up in the
+    meantime go out together as one digest. Failed sends are retried with
+    exponential backoff, the connection is reused between emails, and
+    close() flushes what it can; anything left is sent on the next start.
+    """
+    def __init__(self, transport=None, outbox: Path = ALERT_OUTBOX_DIR, enabled: bool | None = None,
+                 digest_secs: float = ALERT_DIGEST_SECS, digest_max: int = ALERT_DIGEST_MAX,
+                 retry_secs: float = ALERT_RETRY_SECS):
+        self.enabled     = EMAIL_ENABLED if enabled is None else enabled
+        self.transport   = transport or SmtpTransport()
+        self.outbox      = outbox
+        self.digest_secs = digest_secs
+        self.digest_max  = digest_max
+        self.retry_secs  = retry_secs
+        self.items: list = []   # {"id", "cluster", "camera", "time", "attempts", "next_try"}, oldest first
+        self.cond        = threading.Condition()
+        self.closed      = False
+        self.deadline    = None
+        self.last_sent   = 0.0
+        self.last_active = 0.0
+        self.connected   = False   # A send was tried since the connection was last closed for idleness
+        self.stats       = StageStats("alerts")   # Send latency per email; failed sends count as drops
+        self.emails      = 0
+        self.delivered   = 0
+        self.worker      = None
+        if not self.enabled:
+            return
+        self.outbox.mkdir(parents=True, exist_ok=True)
+        for meta in sorted(self.outbox.glob("*.json")):
+            try:
+                with open(meta) as f:
+                    item = json.load(f)
+                self.items.append(dict(item, id=meta.stem, attempts=0, next_try=0.0))
+            except (OSError, ValueError):
+                meta.unlink(missing_ok=True)
+        if self.items:
+            print(f" {len(self.items)} undelivered alert(s) in {self.outbox}/ will be retried")
+        # Daemon, so a missed close() cannot keep the process alive; the atexit
+        # hook still gives the outbox its flush window on a normal exit
+        self.worker = threading.Thread(target=self._run, name="alerts", daemon=True)
+        self.worker.start()
+        atexit.register(self.close)
+
+    def send_alert(self, cluster_id: int, img_path: Path, camera: str | None = None):
+        """Queue an email for one unknown-face cluster with its best shot."""
+        if not self.enabled:
+            return
+        now  = time.time()
+        item = {"id": f"{time.time_ns()}_{cluster_id}", "cluster": cluster_id, "camera": camera, "time": now}
+        try:
+            # The cluster image is overwritten and eventually deleted: keep this snapshot
+            with open(img_path, "rb") as src, open(self.outbox / f"{item['id']}.jpg", "wb") as dst:
+                dst.write(src.read())
+        except OSError as e:
+            print(f"  Alert snapshot unavailable: {e}")
+        tmp = self.outbox / f"{item['id']}.tmp"
+        with open(tmp, "w") as f:
+            json.dump(item, f)
+        os.replace(tmp, self.outbox / f"{item['id']}.json")
+        with self.cond:
+            self.items.append(dict(item, attempts=0, next_try=0.0))
+            self.cond.notify()
+
+    def _next_batch(self) -> list | None:
+        """Blocks until a batch is due; None once closed and done.
+
+        An empty batch means the connection has been idle for ALERT_IDLE_SECS
+        and should be closed — by the caller, since QUIT is network I/O and
+        send_alert() must never wait on it for the lock.
+        """
+        with self.cond:
+            while True:
+                now   = time.time()
+                ready = [it for it in self.items if self.closed or it["next_try"] <= now]
+                if self.closed and (not ready or now >= self.deadline):
+                    return None
+                if ready:
+                    hold = 0.0 if self.closed else self.last_sent + self.digest_secs - now
+                    if hold <= 0 or len(ready) >= self.digest_max:
+                        return ready[:self.digest_max]
+                    wait = hold
+                elif self.items:
+                    wait = min(it["next_try"] for it in self.items) - now
+                else:
+                    wait = ALERT_IDLE_SECS
+                    if self.connected and now - self.last_active >= ALERT_IDLE_SECS:
+                        self.connected = False
+                        return []
+                self.cond.wait(max(wait, 0.01))
+
+    def _run(self):
+        while (batch := self._next_batch()) is not None:
+            if not batch:
+                self.transport.close()
+                continue
+            t0 = time.time()
+            try:
+                self.transport.send(self._compose(batch))
+            except Exception as e:
+                self.stats.drop()
+                with self.cond:
+                    self.connected = True
+                    for it in batch:
+                        it["attempts"] += 1
+                        it["next_try"]  = time.time() + min(self.retry_secs * 2 ** (it["attempts"] - 1),
+                                                            ALERT_RETRY_MAX_SECS)
+                    closed = self.closed
+                print(f"  Email failed ({len(batch)} alert(s) kept for retry): {e}")
+                if closed:
+                    break   # Leave the rest in the outbox for the next start
+                continue
+            self.stats.record(time.time() - t0)
+            with self.cond:
+                for it in batch:
+                    self.items.remove(it)
+                self.last_sent = self.last_active = time.time()
+                self.connected = True
+                self.emails   += 1
+                self.delivered += len(batch)
+            for it in batch:
+                for suffix in (".json", ".jpg"):
+                    (self.outbox / f"{it['id']}{suffix}").unlink(missing_ok=True)
+            print(f"  📧 Alert email sent to {EMAIL_RECEIVER}"
+                  + (f" ({len(batch)} unknown faces)" if len(batch) > 1 else ""))
+        self.transport.close()
+
+    def _compose(self, batch: list) -> MIMEMultipart:
+        stamp = lambda t: datetime.fromtimestamp(t).strftime("%Y-%m-%d %H:%M:%S")
+        msg   = MIMEMultipart()
+        if len(batch) == 1:
+            it = batch[0]
+            msg["Subject"] = f"Unknown Face #{it['cluster']} Detected — {stamp(it['time'])}"
+            text = f"""
 Hello,
 
 An unknown face was detected by your Face Recognition System.
 
-Time: {timestamp}
-A snapshot has been attached to this email.
+Unknown person: #{it['cluster']}
+Camera: {it['camera'] or "default"}
+Time: {stamp(it['time'])}
+The best snapshot so far has been attached to this email.
 
 — FaceCV Security System
-""")
-            msg.attach(body)
+"""
+        else:
+            msg["Subject"] = f"{len(batch)} Unknown Faces Detected — {stamp(batch[0]['time'])}"
+            lines = "\n".join(f"  #{it['cluster']:<5} camera {it['camera'] or 'default':<10} {stamp(it['time'])}"
+                              for it in batch)
+            text = f"""
+Hello,
 
-            # Attach snapshot
-            with open(img_path, "rb") as f:
-                img_attachment = MIMEImage(f.read(), name=os.path.basename(img_path))
-                msg.attach(img_attachment)
+Several unknown faces were detected by your Face Recognition System.
 
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as server:
-                server.login(EMAIL_SENDER, EMAIL_PASSWORD)
-                server.sendmail(EMAIL_SENDER, EMAIL_RECEIVER, msg.as_string())
+{lines}
 
-            print(f"  📧 Alert email sent to {EMAIL_RECEIVER}")
-        except Exception as e:
-            print(f"  Email failed: {e}")
+A snapshot of each has been attached to this email.
+
+— FaceCV Security System
+"""
+        msg["From"] = EMAIL_SENDER
+        msg["To"]   = EMAIL_RECEIVER
+        msg.attach(MIMEText(text))
+        for it in batch:
+            path = self.outbox / f"{it['id']}.jpg"
+            if path.exists():
+                msg.attach(MIMEImage(path.read_bytes(), name=f"unknown_{it['cluster']:04d}.jpg"))
+        return msg
+
+    def report(self) -> dict:
+        with self.cond:
+            depth = len(self.items)
+        connects = getattr(self.transport, "connects", 0)
+        return {**self.stats.snapshot(depth), "emails": self.emails, "delivered": self.delivered,
+                "connects": connects}
+
+    def close(self, timeout: float = ALERT_FLUSH_SECS):
+        """Sends what is pending (ignoring digest waits and backoff) for up to ``timeout`` seconds."""
+        if self.worker is None:
+            return
+        atexit.unregister(self.close)
+        with self.cond:
+            self.closed   = True
+            self.deadline = time.time() + timeout
+            self.cond.notify_all()
+        self.worker.join(timeout + 1.0)
 
 
 # ── Live Data Writer (for Flask dashboard) ────────────────────────────────────
+class StatsChannel:
+    """Latest snapshot (JSON, or the metrics text) in shared memory, guarded by a seqlock.
+
+    Layout: [seq u64][length u64][payload]. The writer makes seq odd, writes
+    the payload and its length, then makes seq even again; a reader copies
+    the payload and keeps it only if seq was the same even value before and
+    after. Readers never block the writer and never see a half-written snapshot.
+    """
+    HEADER = struct.Struct("<QQ")
+
+    def __init__(self, name: str = LIVE_STATS_NAME, size: int = LIVE_STATS_BYTES):
+        try:
+            stale = shared_memory.SharedMemory(name=name)   # Left behind by a crashed run
+            stale.close()
+            stale.unlink()
+        except FileNotFoundError:
+            pass
+        self.shm      = shared_memory.SharedMemory(name=name, create=True, size=size)
+        self.capacity = self.shm.size - self.HEADER.size
+        self.seq      = 0
+        self.HEADER.pack_into(self.shm.buf, 0, 0, 0)
+
+    def publish(self, payload: bytes) -> bool:
+        if len(payload) > self.capacity:
+            return False
+        buf = self.shm.buf
+        self.seq += 1                                   # Odd: write in progress
+        struct.pack_into("<Q", buf, 0, self.seq)
+        buf[self.HEADER.size:self.HEADER.size + len(payload)] = payload
+        struct.pack_into("<Q", buf, 8, len(payload))
+        self.seq += 1                                   # Even: snapshot complete
+        struct.pack_into("<Q", buf, 0, self.seq)
+        return True
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+
 class LiveDataWriter:
-    def __init__(self):
+    """Session counters for the dashboard, published at LIVE_PUBLISH_HZ.
+
+    update() runs every rendered frame and only bumps counters; serialising
+    and publishing happens at most a few times a second.
+    """
+    def __init__(self, rollup: "EmotionRollup", publish_hz: float = LIVE_PUBLISH_HZ):
         self.session_start   = datetime.now().isoformat()
-        self.emotion_counts  = {e: 0 for e in WMO_EMOTIONS}
+        self.rollup          = rollup   # Emotion dwell time, not per-frame counts
         self.recognized_log  = []   # [{name, time, emotion, age, gender}]
-        self.unknown_count   = 0
+        self.unknown_seen    = set()   # Unknown-face clusters seen this session
         self.frame_count     = 0
+        self.interval        = 1.0 / publish_hz
+        self.last_publish    = 0.0
+        self.channel         = StatsChannel()
         self._write()
 
-    def update(self, faces: list[dict], fps: float):
+    def update(self, faces: list[dict], fps: float, stats=None):
+        """Count this frame's faces; publish if due.
+
+        ``stats`` is called only when publishing and returns the "pipeline",
+        "identity" and "cameras" sections, which are too costly to build per frame.
+        """
         self.frame_count += 1
         for f in faces:
             emo = f.get("emotion", "neutral")
-            if emo in self.emotion_counts:
-                self.emotion_counts[emo] += 1
             if f.get("name", "Unknown") != "Unknown":
                 self.recognized_log.append({
                     "name":    f["name"],
@@ -175,44 +993,372 @@ class LiveDataWriter:
                 })
                 # Keep last 50 entries
                 self.recognized_log = self.recognized_log[-50:]
-            else:
-                self.unknown_count += 1
-        self._write(fps=fps, active_faces=len(faces))
+            elif f.get("cluster") is not None:
+                self.unknown_seen.add(f["cluster"])
 
-    def _write(self, fps: float = 0.0, active_faces: int = 0):
+        now = time.time()
+        if now - self.last_publish < self.interval:
+            return
+        self.last_publish = now
+        sections = stats() if stats else {}
+        cameras  = sections.get("cameras")
+        # With several cameras the dashboard shows faces visible anywhere
+        active = sum(c["faces"] for c in cameras.values()) if cameras else len(faces)
+        self._write(fps=fps, active_faces=active, **sections)
+
+    def _write(self, fps: float = 0.0, active_faces: int = 0, pipeline: dict | None = None,
+               identity: dict | None = None, cameras: dict | None = None):
         data = {
             "session_start":  self.session_start,
             "last_updated":   datetime.now().isoformat(),
             "fps":            round(fps, 1),
             "active_faces":   active_faces,
-            "unknown_count":  self.unknown_count,
-            "emotion_counts": self.emotion_counts,
+            "unknown_count":  len(self.unknown_seen),
+            "emotion_seconds": {e: round(s, 1) for e, s in self.rollup.session.items()},
             "recognized_log": self.recognized_log,
+            "pipeline":       pipeline or {},
+            "identity":       identity or {},
+            "cameras":        cameras or {},
         }
+        self.channel.publish(json.dumps(data, separators=(",", ":")).encode())
+
+    def close(self):
+        self.channel.close()
+
+
+# ── Face Index ────────────────────────────────────────────────────────────────
+def _sq_dists(probes: np.ndarray, vectors: np.ndarray, sq_norms: np.ndarray) -> np.ndarray:
+    """Squared Euclidean distances (probes x vectors) via one matrix product."""
+    d2 = (probes * probes).sum(1)[:, None] + sq_norms[None, :] - 2.0 * (probes @ vectors.T)
+    return np.maximum(d2, 0.0, out=d2)
+
+
+class ExactIndex:
+    """Contiguous float32 gallery; every probe of a frame is answered in one matmul."""
+    def __init__(self, dim: int = 128):
+        self.vectors  = np.empty((0, dim), np.float32)
+        self.sq_norms = np.empty(0, np.float32)
+
+    def __len__(self):
+        return len(self.vectors)
+
+    def build(self, vectors):
+        self.vectors  = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        self.sq_norms = (self.vectors * self.vectors).sum(1)
+
+    def add(self, vectors):
+        vectors = np.asarray(vectors, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        self.vectors  = np.concatenate([self.vectors, vectors])
+        self.sq_norms = np.concatenate([self.sq_norms, (vectors * vectors).sum(1)])
+
+    @staticmethod
+    def _top_k(d2: np.ndarray, ids, k: int):
+        """Sorted k smallest of each row, padded with (inf, -1)."""
+        rows = len(d2)
+        out_d = np.full((rows, k), np.inf, np.float32)
+        out_i = np.full((rows, k), -1, np.int64)
+        kk = min(k, d2.shape[1])
+        if kk == 0:
+            return out_d, out_i
+        part = np.argpartition(d2, kk-1, axis=1)[:, :kk]
+        pd   = np.take_along_axis(d2, part, 1)
+        order = np.argsort(pd, axis=1)
+        part  = np.take_along_axis(part, order, 1)
+        out_d[:, :kk] = np.sqrt(np.take_along_axis(pd, order, 1))
+        out_i[:, :kk] = part if ids is None else ids[part]
+        return out_d, out_i
+
+    def search(self, probes, k: int = 1):
+        """Returns (distances, row ids), each shaped (n_probes, k)."""
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        return self._top_k(_sq_dists(probes, self.vectors, self.sq_norms), None, k)
+
+
+class IVFIndex(ExactIndex):
+    """Inverted-file approximate index in pure NumPy.
+
+    Encodings are bucketed by a k-means coarse quantizer; a probe only scans
+    the ``nprobe`` cells whose centroids are nearest to it. Small galleries
+    (below ``min_size``) are searched exactly.
+    """
+    def __init__(self, dim: int = 128, nlist: int = IVF_NLIST, nprobe: int = IVF_NPROBE,
+                 min_size: int = IVF_MIN_SIZE):
+        super().__init__(dim)
+        self.nlist, self.nprobe, self.min_size = nlist, nprobe, min_size
+        self.centroids = None
+        self.lists: list = []
+
+    def build(self, vectors):
+        super().build(vectors)
+        self._train()
+
+    def add(self, vectors):
+        start = len(self.vectors)
+        super().add(vectors)
+        if self.centroids is None:
+            if len(self.vectors) >= self.min_size:
+                self._train()
+            return
+        new_ids = np.arange(start, len(self.vectors))
+        cells   = self._assign(self.vectors[start:])
+        for c in np.unique(cells):
+            self.lists[c] = np.concatenate([self.lists[c], new_ids[cells == c]])
+
+    def _assign(self, vectors: np.ndarray) -> np.ndarray:
+        c_sq = (self.centroids * self.centroids).sum(1)
+        return np.concatenate([np.argmin(_sq_dists(vectors[i:i+4096], self.centroids, c_sq), axis=1)
+                               for i in range(0, len(vectors), 4096)] or [np.empty(0, np.int64)])
+
+    def _train(self, iters: int = 12):
+        n = len(self.vectors)
+        if n < self.min_size:
+            self.centroids, self.lists = None, []
+            return
+        nlist  = self.nlist or max(1, int(np.sqrt(n)))
+        rng    = np.random.default_rng(0)
+        sample = self.vectors[rng.choice(n, min(n, nlist*64), replace=False)]
+        self.centroids = sample[rng.choice(len(sample), nlist, replace=False)].copy()
+        for _ in range(iters):
+            cells  = self._assign(sample)
+            sums   = np.zeros_like(self.centroids)
+            np.add.at(sums, cells, sample)
+            counts = np.bincount(cells, minlength=nlist)
+            filled = counts > 0
+            self.centroids[filled] = sums[filled] / counts[filled, None]
+
+        cells  = self._assign(self.vectors)
+        order  = np.argsort(cells, kind="stable")
+        bounds = np.searchsorted(cells[order], np.arange(nlist+1))
+        self.lists = [order[bounds[c]:bounds[c+1]] for c in range(nlist)]
+
+    def search(self, probes, k: int = 1):
+        if self.centroids is None:
+            return super().search(probes, k)
+        probes = np.asarray(probes, dtype=np.float32).reshape(-1, self.vectors.shape[1])
+        c_sq   = (self.centroids * self.centroids).sum(1)
+        nprobe = min(self.nprobe, len(self.centroids))
+        cells  = np.argpartition(_sq_dists(probes, self.centroids, c_sq), nprobe-1, axis=1)[:, :nprobe]
+
+        out_d = np.full((len(probes), k), np.inf, np.float32)
+        out_i = np.full((len(probes), k), -1, np.int64)
+        for p, probe_cells in enumerate(cells):
+            cand = np.concatenate([self.lists[c] for c in probe_cells])
+            d2   = _sq_dists(probes[p:p+1], self.vectors[cand], self.sq_norms[cand])
+            out_d[p], out_i[p] = (a[0] for a in self._top_k(d2, cand, k))
+        return out_d, out_i
+
+
+INDEX_BACKENDS = {"exact": ExactIndex, "ivf": IVFIndex}
+
+def make_index(backend: str = INDEX_BACKEND, **kwargs):
+    if backend not in INDEX_BACKENDS:
+        raise ValueError(f"Unknown index backend {backend!r}; choose from {sorted(INDEX_BACKENDS)}")
+    return INDEX_BACKENDS[backend](**kwargs)
+
+
+# ── Encoding Store ────────────────────────────────────────────────────────────
+class EncodingStore:
+    """Persistent face encodings for known_faces/, keyed by path, mtime and content hash.
+
+    Encodings live in one float32 ``encodings.npy`` that is memory-mapped on
+    start-up; ``manifest.json`` maps each image to its row (-1 = no face found).
+    Only new or changed images are re-encoded and deleted ones are dropped.
+    """
+    def __init__(self, cache_dir: Path = ENCODING_CACHE_DIR, dim: int = 128):
+        self.dir           = cache_dir
+        self.matrix_path   = cache_dir / "encodings.npy"
+        self.manifest_path = cache_dir / "manifest.json"
+        self.dim           = dim
+        self.dir.mkdir(parents=True, exist_ok=True)
+        self.entries: dict = {}
+        self.matrix        = np.empty((0, dim), np.float32)
+        self._read()
+
+    def _read(self):
         try:
-            with open(LIVE_DATA_FILE, "w") as f:
-                json.dump(data, f, indent=2)
-        except Exception:
-            pass
+            with open(self.manifest_path) as f:
+                entries = json.load(f)["entries"]
+            matrix = np.load(self.matrix_path, mmap_mode="r")
+            rows   = [e["row"] for e in entries.values() if e["row"] >= 0]
+            if matrix.ndim == 2 and matrix.shape[1] == self.dim and max(rows, default=-1) < len(matrix):
+                self.entries, self.matrix = entries, matrix
+        except (OSError, ValueError, KeyError):
+            pass   # Missing or corrupt cache: everything gets re-encoded
+
+    @staticmethod
+    def _sha1(path: Path) -> str:
+        h = hashlib.sha1()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(1 << 20), b""):
+                h.update(chunk)
+        return h.hexdigest()
+
+    def sync(self, paths: list, encode_many) -> tuple[np.ndarray, list]:
+        """Bring the store in line with ``paths``; returns (matrix, path per row).
+
+        ``encode_many(paths)`` yields ``(path, encoding or None)`` and is only
+        given images that are new or whose content changed. When nothing
+        changed, the returned matrix is the memory map itself.
+        """
+        kept, stale = {}, []
+        for path in paths:
+            key, st = str(path), path.stat()
+            entry   = self.entries.get(key)
+            if entry and entry["mtime"] == st.st_mtime and entry["size"] == st.st_size:
+                kept[key] = entry
+                continue
+            digest = self._sha1(path)
+            if entry and entry["sha1"] == digest:
+                kept[key] = dict(entry, mtime=st.st_mtime, size=st.st_size)   # Touched, not changed
+            else:
+                stale.append((path, st, digest))
+
+        changed = bool(stale) or len(kept) != len(self.entries) or any(
+            kept[k] != self.entries[k] for k in kept)
+        if not changed:
+            return self.matrix, self._row_paths(self.entries)
+
+        # Rebuild: kept rows copied out of the old map, fresh ones streamed in
+        matrix  = np.empty((len(kept) + len(stale), self.dim), np.float32)
+        n, entries = 0, {}
+        for key, entry in kept.items():
+            if entry["row"] >= 0:
+                matrix[n] = self.matrix[entry["row"]]
+                entries[key] = dict(entry, row=n)
+                n += 1
+            else:
+                entries[key] = entry
+        meta = {str(path): (st, digest) for path, st, digest in stale}
+        for path, enc in encode_many([path for path, _, _ in stale]):
+            if enc is None and not path.exists():
+                continue   # Quarantined
+            st, digest = meta[str(path)]
+            if enc is not None:
+                matrix[n] = enc
+                n += 1
+            entries[str(path)] = {"mtime": st.st_mtime, "size": st.st_size, "sha1": digest,
+                                  "row": n - 1 if enc is not None else -1}
+        self._save(matrix[:n], entries)
+        return self.matrix, self._row_paths(self.entries)
+
+    def put(self, path: Path, encoding):
+        """Record a freshly registered image without re-encoding it on next start."""
+        st      = path.stat()
+        matrix  = np.concatenate([np.asarray(self.matrix), np.asarray(encoding, np.float32).reshape(1, -1)])
+        entries = dict(self.entries)
+        entries[str(path)] = {"mtime": st.st_mtime, "size": st.st_size,
+                              "sha1": self._sha1(path), "row": len(matrix) - 1}
+        self._save(matrix, entries)
+
+    def _save(self, matrix: np.ndarray, entries: dict):
+        # Write-then-rename so a crash never leaves a half-written cache
+        tmp = self.matrix_path.with_suffix(".tmp.npy")
+        np.save(tmp, matrix)
+        os.replace(tmp, self.matrix_path)
+        tmp = self.manifest_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "entries": entries}, f)
+        os.replace(tmp, self.manifest_path)
+        self.entries = entries
+        self.matrix  = np.load(self.matrix_path, mmap_mode="r")
+
+    @staticmethod
+    def _row_paths(entries: dict) -> list:
+        by_row = sorted((e["row"], k) for k, e in entries.items() if e["row"] >= 0)
+        return [Path(k) for _, k in by_row]
+
+
+def _enroll_worker(path: str) -> tuple[str, object]:
+    """Decode, detect and encode one image. Runs inside the enrollment pool."""
+    try:
+        img  = face_recognition.load_image_file(path)
+        locs = face_recognition.face_locations(img, model="hog")
+        if len(locs) != 1:
+            return ("no_face" if not locs else "multi_face"), None
+        return "ok", face_recognition.face_encodings(img, locs)[0]
+    except Exception:
+        return "unreadable", None
 
 
 # ── Face Database ─────────────────────────────────────────────────────────────
 class FaceDatabase:
-    def __init__(self):
+    """Enrolled faces: encoding index plus the person name of each row.
+
+    Registration (main thread) and searches (detect workers) take ``lock``,
+    so a search never sees the index and ``names`` at different sizes.
+    """
+    def __init__(self, backend: str = INDEX_BACKEND, workers: int = ENROLL_WORKERS):
         KNOWN_FACES_DIR.mkdir(exist_ok=True)
-        self.encodings: list = []
-        self.names:     list = []
+        self.workers        = workers or os.cpu_count() or 1
+        self.index          = make_index(backend)
+        self.store          = EncodingStore()
+        self.names:    list = []   # Person name for each row of the index
+        self._max_per_name  = 1
+        self.lock           = threading.Lock()
         self.load()
 
     def load(self):
-        self.encodings, self.names = [], []
-        for img_path in KNOWN_FACES_DIR.glob("*.jpg"):
-            img  = face_recognition.load_image_file(str(img_path))
-            encs = face_recognition.face_encodings(img)
-            if encs:
-                self.encodings.append(encs[0])
-                self.names.append(img_path.stem.split("_")[0])
-        print(f" Loaded {len(self.names)} known face(s): {self.names}")
+        t0 = time.time()
+        matrix, paths = self.store.sync(sorted(KNOWN_FACES_DIR.glob("*.jpg")), self._encode_many)
+        with self.lock:
+            self.index.build(matrix)
+            self.names = [p.stem.split("_")[0] for p in paths]
+            self._refresh_name_stats()
+        print(f" Loaded {len(self.names)} known face(s) in {time.time()-t0:.2f}s: {sorted(set(self.names))}")
+
+    def _encode_many(self, paths: list):
+        """Yields (path, encoding or None) in input order.
+
+        Large batches fan out over a process pool; only paths go out and only
+        128-d encodings come back, so memory stays flat however many images
+        there are. Photos without exactly one face are moved to QUARANTINE_DIR.
+        """
+        if not paths:
+            return
+        workers = min(self.workers, len(paths))
+        pool    = None
+        if workers > 1 and len(paths) >= ENROLL_PARALLEL_MIN:
+            pool    = multiprocessing.Pool(workers, maxtasksperchild=ENROLL_TASKS_PER_CHILD)
+            results = pool.imap(_enroll_worker, map(str, paths), chunksize=ENROLL_CHUNKSIZE)
+        else:
+            workers, results = 1, map(_enroll_worker, map(str, paths))
+
+        print(f" Enrolling {len(paths)} new/changed image(s) with {workers} worker(s)…")
+        t0, last, quarantined = time.time(), 0.0, {}
+        try:
+            for done, (path, (status, enc)) in enumerate(zip(paths, results), 1):
+                if status != "ok":
+                    quarantined[status] = quarantined.get(status, 0) + 1
+                    self._quarantine(path, status)
+                yield path, enc
+                now = time.time()
+                if now - last >= 1.0 or done == len(paths):
+                    last = now
+                    print(f"  {done}/{len(paths)}  {done/(now-t0+1e-9):.1f} img/s", end="\r", flush=True)
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+        elapsed = time.time() - t0
+        print(f"\n Enrolled {len(paths)} image(s) in {elapsed:.1f}s ({len(paths)/(elapsed+1e-9):.1f} img/s)")
+        if quarantined:
+            summary = ", ".join(f"{k}: {v}" for k, v in sorted(quarantined.items()))
+            print(f" Quarantined {sum(quarantined.values())} image(s) → {QUARANTINE_DIR}/ ({summary})")
+
+    @staticmethod
+    def _quarantine(path: Path, reason: str):
+        dest = QUARANTINE_DIR / reason
+        dest.mkdir(parents=True, exist_ok=True)
+        try:
+            os.replace(path, dest / path.name)
+        except OSError as e:
+            print(f" Could not quarantine {path.name}: {e}")
+
+    def _refresh_name_stats(self):
+        counts = {}
+        for n in self.names:
+            counts[n] = counts.get(n, 0) + 1
+        self._max_per_name = max(counts.values(), default=1)
 
     def register(self, frame: np.ndarray, name: str) -> bool:
         rgb  = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
@@ -220,44 +1366,1147 @@ class FaceDatabase:
         if not encs:
             print(" No face detected.")
             return False
+        if len(encs) > 1:
+            print(" Several faces in view — register one person at a time.")
+            return False
+        self.add(name, frame, encs[0])
+        return True
+
+    def add(self, name: str, image: np.ndarray, encoding) -> Path:
+        """Enrol one photo whose encoding is already known."""
         ts   = datetime.now().strftime("%Y%m%d_%H%M%S")
         path = KNOWN_FACES_DIR / f"{name}_{ts}.jpg"
-        cv2.imwrite(str(path), frame)
-        self.encodings.append(encs[0])
-        self.names.append(name)
+        cv2.imwrite(str(path), image)
+        self.store.put(path, encoding)
+        with self.lock:
+            self.index.add(encoding)
+            self.names.append(name)
+            self._refresh_name_stats()
         print(f" Registered '{name}'")
-        return True
+        return path
+
+    def search(self, encodings, k: int = INDEX_TOP_K) -> list[list[tuple[str, float]]]:
+        """Top-k distinct names per probe, each scored by its nearest enrolled photo."""
+        if len(encodings) == 0:
+            return []
+        with self.lock:
+            if not len(self.index):
+                return [[] for _ in encodings]
+            # Fetch enough neighbours that k distinct people survive aggregation
+            dists, ids = self.index.search(encodings, k * self._max_per_name)
+            names      = self.names
+        results = []
+        for row_d, row_i in zip(dists, ids):
+            best: dict = {}
+            for d, i in zip(row_d, row_i):
+                if i < 0:
+                    break
+                name = names[i]
+                if name not in best:
+                    best[name] = float(d)
+                    if len(best) == k:
+                        break
+            results.append(list(best.items()))
+        return results
+
+    def identify_many(self, encodings) -> list[tuple[str, float]]:
+        """Best (name, confidence) for every probe of a frame in one index search."""
+        out = []
+        for matches in self.search(encodings, k=1):
+            if not matches:
+                out.append(("Unknown", 0.0))
+                continue
+            name, dist = matches[0]
+            conf = max(0.0, 1.0 - dist)
+            out.append((name, conf) if dist <= FACE_MATCH_TOL else ("Unknown", conf))
+        return out
 
     def identify(self, encoding) -> tuple[str, float]:
-        if not self.encodings:
-            return "Unknown", 0.0
-        distances = face_recognition.face_distance(self.encodings, encoding)
-        best_idx  = int(np.argmin(distances))
-        best_dist = float(distances[best_idx])
-        conf      = max(0.0, 1.0 - best_dist)
-        if best_dist <= FACE_MATCH_TOL:
-            return self.names[best_idx], conf
-        return "Unknown", conf
+        return self.identify_many([encoding])[0]
+
+
+# ── Unknown Faces ─────────────────────────────────────────────────────────────
+class UnknownClusters:
+    """Online clustering of unknown-face encodings into persistent cluster IDs.
+
+    Each verified unknown encoding joins the cluster its track already
+    belongs to, else the cluster of its nearest member within
+    UNKNOWN_CLUSTER_TOL, else starts a new one. A cluster keeps a few member
+    encodings, its best-shot score and encoding, one JPEG (overwritten when
+    a better shot arrives) and whether its alert went out. State lives in
+    ``clusters.json`` + ``clusters.npz`` next to the images.
+    """
+    def __init__(self, directory: Path = UNKNOWN_FACES_DIR):
+        self.dir        = directory
+        self.meta_path  = directory / "clusters.json"
+        self.enc_path   = directory / "clusters.npz"
+        self.clusters   = {}   # id -> {"id", "first_seen", "last_seen", "sightings", "score",
+                               #        "image", "alerted", "members", "best_enc"}
+        self.next_id    = 1
+        self.dirty      = False
+        self.last_save  = 0.0
+        self._lock      = threading.Lock()
+        self.dir.mkdir(exist_ok=True)
+        self._read()
+
+    def _read(self):
+        try:
+            with open(self.meta_path) as f:
+                meta = json.load(f)
+            with np.load(self.enc_path) as encs:
+                clusters = {int(cid): dict(c, id=int(cid), members=encs[f"m{cid}"], best_enc=encs[f"b{cid}"])
+                            for cid, c in meta["clusters"].items()}
+            self.clusters, self.next_id = clusters, meta["next_id"]
+        except (OSError, ValueError, KeyError):
+            pass   # No or unreadable state: start with no clusters
+
+    def save(self, force: bool = False):
+        """Write-then-rename, at most every UNKNOWN_SAVE_SECS unless forced."""
+        with self._lock:
+            now = time.time()
+            if not self.dirty or (not force and now - self.last_save < UNKNOWN_SAVE_SECS):
+                return
+            meta   = {cid: {k: v for k, v in c.items() if k not in ("id", "members", "best_enc")}
+                      for cid, c in self.clusters.items()}
+            arrays = {}
+            for cid, c in self.clusters.items():
+                arrays[f"m{cid}"], arrays[f"b{cid}"] = c["members"], c["best_enc"]
+            self.dirty, self.last_save, next_id = False, now, self.next_id
+        tmp = self.enc_path.with_suffix(".tmp")
+        with open(tmp, "wb") as f:
+            np.savez(f, **arrays)
+        os.replace(tmp, self.enc_path)
+        tmp = self.meta_path.with_suffix(".tmp")
+        with open(tmp, "w") as f:
+            json.dump({"version": 1, "next_id": next_id, "clusters": meta}, f)
+        os.replace(tmp, self.meta_path)
+
+    def _nearest(self, enc: np.ndarray) -> tuple[int | None, float]:
+        if not self.clusters:
+            return None, float("inf")
+        ids   = np.concatenate([np.full(len(c["members"]), cid) for cid, c in self.clusters.items()])
+        dists = np.linalg.norm(np.concatenate([c["members"] for c in self.clusters.values()]) - enc, axis=1)
+        i     = int(np.argmin(dists))
+        return int(ids[i]), float(dists[i])
+
+    def observe(self, encoding, score: float, now: float, cluster_id: int | None = None) -> tuple[dict, bool, bool]:
+        """Adds one unknown sighting; returns (cluster, is this its new best shot, is its alert due)."""
+        enc = np.asarray(encoding, np.float32)
+        with self._lock:
+            c = self.clusters.get(cluster_id)
+            if c is None:
+                cid, dist = self._nearest(enc)
+                c = self.clusters[cid] if dist <= UNKNOWN_CLUSTER_TOL else None
+            if c is None:
+                cid = self.next_id
+                self.next_id += 1
+                c = self.clusters[cid] = {
+                    "id": cid, "first_seen": now, "last_seen": now, "sightings": 0, "score": 0.0,
+                    "image": str(self.dir / f"unknown_{cid:04d}.jpg"), "alerted": False,
+                    "members": enc[None], "best_enc": enc}
+                self._prune()
+            elif np.linalg.norm(c["members"] - enc, axis=1).min() > UNKNOWN_MEMBER_SPREAD:
+                c["members"] = np.vstack([c["members"], enc])[-UNKNOWN_CLUSTER_MEMBERS:]
+
+            c["sightings"] += 1
+            c["last_seen"]  = now
+            new_best = score > c["score"]
+            if new_best:
+                c["score"], c["best_enc"] = score, enc
+            alert = not c["alerted"] and c["sightings"] >= UNKNOWN_ALERT_SIGHTINGS
+            c["alerted"] = c["alerted"] or alert
+            self.dirty   = True
+            return c, new_best, alert
+
+    def _prune(self):
+        while len(self.clusters) > UNKNOWN_CLUSTER_MAX:
+            oldest = min(self.clusters.values(), key=lambda c: c["last_seen"])
+            del self.clusters[oldest["id"]]
+            try:
+                os.remove(oldest["image"])
+            except OSError:
+                pass
+
+    def promote(self, cluster_id: int, name: str, db: FaceDatabase) -> bool:
+        """Enrol a cluster as ``name``: its best shot moves into known_faces/ with its encoding."""
+        with self._lock:
+            c = self.clusters.get(cluster_id)
+        if c is None:
+            print(f" No unknown-face cluster #{cluster_id}")
+            return False
+        img = cv2.imread(c["image"])
+        if img is None:
+            print(f" Cluster #{cluster_id} has no saved snapshot yet")
+            return False
+        db.add(name, img, c["best_enc"])
+        with self._lock:
+            self.clusters.pop(cluster_id, None)
+            self.dirty = True
+        try:
+            os.remove(c["image"])
+        except OSError:
+            pass
+        self.save(force=True)
+        return True
+
+    def summary(self) -> list[dict]:
+        """Clusters without their encodings, most recently seen first."""
+        with self._lock:
+            rows = [{k: v for k, v in c.items() if k not in ("members", "best_enc")}
+                    for c in self.clusters.values()]
+        return sorted(rows, key=lambda c: -c["last_seen"])
+
+    def report(self) -> dict:
+        with self._lock:
+            return {"clusters": len(self.clusters),
+                    "alerted":  sum(c["alerted"] for c in self.clusters.values())}
 
 
 # ── Attendance Logger ─────────────────────────────────────────────────────────
-class AttendanceLogger:
-    def __init__(self):
-        self.logged_today: set = set()
-        if not ATTENDANCE_FILE.exists():
-            with open(ATTENDANCE_FILE, "w", newline="") as f:
-                csv.writer(f).writerow(["Name","Date","Time","Emotion","Age","Gender"])
+class EventStore:
+    """SQLite (WAL) store for attendance rows and per-track sightings.
+
+    Callers only enqueue rows; one writer thread owns the connection and
+    commits each batch in a single transaction, so the render loop never
+    waits on disk. WAL mode lets the dashboard read while we write.
+    """
+    SCHEMA = """
+        CREATE TABLE IF NOT EXISTS attendance (
+            id INTEGER PRIMARY KEY, name TEXT NOT NULL, date TEXT NOT NULL, time TEXT NOT NULL,
+            emotion TEXT, age TEXT, gender TEXT, camera TEXT);
+        CREATE INDEX IF NOT EXISTS attendance_name   ON attendance (name COLLATE NOCASE, id);
+        CREATE INDEX IF NOT EXISTS attendance_date   ON attendance (date, id);
+        CREATE INDEX IF NOT EXISTS attendance_camera ON attendance (camera, id);
+
+        CREATE TABLE IF NOT EXISTS events (
+            id INTEGER PRIMARY KEY, ts REAL NOT NULL, kind TEXT NOT NULL, name TEXT, camera TEXT,
+            track INTEGER, conf REAL, emotion TEXT, age TEXT, gender TEXT);
+        CREATE INDEX IF NOT EXISTS events_ts     ON events (ts);
+        CREATE INDEX IF NOT EXISTS events_name   ON events (name COLLATE NOCASE, ts);
+        CREATE INDEX IF NOT EXISTS events_camera ON events (camera, ts);
+        CREATE INDEX IF NOT EXISTS events_kind   ON events (kind, ts);
+
+        -- camera / person '*' rows hold the totals, so any query reads one series
+        CREATE TABLE IF NOT EXISTS emotion_rollup (
+            res TEXT NOT NULL, camera TEXT NOT NULL, person TEXT NOT NULL, bucket INTEGER NOT NULL,
+            emotion TEXT NOT NULL, seconds REAL NOT NULL,
+            PRIMARY KEY (res, camera, person, bucket, emotion)) WITHOUT ROWID;
+    """
+    INSERT = {
+        "attendance": "INSERT INTO attendance (name, date, time, emotion, age, gender, camera) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?)",
+        "events":     "INSERT INTO events (ts, kind, name, camera, track, conf, emotion, age, gender) "
+                      "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+        "rollup":     "INSERT INTO emotion_rollup (res, camera, person, bucket, emotion, seconds) "
+                      "VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT (res, camera, person, bucket, emotion) "
+                      "DO UPDATE SET seconds = seconds + excluded.seconds",
+    }
+    CSV_HEADER = ["Name", "Date", "Time", "Emotion", "Age", "Gender", "Camera"]
+
+    def __init__(self, path: Path = EVENTS_DB):
+        self.path    = path
+        self.queue   = queue.Queue(EVENT_QUEUE_SIZE)
+        self.overflow: list = []
+        self.overflow_lock  = threading.Lock()
+        self.stats   = StageStats("events")   # Commit latency per batch, dropped sightings
+        conn = self.connect()   # Schema exists before anyone reads or enqueues
+        conn.executescript(self.SCHEMA)
+        conn.close()
+        self.thread = threading.Thread(target=self._run, name="event-store", daemon=True)
+        self.thread.start()
+
+    def connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")   # Safe with WAL; no fsync per commit
+        return conn
+
+    def put(self, table: str, row: tuple, droppable: bool = True):
+        """Never blocks: when the queue is full a droppable row (a sighting) is
+        dropped, anything else waits in an overflow list for the next batch."""
+        try:
+            self.queue.put_nowait((table, row))
+        except queue.Full:
+            if droppable:
+                self.stats.drop()
+            else:
+                with self.overflow_lock:
+                    self.overflow.append((table, row))
 
-    def log(self, name, emotion, age, gender):
+    def _prune(self, conn: sqlite3.Connection):
+        """Drops rollup buckets older than their resolution's retention."""
+        now = time.time()
+        with conn:
+            for res, keep in ROLLUP_RETENTION.items():
+                if keep is not None:
+                    conn.execute("DELETE FROM emotion_rollup WHERE res = ? AND bucket < ?", (res, now - keep))
+
+    def _run(self):
+        conn, done = self.connect(), False
+        self._prune(conn)
+        pruned = time.time()
+        while not done:
+            item = self.queue.get()
+            if item is None:
+                break
+            batch    = [item]
+            deadline = time.time() + EVENT_BATCH_MS / 1000
+            while len(batch) < EVENT_BATCH_MAX:
+                try:
+                    item = self.queue.get(timeout=max(0.0, deadline - time.time()))
+                except queue.Empty:
+                    break
+                if item is None:
+                    done = True
+                    break
+                batch.append(item)
+            with self.overflow_lock:
+                batch, self.overflow = self.overflow + batch, []
+            t0 = time.time()
+            try:
+                with conn:
+                    for table in self.INSERT:
+                        rows = [row for t, row in batch if t == table]
+                        if rows:
+                            conn.executemany(self.INSERT[table], rows)
+                self.stats.record(time.time() - t0)
+                if time.time() - pruned > 3600:
+                    self._prune(conn)
+                    pruned = time.time()
+            except sqlite3.Error as e:
+                print(f"  Event store write failed ({len(batch)} rows): {e}")
+        conn.close()
+
+    def close(self):
+        """Flushes everything queued so far and stops the writer."""
+        self.queue.put(None)
+        self.thread.join()
+
+    def import_csv(self, path: Path) -> int:
+        """Loads a legacy attendance CSV into an empty attendance table."""
+        conn = self.connect()
+        try:
+            if not path.exists() or conn.execute("SELECT 1 FROM attendance LIMIT 1").fetchone():
+                return 0
+            with open(path, newline="") as f:
+                rows = [(r.get("Name"), r.get("Date"), r.get("Time"), r.get("Emotion"), r.get("Age"),
+                         r.get("Gender"), r.get("Camera")) for r in csv.DictReader(f) if r.get("Name")]
+            with conn:
+                conn.executemany(self.INSERT["attendance"], rows)
+            return len(rows)
+        finally:
+            conn.close()
+
+    def export_csv(self, path: Path) -> int:
+        """Writes the attendance table to ``path`` as CSV; returns the row count."""
+        conn, count = self.connect(), 0
+        with open(path, "w", newline="") as f:
+            writer = csv.writer(f)
+            writer.writerow(self.CSV_HEADER)
+            cur = conn.execute("SELECT name, date, time, emotion, age, gender, camera "
+                               "FROM attendance ORDER BY id")
+            while rows := cur.fetchmany(10_000):
+                writer.writerows(rows)
+                count += len(rows)
+        conn.close()
+        return count
+
+
+class AttendanceLogger:
+    """First sighting of each person per day, plus throttled per-track sightings."""
+    def __init__(self, store: EventStore | None = None):
+        self.store = store or EventStore()
+        imported   = self.store.import_csv(ATTENDANCE_FILE)
+        if imported:
+            print(f" Imported {imported} attendance rows from {ATTENDANCE_FILE}")
+        today = datetime.now().strftime("%Y-%m-%d")
+        conn = self.store.connect()   # Restarting mid-day must not log people twice
+        self.logged_today: set = {n for (n,) in conn.execute(
+            "SELECT DISTINCT name FROM attendance WHERE date = ?", (today,))}
+        conn.close()
+        self.today        = today
+        self.last_sighting: dict = {}   # (camera, track id) -> time of last event
+
+    def log(self, name, emotion, age, gender, camera: str | None = None):
+        now  = datetime.now()
+        date = now.strftime("%Y-%m-%d")
+        if date != self.today:
+            self.today = date
+            self.logged_today.clear()
         if name == "Unknown" or name in self.logged_today:
             return
-        now = datetime.now()
         self.logged_today.add(name)
-        with open(ATTENDANCE_FILE, "a", newline="") as f:
-            csv.writer(f).writerow([name, now.strftime("%Y-%m-%d"),
-                                    now.strftime("%H:%M:%S"), emotion, age, gender])
+        self.store.put("attendance", (name, date, now.strftime("%H:%M:%S"),
+                                      emotion, age, gender, camera), droppable=False)
         print(f" Logged: {name}")
 
+    def sighting(self, camera: str, track_id: int, name: str, conf: float, emotion, age, gender):
+        """Records a recognition (or unknown) event for a track every SIGHTING_EVERY_S."""
+        now = time.time()
+        key = (camera, track_id)
+        if now - self.last_sighting.get(key, 0.0) < SIGHTING_EVERY_S:
+            return
+        self.last_sighting[key] = now
+        kind = "unknown" if name == "Unknown" else "recognized"
+        self.store.put("events", (now, kind, None if kind == "unknown" else name, camera, track_id,
+                                  round(float(conf), 3), emotion, age, gender))
+        if len(self.last_sighting) > 1000:   # Forget tracks that are long gone
+            self.last_sighting = {k: t for k, t in self.last_sighting.items()
+                                  if now - t < 10 * SIGHTING_EVERY_S}
+
+    def close(self):
+        self.store.close()
+
+
+class EmotionRollup:
+    """Per-track emotion dwell time, pre-aggregated into minute/hour/day buckets.
+
+    observe() runs per face per rendered frame and only credits the time since
+    that track was last seen to its current emotion in an in-memory minute
+    bucket. Every ROLLUP_FLUSH_SECS the deltas are upserted into each
+    resolution, for the camera/person pair and for the '*' totals, so reads
+    never have to scan raw events.
+    """
+    def __init__(self, store: EventStore):
+        self.store      = store
+        self.last_seen: dict = {}   # (camera, track id) -> time
+        self.pending:   dict = {}   # (minute bucket, camera, person, emotion) -> seconds
+        self.session    = {e: 0.0 for e in WMO_EMOTIONS}   # Dwell seconds since start
+        self.last_flush = time.time()
+
+    def observe(self, camera: str, track_id: int, person: str, emotion: str, now: float):
+        key  = (camera, track_id)
+        last = self.last_seen.get(key)
+        self.last_seen[key] = now
+        if last is None or emotion not in self.session:
+            return
+        dt = min(now - last, ROLLUP_MAX_GAP)
+        self.session[emotion] += dt
+        bucket = int(now // 60) * 60
+        pkey   = (bucket, camera, person, emotion)
+        self.pending[pkey] = self.pending.get(pkey, 0.0) + dt
+        if now - self.last_flush >= ROLLUP_FLUSH_SECS:
+            self.flush(now)
+
+    def flush(self, now: float | None = None):
+        now = now or time.time()
+        self.last_flush = now
+        pending, self.pending = self.pending, {}
+        rows: dict = {}
+        for (minute, camera, person, emotion), secs in pending.items():
+            for res, width in ROLLUP_RESOLUTIONS.items():
+                bucket = minute // width * width
+                for cam, who in ((camera, person), (camera, "*"), ("*", person), ("*", "*")):
+                    k = (res, cam, who, bucket, emotion)
+                    rows[k] = rows.get(k, 0.0) + secs
+        for k, secs in rows.items():
+            self.store.put("rollup", (*k, round(secs, 3)), droppable=False)
+        # Tracks not seen for a while will start over if they come back
+        self.last_seen = {k: t for k, t in self.last_seen.items() if now - t < 60}
+
+
+# ── Batched Attribute Analysis ────────────────────────────────────────────────
+class BatchAttributeAnalyzer:
+    """Runs DeepFace's emotion, age and gender models once per batch of crops.
+
+    DeepFace.analyze re-detects the face, preprocesses and dispatches each model
+    separately for every image. Our crops are already located by the detector,
+    so they are preprocessed together and every attribute model sees a single
+    stacked tensor. Falls back to per-crop DeepFace.analyze when the installed
+    DeepFace does not expose the attribute models.
+    """
+    def __init__(self):
+        self.models = None
+        try:
+            self.models = {
+                "emotion": self._build("Emotion"),
+                "age":     self._build("Age"),
+                "gender":  self._build("Gender"),
+            }
+        except Exception as e:
+            print(f" Batched analysis unavailable ({e}) — using per-face DeepFace.analyze")
+
+    @staticmethod
+    def _build(name: str):
+        try:
+            client = DeepFace.build_model(name, task="facial_attribute")
+        except TypeError:
+            client = DeepFace.build_model(name)    # Older DeepFace: no task argument
+        return getattr(client, "model", client)   # Unwrap to the Keras model
+
+    @staticmethod
+    def _letterbox(crop: np.ndarray, size: int) -> np.ndarray:
+        """Pad-resize a BGR crop to size x size in [0, 1], as DeepFace does."""
+        h, w = crop.shape[:2]
+        f    = size / max(h, w)
+        resized = cv2.resize(crop, (max(1, int(w*f)), max(1, int(h*f))))
+        rh, rw  = resized.shape[:2]
+        out = np.zeros((size, size, 3), np.float32)
+        y, x = (size-rh)//2, (size-rw)//2
+        out[y:y+rh, x:x+rw] = resized
+        return out / 255.0
+
+    def analyze(self, crops: list) -> list:
+        """Returns one analysis_cache entry (or None on failure) per crop."""
+        if not crops:
+            return []
+        if self.models is None:
+            return [self._analyze_single(c) for c in crops]
+        try:
+            faces = np.stack([self._letterbox(c, 224) for c in crops])
+            gray  = np.stack([cv2.resize(cv2.cvtColor(f, cv2.COLOR_BGR2GRAY), (48,48))
+                              for f in faces])[..., None]
+            emo   = np.asarray(self.models["emotion"].predict_on_batch(gray))
+            ages  = np.asarray(self.models["age"].predict_on_batch(faces))
+            gens  = np.asarray(self.models["gender"].predict_on_batch(faces))
+        except Exception:
+            return [self._analyze_single(c) for c in crops]
+
+        results = []
+        for e, a, g in zip(emo, ages, gens):
+            scores = 100 * e / max(float(e.sum()), 1e-9)
+            results.append({
+                "emotion":        DEEPFACE_EMOTIONS[int(np.argmax(e))],
+                "emotion_scores": {emo_name: float(sc) for emo_name, sc in zip(DEEPFACE_EMOTIONS, scores)},
+                "age":            str(int(round(float(np.dot(a, np.arange(len(a))))))),
+                "gender":         "Woman" if int(np.argmax(g)) == 0 else "Man",
+                "gender_scores":  {"Woman": 100 * float(g[0]) / max(float(g.sum()), 1e-9),
+                                   "Man":   100 * float(g[1]) / max(float(g.sum()), 1e-9)},
+            })
+        return results
+
+    @staticmethod
+    def _analyze_single(crop: np.ndarray):
+        try:
+            r = DeepFace.analyze(crop, actions=["emotion","age","gender"],
+                                 enforce_detection=False, silent=True)[0]
+            return {
+                "emotion":        r["dominant_emotion"],
+                "emotion_scores": r["emotion"],
+                "age":            str(r["age"]),
+                "gender":         r["dominant_gender"],
+                "gender_scores":  r.get("gender"),
+            }
+        except Exception:
+            return None
+
+
+# ── Attribute Fusion ──────────────────────────────────────────────────────────
+def _blend(prev: float | None, sample: float | None, w: float) -> float | None:
+    if prev is None or sample is None:
+        return sample if prev is None else prev
+    return (1.0 - w) * prev + w * sample
+
+
+def fuse_attributes(prev: dict | None, sample: dict, now: float) -> dict:
+    """Folds one analysis result into a track's running attribute estimate.
+
+    Emotion scores, age and P(man) are exponentially weighted with a time
+    constant, so a sample's weight depends on the time since the previous
+    one rather than on how often the track is analysed. The shown emotion
+    only changes once another emotion leads it by FUSION_HYSTERESIS points.
+    """
+    scores = {e: float((sample.get("emotion_scores") or {}).get(e, 0.0)) for e in DEEPFACE_EMOTIONS}
+    try:
+        age = float(sample.get("age"))
+    except (TypeError, ValueError):
+        age = None
+    genders = sample.get("gender_scores")
+    if genders:
+        p_man = float(genders.get("Man", 0.0)) / 100
+    else:
+        p_man = {"Man": 1.0, "Woman": 0.0}.get(sample.get("gender"))
+
+    if prev is None or "t" not in prev:
+        fused, samples = scores, 1
+        label = max(fused, key=fused.get) if any(fused.values()) else sample.get("emotion", "neutral")
+    else:
+        dt      = max(now - prev["t"], 0.0)
+        w       = 1.0 - float(np.exp(-dt / FUSION_EMOTION_TAU))
+        fused   = {e: (1.0 - w) * prev["emotion_scores"].get(e, 0.0) + w * scores[e] for e in DEEPFACE_EMOTIONS}
+        age     = _blend(prev["age_est"], age, 1.0 - float(np.exp(-dt / FUSION_AGE_TAU)))
+        p_man   = _blend(prev["p_man"], p_man, 1.0 - float(np.exp(-dt / FUSION_GENDER_TAU)))
+        samples = prev["samples"] + 1
+        label   = prev["emotion"]
+        top     = max(fused, key=fused.get)
+        if top != label and fused[top] - fused.get(label, 0.0) >= FUSION_HYSTERESIS:
+            label = top
+
+    ranked = sorted(fused.values(), reverse=True)
+    return {
+        "emotion":        label,
+        "emotion_scores": fused,
+        "emotion_conf":   fused.get(label, 0.0) / 100,
+        "margin":         ranked[0] - ranked[1],
+        "age":            str(int(round(age))) if age is not None else "?",
+        "age_est":        age,
+        "gender":         "?" if p_man is None else ("Man" if p_man >= 0.5 else "Woman"),
+        "gender_conf":    0.0 if p_man is None else abs(p_man - 0.5) * 2,
+        "p_man":          p_man,
+        "samples":        samples,
+        "t":              now,
+    }
+
+
+def fusion_stable(entry: dict) -> bool:
+    """True once a track's estimate is settled enough to be analysed less often."""
+    return entry.get("samples", 0) >= FUSION_STABLE_SAMPLES and entry.get("margin", 0.0) >= FUSION_STABLE_MARGIN
+
+
+# ── Analysis Scheduler ────────────────────────────────────────────────────────
+class AnalysisScheduler:
+    """Chooses which tracks get attribute analysis on each frame, within a budget.
+
+    Every camera frame adds ANALYSIS_BUDGET_MS to that camera's token bucket
+    and each chosen crop spends the measured per-crop model cost, so the
+    work is spread evenly over frames instead of arriving in bursts. Tracks
+    are ranked by: new first, then how stale and how unsure their fused
+    estimate is, scaled down for small or low-quality faces. A track that
+    would be picked but has no fresh, unanalysed best shot is passed over
+    without spending budget; it counts as one avoided model call until it is
+    next analysed, however many frames it waits.
+    """
+    def __init__(self, budget_ms: float = ANALYSIS_BUDGET_MS):
+        self.budget_ms = budget_ms
+        self.cost_ms   = float(ANALYSIS_COST_MS)   # EWMA of model ms per crop
+        self.tokens: dict = {}                     # camera -> ms available
+        self.frames    = 0
+        self.chosen    = 0
+        self.avoided   = 0
+        self.passed: dict = {}                     # camera -> keys passed over and not analysed since
+        self.mean_age  = 0.0                       # EWMA of result age over visible tracks
+        self._lock     = threading.Lock()
+
+    @staticmethod
+    def priority(entry: dict | None, width: int, quality: float, now: float) -> float:
+        size = min(max(width / ANALYSIS_FULL_SIZE_PX, 0.3), 1.0) * quality
+        if entry is None:
+            return ANALYSIS_NEW_PRIORITY * size
+        t = entry.get("t", entry.get("failed_t", 0.0))   # failed_t: analysis returned nothing
+        if now - t < ANALYSIS_MIN_GAP:
+            return 0.0
+        target = ANALYSIS_TARGET_AGE * (FUSION_STABLE_STRIDE if fusion_stable(entry) else 1)
+        stale  = (now - t) / target
+        unsure = 1.0 - min(entry.get("margin", 0.0) / FUSION_STABLE_MARGIN, 1.0)
+        return (stale + unsure) * size
+
+    def select(self, camera: str, candidates: list, cache: dict, pending: dict, now: float) -> list:
+        """Keys of the candidates to analyse now.
+
+        ``candidates`` are dicts with "key", "width" and optionally "quality"
+        (0..1; 0 = no usable crop). Call with the cache lock held.
+        """
+        with self._lock:
+            cost   = self.cost_ms
+            tokens = min(self.tokens.get(camera, 0.0) + self.budget_ms, max(2 * self.budget_ms, cost))
+            ranked, ages = [], []
+            for c in candidates:
+                key   = c["key"]
+                entry = cache.get(key)
+                if entry is not None and "t" in entry:
+                    ages.append(now - entry["t"])
+                queued = pending.get(key)
+                if queued is not None and now - queued < ANALYSIS_PENDING_TTL:
+                    continue
+                quality = c.get("quality", 1.0)
+                p = self.priority(entry, c["width"], quality or 1.0, now)
+                if p > 0:
+                    ranked.append((p, key, quality > 0))
+            ranked.sort(key=lambda pk: -pk[0])
+            chosen = []
+            keys   = {c["key"] for c in candidates}
+            passed = self.passed.get(camera, set()) & keys
+            for _, key, usable in ranked:
+                if tokens < cost:
+                    break
+                if not usable:
+                    if key not in passed:
+                        self.avoided += 1
+                        passed.add(key)
+                    continue
+                tokens -= cost
+                chosen.append(key)
+            self.passed[camera] = passed.difference(chosen)
+            self.tokens[camera] = tokens
+            self.frames += 1
+            self.chosen += len(chosen)
+            if ages:
+                self.mean_age = 0.95 * self.mean_age + 0.05 * (sum(ages) / len(ages))
+            return chosen
+
+    def record(self, elapsed_ms: float, crops: int):
+        """Feeds back the measured cost of one analysed batch."""
+        if crops:
+            with self._lock:
+                self.cost_ms = 0.8 * self.cost_ms + 0.2 * (elapsed_ms / crops)
+
+    def report(self) -> dict:
+        with self._lock:
+            return {"budget_ms": self.budget_ms, "cost_ms": round(self.cost_ms, 1),
+                    "per_frame": round(self.chosen / self.frames, 2) if self.frames else 0.0,
+                    "analysed": self.chosen, "avoided": self.avoided,
+                    "mean_age_s": round(self.mean_age, 2)}
+
+
+# ── Face Tracker ──────────────────────────────────────────────────────────────
+def iou_matrix(a, b) -> np.ndarray:
+    """IoU between every pair of (top, right, bottom, left) boxes."""
+    a = np.asarray(a, float).reshape(-1, 4)
+    b = np.asarray(b, float).reshape(-1, 4)
+    top    = np.maximum(a[:, None, 0], b[None, :, 0])
+    right  = np.minimum(a[:, None, 1], b[None, :, 1])
+    bottom = np.minimum(a[:, None, 2], b[None, :, 2])
+    left   = np.maximum(a[:, None, 3], b[None, :, 3])
+    inter  = np.clip(right-left, 0, None) * np.clip(bottom-top, 0, None)
+    area_a = (a[:, 1]-a[:, 3]) * (a[:, 2]-a[:, 0])
+    area_b = (b[:, 1]-b[:, 3]) * (b[:, 2]-b[:, 0])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def linear_assignment(cost) -> list[tuple[int, int]]:
+    """Minimum-cost (row, col) matching via the Hungarian algorithm, O(n^3).
+
+    Rectangular matrices are fine; the smaller side is fully matched.
+    """
+    cost = np.asarray(cost, float)
+    if cost.size == 0:
+        return []
+    transposed = cost.shape[0] > cost.shape[1]
+    if transposed:
+        cost = cost.T
+    n, m = cost.shape
+    c    = cost.tolist()
+    inf  = float("inf")
+    u, v = [0.0]*(n+1), [0.0]*(m+1)
+    p, way = [0]*(m+1), [0]*(m+1)   # p[j]: row matched to column j (1-based, 0 = free)
+    for i in range(1, n+1):
+        p[0], j0 = i, 0
+        minv, used = [inf]*(m+1), [False]*(m+1)
+        while True:
+            used[j0] = True
+            i0, delta, j1 = p[j0], inf, 0
+            row = c[i0-1]
+            for j in range(1, m+1):
+                if not used[j]:
+                    cur = row[j-1] - u[i0] - v[j]
+                    if cur < minv[j]:
+                        minv[j], way[j] = cur, j0
+                    if minv[j] < delta:
+                        delta, j1 = minv[j], j
+            for j in range(m+1):
+                if used[j]:
+                    u[p[j]] += delta
+                    v[j]    -= delta
+                else:
+                    minv[j] -= delta
+            j0 = j1
+            if p[j0] == 0:
+                break
+        while j0:
+            j1 = way[j0]
+            p[j0], j0 = p[j1], j1
+    pairs = [(p[j]-1, j-1) for j in range(1, m+1) if p[j]]
+    return sorted((b, a) for a, b in pairs) if transposed else sorted(pairs)
+
+
+def appearance_signature(gray: np.ndarray, loc, size: int = 16):
+    """Zero-mean, unit-norm thumbnail of a face box — a cheap appearance cue."""
+    top, right, bottom, left = loc
+    h, w  = gray.shape[:2]
+    patch = gray[max(0,top):min(h,bottom), max(0,left):min(w,right)]
+    if patch.size == 0:
+        return None
+    v = cv2.resize(patch, (size, size), interpolation=cv2.INTER_AREA).astype(np.float32).ravel()
+    v -= v.mean()
+    n  = float(np.linalg.norm(v))
+    return v / n if n > 1e-6 else None
+
+
+def signature_drift(a, b) -> float:
+    """0 for identical appearance, up to 2 for inverted; 0 when either is missing."""
+    if a is None or b is None:
+        return 0.0
+    return 1.0 - float(a @ b)
+
+
+def crop_quality(gray: np.ndarray, loc) -> dict:
+    """Size, sharpness and exposure factors in 0..1 for one face box (any 0 = unusable)."""
+    top, right, bottom, left = loc
+    side = min(bottom - top, right - left)
+    size = float(np.clip((side - QUALITY_MIN_SIZE_PX) / (QUALITY_GOOD_SIZE_PX - QUALITY_MIN_SIZE_PX), 0, 1))
+    h, w  = gray.shape[:2]
+    patch = gray[max(0,top):min(h,bottom), max(0,left):min(w,right)]
+    if size <= 0 or patch.size == 0:
+        return {"size": 0.0}
+    patch = cv2.resize(patch, (64, 64), interpolation=cv2.INTER_AREA)
+    sharp = float(cv2.Laplacian(patch, cv2.CV_32F).var())
+    mean  = float(patch.mean())
+    return {"size":      size,
+            "sharpness": float(np.clip((sharp - QUALITY_MIN_SHARPNESS)
+                                       / (QUALITY_GOOD_SHARPNESS - QUALITY_MIN_SHARPNESS), 0, 1)),
+            "exposure":  min(1.0, mean / QUALITY_DARK, (255 - mean) / (255 - QUALITY_BRIGHT))}
+
+
+def pose_factor(landmarks: dict) -> float | None:
+    """1 for a frontal face falling to 0 at QUALITY_MAX_YAW; None without eye/nose landmarks."""
+    try:
+        left  = np.mean(landmarks["left_eye"], axis=0)
+        right = np.mean(landmarks["right_eye"], axis=0)
+        nose  = np.mean(landmarks["nose_tip"], axis=0)
+    except (KeyError, TypeError, ValueError):
+        return None
+    axis = right - left
+    dist = float(np.linalg.norm(axis))
+    if dist < 1e-6:
+        return None
+    yaw = abs(float((nose - (left + right) / 2) @ axis)) / dist**2
+    return float(np.clip(1 - yaw / QUALITY_MAX_YAW, 0, 1))
+
+
+def quality_score(factors: dict) -> float:
+    """Geometric mean of the factors: one bad factor drags the score down, a zero rejects."""
+    vals = list(factors.values())
+    return float(np.prod(vals) ** (1 / len(vals))) if vals else 0.0
+
+
+class Track:
+    """One tracked face: constant-velocity box, appearance signature, identity."""
+    def __init__(self, track_id: int, box, now: float):
+        self.id        = track_id
+        self.box       = np.asarray(box, float)   # Last measured (top, right, bottom, left)
+        self.velocity  = np.zeros(4)              # Pixels per second
+        self.embedding = None                     # Encoding from the last verification
+        self.t_seen    = now
+        self.hits      = 1
+        self.misses    = 0
+        self.signature = None
+        # Identity, accumulated over verifications
+        self.name            = "Unknown"
+        self.conf            = 0.0
+        self.votes: dict     = {}     # name -> decayed sum of match confidences
+        self.name_conf: dict = {}     # name -> latest match confidence
+        self.agreement       = 0.0
+        self.verifications   = 0
+        self.t_verified      = None
+        self.ref_signature   = None   # Appearance at the last verification
+        # Best recent crop: {"score", "crop" (BGR, padded), "loc" (box within crop), "t",
+        # and "encoded"/"analysed" once a model has seen it}
+        self.quality = 0.0
+        self.shot    = None
+        self.cluster = None   # Unknown-face cluster id, once this track was verified unknown
+        self.waiting = False  # Identity check due but no usable shot (counted once as avoided)
+
+    def offer_shot(self, score: float, frame: np.ndarray, loc, now: float):
+        """Keep this crop if it is at least nearly as good as the current best shot."""
+        self.quality = score
+        if score < QUALITY_MIN_SCORE:
+            return
+        if (self.shot is not None and now - self.shot["t"] <= QUALITY_SHOT_SECS
+                and score < QUALITY_SHOT_KEEP * self.shot["score"]):
+            return
+        top, right, bottom, left = loc
+        y0, x0 = max(0, top-20), max(0, left-20)
+        crop   = frame[y0:bottom+20, x0:right+20]
+        if crop.size > 0:
+            # Copy: frames are recycled (ring slots) and drawn on
+            self.shot = {"score": score, "crop": crop.copy(), "t": now,
+                         "loc": (top-y0, right-x0, bottom-y0, left-x0)}
+
+    def best_shot(self, now: float) -> dict | None:
+        if self.shot is not None and now - self.shot["t"] <= QUALITY_SHOT_SECS:
+            return self.shot
+        return None
+
+    def predict(self, now: float) -> np.ndarray:
+        return self.box + self.velocity * (now - self.t_seen)
+
+    def loc(self, now: float) -> tuple:
+        return tuple(int(round(x)) for x in self.predict(now))
+
+    def update(self, box, now: float, signature=None):
+        box = np.asarray(box, float)
+        dt  = now - self.t_seen
+        if dt > 0:
+            self.velocity = 0.5*self.velocity + 0.5*(box - self.box) / dt
+        self.box, self.t_seen = box, now
+        if signature is not None:
+            self.signature = signature
+        self.hits  += 1
+        self.misses = 0
+
+    def observe_identity(self, name: str, conf: float, now: float):
+        """Fold one db lookup into the track's accumulated identity."""
+        for k in self.votes:
+            self.votes[k] *= IDENTITY_VOTE_DECAY
+        self.votes[name]     = self.votes.get(name, 0.0) + max(conf, 0.05)
+        self.name_conf[name] = conf
+        best = max(self.votes, key=self.votes.get)
+        self.name          = best
+        self.conf          = self.name_conf[best]
+        self.agreement     = self.votes[best] / sum(self.votes.values())
+        self.verifications += 1
+        self.t_verified    = now
+        self.waiting       = False
+        self.ref_signature = self.signature
+
+    def identity_due(self, now: float) -> bool:
+        """True when the cached identity should be re-checked with a fresh encoding."""
+        if self.t_verified is None:
+            return True
+        confirmed = (self.verifications >= IDENTITY_CONFIRM_VOTES
+                     and self.agreement >= IDENTITY_MIN_AGREEMENT)
+        interval  = IDENTITY_REVERIFY_SECS if confirmed else IDENTITY_UNSURE_SECS
+        return (now - self.t_verified >= interval
+                or signature_drift(self.signature, self.ref_signature) > IDENTITY_DRIFT)
+
+
+class FaceTracker:
+    """Multi-face tracker with stable IDs.
+
+    Detections are associated to tracks globally (Hungarian) on a cost mixing
+    IoU against each track's predicted box with appearance-signature drift.
+    Encodings are only computed after association (from best shots), so
+    appearance is also what re-acquires a track that was missed: a detection
+    with no box overlap may still take over a missed track whose signature
+    it closely matches, keeping its ID and accumulated identity. Tracks unseen for TRACK_MAX_MISSES detection rounds are evicted; their
+    IDs are never reused. Between detection frames, ``predict`` propagates
+    the live tracks without running the detector.
+    """
+    def __init__(self):
+        self.tracks: dict  = {}
+        self.evicted: list = []   # IDs dropped since the last pop_evicted()
+        self._next_id      = 1
+
+    def predict(self, now: float) -> list:
+        """Tracks matched in the last detection round, for predict-only frames."""
+        return [t for t in self.tracks.values() if t.misses == 0]
+
+    def update(self, boxes: list, now: float, signatures: list | None = None) -> list:
+        """Associate detections; returns the Track for each detection, in order."""
+        tracks = list(self.tracks.values())
+        out    = [None] * len(boxes)
+        signatures = signatures or [None] * len(boxes)
+        if tracks and boxes:
+            iou  = iou_matrix(boxes, [t.predict(now) for t in tracks])
+            cost = 1.0 - iou
+            for d, sig in enumerate(signatures):
+                for k, t in enumerate(tracks):
+                    known = sig is not None and t.signature is not None
+                    drift = min(1.0, signature_drift(sig, t.signature))
+                    if known:
+                        cost[d, k] = TRACK_IOU_WEIGHT*cost[d, k] + (1-TRACK_IOU_WEIGHT)*drift
+                    if iou[d, k] < TRACK_MIN_IOU and not (known and t.misses and drift <= TRACK_REACQUIRE):
+                        cost[d, k] = np.inf
+            gated = np.where(np.isfinite(cost), cost, 1e6)
+            for d, k in linear_assignment(gated):
+                if cost[d, k] <= TRACK_MAX_COST:
+                    tracks[k].update(boxes[d], now, signatures[d])
+                    out[d] = tracks[k]
+
+        for d, track in enumerate(out):
+            if track is None:
+                track = Track(self._next_id, boxes[d], now)
+                track.signature = signatures[d]
+                self.tracks[track.id] = track
+                self._next_id += 1
+                out[d] = track
+
+        matched = {t.id for t in out}
+        for t in tracks:
+            if t.id not in matched:
+                t.misses += 1
+                if t.misses > TRACK_MAX_MISSES:
+                    del self.tracks[t.id]
+                    self.evicted.append(t.id)
+        return out
+
+    def pop_evicted(self) -> list:
+        evicted, self.evicted = self.evicted, []
+        return evicted
+
+
+# ── Face Detectors ────────────────────────────────────────────────────────────
+class FaceDetector:
+    """Backend interface: ``detect(rgb)`` returns (top, right, bottom, left) boxes."""
+    name = "base"
+
+    def detect(self, rgb: np.ndarray) -> list:
+        raise NotImplementedError
+
+    @staticmethod
+    def _clip(boxes, shape) -> list:
+        h, w = shape[:2]
+        out  = []
+        for top, right, bottom, left in boxes:
+            top, left     = max(0, int(top)), max(0, int(left))
+            bottom, right = min(h, int(bottom)), min(w, int(right))
+            if bottom > top and right > left:
+                out.append((top, right, bottom, left))
+        return out
+
+
+class HogDetector(FaceDetector):
+    """dlib HOG via face_recognition — the original detector."""
+    name = "hog"
+
+    def detect(self, rgb):
+        return face_recognition.face_locations(rgb, model="hog")
+
+
+class YuNetDetector(FaceDetector):
+    """OpenCV's YuNet CNN (cv2.FaceDetectorYN); fast on CPU, finds small/profile faces."""
+    name = "yunet"
+
+    def __init__(self, model: Path = YUNET_MODEL, threshold: float = DETECT_CONFIDENCE):
+        if not model.exists():
+            raise FileNotFoundError(f"{model} missing — download it from the opencv_zoo repo "
+                                    "(models/face_detection_yunet)")
+        self.net = cv2.FaceDetectorYN.create(str(model), "", (320, 320), threshold)
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        self.net.setInputSize((w, h))
+        _, faces = self.net.detect(cv2.cvtColor(rgb, cv2.COLOR_RGB2BGR))
+        if faces is None:
+            return []
+        return self._clip([(y, x+fw, y+fh, x) for x, y, fw, fh in faces[:, :4]], rgb.shape)
+
+
+class SsdDetector(FaceDetector):
+    """OpenCV DNN ResNet-10 SSD (res10_300x300); input is always resized to 300x300."""
+    name = "ssd"
+
+    def __init__(self, prototxt: Path = SSD_PROTOTXT, weights: Path = SSD_WEIGHTS,
+                 threshold: float = DETECT_CONFIDENCE):
+        for f in (prototxt, weights):
+            if not f.exists():
+                raise FileNotFoundError(f"{f} missing — get it from opencv/samples/dnn/face_detector")
+        self.net       = cv2.dnn.readNetFromCaffe(str(prototxt), str(weights))
+        self.threshold = threshold
+
+    def detect(self, rgb):
+        h, w = rgb.shape[:2]
+        blob = cv2.dnn.blobFromImage(cv2.resize(rgb, (300, 300)), 1.0, (300, 300),
+                                     (123, 177, 104), swapRB=True)
+        self.net.setInput(blob)
+        dets  = self.net.forward()[0, 0]
+        keep  = dets[dets[:, 2] >= self.threshold]
+        boxes = keep[:, 3:7] * np.array([w, h, w, h])
+        return self._clip([(y1, x2, y2, x1) for x1, y1, x2, y2 in boxes], rgb.shape)
+
+
+class HaarDetector(FaceDetector):
+    """Viola-Jones Haar cascade bundled with OpenCV — the cheapest fallback."""
+    name = "haar"
+
+    def __init__(self):
+        path = Path(cv2.data.haarcascades) / "haarcascade_frontalface_default.xml"
+        self.cascade = cv2.CascadeClassifier(str(path))
+        if self.cascade.empty():
+            raise FileNotFoundError(f"Could not load {path}")
+
+    def detect(self, rgb):
+        gray  = cv2.equalizeHist(cv2.cvtColor(rgb, cv2.COLOR_RGB2GRAY))
+        faces = self.cascade.detectMultiScale(gray, scaleFactor=1.1, minNeighbors=5, minSize=(24, 24))
+        return [(y, x+w, y+h, x) for x, y, w, h in faces]
+
+
+DETECTOR_BACKENDS = {"hog": HogDetector, "yunet": YuNetDetector, "ssd": SsdDetector, "haar": HaarDetector}
+
+def build_detector(name: str = DETECTOR_BACKEND, fallback: str | None = "hog") -> FaceDetector:
+    """Instantiate a detector backend, falling back (if given) when it cannot load."""
+    if name not in DETECTOR_BACKENDS:
+        raise ValueError(f"Unknown detector {name!r}; choose from {sorted(DETECTOR_BACKENDS)}")
+    try:
+        return DETECTOR_BACKENDS[name]()
+    except Exception as e:
+        if fallback is None or fallback == name:
+            raise
+        print(f" Detector '{name}' unavailable ({e}) — using '{fallback}'")
+        return DETECTOR_BACKENDS[fallback]()
+
+
+# ── Detection Scheduler ───────────────────────────────────────────────────────
+def nms_boxes(boxes: list, thresh: float = 0.3) -> list:
+    """Drop (top, right, bottom, left) boxes overlapping a larger kept box."""
+    if not boxes:
+        return []
+    order = sorted(range(len(boxes)), key=lambda i: -(boxes[i][1]-boxes[i][3]) * (boxes[i][2]-boxes[i][0]))
+    kept  = []
+    for i in order:
+        if not kept or iou_matrix([boxes[i]], [boxes[k] for k in kept]).max() < thresh:
+            kept.append(i)
+    return [boxes[i] for i in kept]
+
+
+class DetectionScheduler:
+    """Chooses where and at what scale the detector runs each round.
+
+    The scale follows the smallest tracked face (so it lands at about
+    DETECT_FACE_PX) and is capped by what the measured detector speed allows
+    within the TARGET_FPS budget. While faces are tracked, only expanded
+    regions around them are scanned; the whole frame is scanned every
+    FULL_SCAN_EVERY_N rounds to pick up new arrivals.
+    """
+    def __init__(self, target_fps: float = TARGET_FPS):
+        self.budget_ms  = 1000.0 / target_fps
+        self.ms_per_mpx = 0.0     # Detector cost per megapixel actually scanned (EMA)
+        self.rounds     = 0
+        self.last_plan  = {"mode": "full", "scale": DETECT_IDLE_SCALE, "regions": 1}
+
+    def _clamp(self, scale: float) -> float:
+        return float(min(DETECT_MAX_SCALE, max(DETECT_MIN_SCALE, scale)))
+
+    def _scale_for(self, face_side: float) -> float:
+        return self._clamp(DETECT_FACE_PX / max(face_side, 1.0))
+
+    def plan(self, frame_shape, tracks: list, now: float) -> list:
+        """Regions to scan as (top, right, bottom, left, scale), in frame coordinates."""
+        h, w = frame_shape[:2]
+        self.rounds += 1
+        boxes = [t.predict(now) for t in tracks]
+        sides = [min(b[1]-b[3], b[2]-b[0]) for b in boxes]
+
+        if not boxes or self.rounds % FULL_SCAN_EVERY_N == 0:
+            scale = self._scale_for(min(sides)) if sides else DETECT_IDLE_SCALE
+            if self.ms_per_mpx > 0:
+                # Largest scale whose full-frame scan still fits the frame budget
+                affordable = np.sqrt(self.budget_ms / (self.ms_per_mpx * h * w / 1e6))
+                scale = min(scale, affordable)
+            scale = self._clamp(scale)
+            self.last_plan = {"mode": "full", "scale": round(scale, 2), "regions": 1}
+            return [(0, w, h, 0, scale)]
+
+        regions = []
+        for (top, right, bottom, left), side in zip(boxes, sides):
+            pad_y, pad_x = (bottom-top) * ROI_EXPAND, (right-left) * ROI_EXPAND
+            regions.append([int(max(0, top-pad_y)), int(min(w, right+pad_x)),
+                            int(min(h, bottom+pad_y)), int(max(0, left-pad_x)), self._scale_for(side)])
+        # Merge overlapping regions so one face is never scanned twice
+        merged = []
+        for r in sorted(regions, key=lambda r: r[3]):
+            for m in merged:
+                if r[3] < m[1] and m[3] < r[1] and r[0] < m[2] and m[0] < r[2]:
+                    m[0], m[1], m[2], m[3] = min(m[0], r[0]), max(m[1], r[1]), max(m[2], r[2]), min(m[3], r[3])
+                    m[4] = max(m[4], r[4])
+                    break
+            else:
+                merged.append(r)
+        merged = [tuple(r) for r in merged if r[2] > r[0] and r[1] > r[3]]
+        self.last_plan = {"mode": "roi", "scale": round(max(r[4] for r in merged), 2) if merged else 0.0,
+                          "regions": len(merged)}
+        return merged
+
+    def record(self, elapsed_ms: float, scanned_px: float):
+        """Feed back detector time for the pixels it actually processed."""
+        if scanned_px <= 0:
+            return
+        sample = elapsed_ms / (scanned_px / 1e6)
+        self.ms_per_mpx = sample if self.ms_per_mpx == 0 else 0.8*self.ms_per_mpx + 0.2*sample
+
+    def report(self) -> dict:
+        return dict(self.last_plan, ms_per_mpx=round(self.ms_per_mpx, 1))
+
 
 # ── HUD Helpers ───────────────────────────────────────────────────────────────
 def draw_rounded_rect(img, x1, y1, x2, y2, color, thickness=2, radius=10):
@@ -268,9 +2517,13 @@ def draw_rounded_rect(img, x1, y1, x2, y2, color, thickness=2, radius=10):
         cv2.ellipse(img,(cx,cy),(radius,radius),0,s,e,color,thickness)
 
 def draw_filled_rect(img, x1, y1, x2, y2, color, alpha=0.6):
-    overlay = img.copy()
-    cv2.rectangle(overlay, (x1,y1), (x2,y2), color, -1)
-    cv2.addWeighted(overlay, alpha, img, 1-alpha, 0, img)
+    """Translucent box; only the covered pixels are blended."""
+    h, w = img.shape[:2]
+    x1, y1, x2, y2 = max(x1, 0), max(y1, 0), min(x2+1, w), min(y2+1, h)
+    if x1 >= x2 or y1 >= y2:
+        return
+    roi = img[y1:y2, x1:x2]
+    cv2.addWeighted(roi, 1-alpha, np.full_like(roi, color), alpha, 0, roi)
 
 def draw_emotion_bar(img, x, y, emotion, score, bar_width=120):
     color  = EMOTION_COLORS.get(emotion, (180,180,180))
@@ -289,199 +2542,1308 @@ def wind_dir(deg):
     return ["N","NE","E","SE","S","SW","W","NW"][round(deg/45)%8]
 
 
-# ── Main App ──────────────────────────────────────────────────────────────────
-class FaceEmotionApp:
+class OverlayRenderer:
+    """Draws the face overlay, HUD and hint bar with as little per-frame work as possible.
+
+    Text labels (with their shadow and any translucent backing) are rendered
+    once into premultiplied sprites and afterwards only blended into their
+    region of the frame; face outlines are gathered and drawn with one
+    polylines call per colour.
+    """
+    def __init__(self, cache_size: int = OVERLAY_SPRITE_CACHE):
+        self.cache_size = cache_size
+        self.sprites    = collections.OrderedDict()
+        self.hits       = 0
+        self.misses     = 0
+
+    # ── Sprites ───────────────────────────────────────────────────────
+    @staticmethod
+    def _build(t, scale, color, thickness, shadow, size, org, bg, alpha, box, line):
+        """(premultiplied colour, 1 - alpha) for one label; org and box are sprite-relative."""
+        w, h    = size
+        premul  = np.zeros((h, w, 3), np.float32)
+        opacity = np.zeros((h, w, 1), np.float32)
+        layers  = []
+        if bg is not None:
+            cover = np.zeros((h, w, 1), np.float32)
+            cover[box[1]:box[3]+1, box[0]:box[2]+1] = alpha
+            layers.append((bg, cover))
+        glyphs = [((org[0]+1, org[1]+1), (0,0,0), thickness+1)] if shadow else []
+        for pos, c, th in glyphs + [(org, color, thickness)]:
+            mask = np.zeros((h, w), np.uint8)
+            cv2.putText(mask, t, pos, cv2.FONT_HERSHEY_SIMPLEX, scale, 255, th, line)
+            layers.append((c, mask[..., None].astype(np.float32) / 255))
+        for c, cover in layers:
+            premul  = premul * (1 - cover) + np.asarray(c, np.float32) * cover
+            opacity = opacity * (1 - cover) + cover
+        return premul + 0.5, 1 - opacity
+
+    def label(self, img, t, org, scale=0.55, color=(255,255,255), thickness=1,
+              shadow=True, bg=None, alpha=0.0, box=None, line=cv2.LINE_AA):
+        """Same result as text() (plus an optional translucent box behind it), from a cached sprite."""
+        (tw, th), base = cv2.getTextSize(t, cv2.FONT_HERSHEY_SIMPLEX, scale, thickness+1)
+        x1, y1, x2, y2 = org[0] - 1, org[1] - th - 1, org[0] + tw + 2, org[1] + base + 2
+        if box is not None:
+            x1, y1, x2, y2 = min(x1, box[0]), min(y1, box[1]), max(x2, box[2]+1), max(y2, box[3]+1)
+        rel_box = None if box is None else (box[0]-x1, box[1]-y1, box[2]-x1, box[3]-y1)
+        rel_org = (org[0]-x1, org[1]-y1)
+        key     = (t, scale, color, thickness, shadow, bg, alpha, rel_box, rel_org, x2-x1, y2-y1, line)
+        sprite  = self.sprites.get(key)
+        if sprite is None:
+            self.misses += 1
+            sprite = self._build(t, scale, color, thickness, shadow, (x2-x1, y2-y1),
+                                 rel_org, bg if box is not None else None, alpha, rel_box, line)
+            self.sprites[key] = sprite
+            if len(self.sprites) > self.cache_size:
+                self.sprites.popitem(last=False)
+        else:
+            self.hits += 1
+            self.sprites.move_to_end(key)
+        self._blit(img, sprite, x1, y1)
+
+    @staticmethod
+    def _blit(img, sprite, x, y):
+        premul, keep = sprite
+        h, w   = img.shape[:2]
+        sh, sw = keep.shape[:2]
+        x0, y0, x1, y1 = max(x, 0), max(y, 0), min(x+sw, w), min(y+sh, h)
+        if x0 >= x1 or y0 >= y1:
+            return
+        roi = img[y0:y1, x0:x1]
+        roi[:] = roi * keep[y0-y:y1-y, x0-x:x1-x] + premul[y0-y:y1-y, x0-x:x1-x]
+
+    # ── Layers ────────────────────────────────────────────────────────
+    @staticmethod
+    def _outline(loc, radius=10):
+        """Closed rounded-rectangle polygon plus the four corner accents for one face."""
+        top, right, bottom, left = loc
+        r = max(1, min(radius, (right-left)//2, (bottom-top)//2))
+        corners = [((right-r, top+r), 270), ((right-r, bottom-r), 0),
+                   ((left+r, bottom-r), 90), ((left+r, top+r), 180)]
+        ring = np.concatenate([cv2.ellipse2Poly(c, (r, r), 0, a, a+90, 15) for c, a in corners])
+        accents = [np.array([(ax+dx*20, ay), (ax, ay), (ax, ay+dy*20)], np.int32)
+                   for ax, ay, dx, dy in [(left,top,1,1),(right,top,-1,1),(left,bottom,1,-1),(right,bottom,-1,-1)]]
+        return ring.astype(np.int32), accents
+
+    def draw_faces(self, img, faces: list, show_emotion: bool = True, show_age_gender: bool = True):
+        """faces: dicts with loc, name, conf, emotion, emotion_scores, age and gender."""
+        rings, accents = {}, {}
+        for f in faces:
+            color = EMOTION_COLORS.get(f["emotion"], (180,180,180))
+            ring, acc = self._outline(f["loc"])
+            rings.setdefault(color, []).append(ring)
+            accents.setdefault(color, []).extend(acc)
+        for color, polys in rings.items():
+            cv2.polylines(img, polys, True, color, 2)
+            cv2.polylines(img, accents[color], False, color, 3)
+
+        for f in faces:
+            top, right, bottom, left = f["loc"]
+            name, color = f["name"], EMOTION_COLORS.get(f["emotion"], (180,180,180))
+
+            # Name banner
+            by    = max(0, top-32)
+            if name != "Unknown":
+                label = f"{name}  {f['conf']*100:.0f}%"
+            else:
+                label = f"⚠ Unknown #{f['cluster']}" if f.get("cluster") is not None else "⚠ Unknown"
+            (tw,th),_ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
+            banner_color = color if name != "Unknown" else (30,30,200)
+            self.label(img, label, (left+6, by+th+2), scale=0.6, bg=banner_color, alpha=0.75,
+                       box=(left, by, left+tw+12, by+th+10))
+
+            # Emotion bars
+            scores = f.get("emotion_scores") or {}
+            if show_emotion and scores:
+                for ei, (emo, sc) in enumerate(sorted(scores.items(), key=lambda x:-x[1])[:5]):
+                    x, y   = right+10, top+ei*18
+                    filled = int(120 * sc / 100)
+                    cv2.rectangle(img, (x,y), (x+120,    y+10), (50,50,50), -1)
+                    cv2.rectangle(img, (x,y), (x+filled, y+10), EMOTION_COLORS.get(emo, (180,180,180)), -1)
+                    self.label(img, f"{emo[:7]:7s} {sc:4.0f}%", (x+125, y+9), scale=0.35,
+                               color=(220,220,220), shadow=False, line=cv2.LINE_8)
+
+            # Age/gender
+            if show_age_gender:
+                gy = top + (5*18 if show_emotion else 0) + 8
+                self.label(img, f"Age: {f['age']}",    (right+10, gy),    scale=0.5)
+                self.label(img, f"Sex: {f['gender']}", (right+10, gy+18), scale=0.5)
+
+    def draw_hud(self, img, lines: list, width: int):
+        """lines: (text, colour) pairs stacked in a translucent panel at the top left."""
+        draw_filled_rect(img, 8, 8, width, 8+len(lines)*22, (20,20,20), 0.65)
+        for i, (line, color) in enumerate(lines):
+            self.label(img, line, (14, 26+i*22), scale=0.52, color=color)
+
+    def draw_hint(self, img, hint: str):
+        h, w = img.shape[:2]
+        self.label(img, hint, (10, h-10), scale=0.42, color=(160,160,160),
+                   bg=(10,10,10), alpha=0.7, box=(0, h-28, w, h))
+
+    def report(self) -> dict:
+        total = self.hits + self.misses
+        return {"sprites": len(self.sprites), "hit_pct": round(100 * self.hits / total, 1) if total else 0.0}
+
+
+# ── Frame Processor ───────────────────────────────────────────────────────────
+class FrameProcessor:
+    """Detection, tracking and identity for one video stream — no threads, no drawing.
+
+    Shared by the live pipeline and the offline batch mode.
+    """
+    def __init__(self, db: FaceDatabase, detector: FaceDetector, detect_every: int = DETECT_EVERY_N):
+        self.db             = db
+        self.detector       = detector
+        self.detect_every   = detect_every
+        self.tracker        = FaceTracker()
+        self.scheduler      = DetectionScheduler()
+        self.identity_stats = {"encoded": 0, "skipped": 0, "encode_ms": 0.0, "avoided": 0}
+        self.quality_stats  = {"scored": 0, "rejected": 0}
+        self.frame_count    = 0
+        self.timers = {s: METRICS.histogram("facecv_step_ms", "Wall time per call of one processing step", step=s)
+                       for s in ("detect", "quality", "encode", "identify")}
+        self.calls  = {m: METRICS.counter("facecv_model_calls_total", "Model invocations (per face for face models)",
+                                          model=m) for m in ("detector", "landmarks", "encoding")}
+        self.faces  = METRICS.counter("facecv_faces_total", "Faces found by full detection passes")
+
+    def process(self, frame: np.ndarray, now: float, detector: FaceDetector | None = None) -> list:
+        """Tracks visible in ``frame`` (BGR) at time ``now``.
+
+        ``detector`` overrides the processor's own, for shared worker threads
+        that each hold a detector instance.
+        """
+        self.frame_count += 1
+        # Full detection every detect_every frames (or while nobody is
+        # tracked); in between, live tracks are only propagated.
+        detect  = self.frame_count % self.detect_every == 0 or not self.tracker.predict(now)
+        encoded = 0
+        if detect:
+            rgb       = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
+            gray      = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+            regions   = self.scheduler.plan(frame.shape, list(self.tracker.tracks.values()), now)
+            face_locs = self._detect_regions(rgb, regions, detector or self.detector)
+            sigs      = [appearance_signature(gray, loc) for loc in face_locs]
+
+            tracks  = self.tracker.update(face_locs, now, sigs)
+            for track, loc, score in zip(tracks, face_locs, self._score_faces(rgb, gray, face_locs)):
+                track.offer_shot(score, frame, loc, now)
+            encoded = self._verify_identities(tracks, now)
+        else:
+            tracks = self.tracker.predict(now)
+        self.identity_stats["skipped"] += len(tracks) - encoded
+        return tracks
+
+    def _detect_regions(self, rgb: np.ndarray, regions: list, detector: FaceDetector) -> list:
+        """Run the detector on each scheduled region and map boxes back to frame coordinates."""
+        t_det, scanned, locs = time.time(), 0, []
+        for top, right, bottom, left, scale in regions:
+            sub   = rgb[top:bottom, left:right]
+            small = sub if scale == 1.0 else cv2.resize(sub, (0,0), fx=scale, fy=scale)
+            scanned += small.shape[0] * small.shape[1]
+            for t, r, b, l in detector.detect(small):
+                locs.append((int(t/scale)+top, int(r/scale)+left, int(b/scale)+top, int(l/scale)+left))
+        ms   = (time.time() - t_det) * 1000
+        locs = nms_boxes(locs)
+        self.scheduler.record(ms, scanned)
+        self.timers["detect"].observe(ms)
+        self.calls["detector"].inc(len(regions))
+        self.faces.inc(len(locs))
+        return locs
+
+    def _score_faces(self, rgb, gray, face_locs: list) -> list:
+        """Quality score per detection; landmarks (pose) only for crops that pass the cheap checks."""
+        with self.timers["quality"].time():
+            factors = [crop_quality(gray, loc) for loc in face_locs]
+            scores  = [quality_score(f) for f in factors]
+            passed  = [i for i, sc in enumerate(scores) if sc >= QUALITY_MIN_SCORE]
+            if passed:
+                marks = face_recognition.face_landmarks(rgb, [face_locs[i] for i in passed], model="small")
+                for i, lm in zip(passed, marks):
+                    pose = pose_factor(lm)
+                    if pose is not None:
+                        factors[i]["pose"] = pose
+                        scores[i] = quality_score(factors[i])
+        self.calls["landmarks"].inc(len(passed))
+        self.quality_stats["scored"]   += len(scores)
+        self.quality_stats["rejected"] += sum(sc < QUALITY_MIN_SCORE for sc in scores)
+        return scores
+
+    def _verify_identities(self, tracks: list, now: float) -> int:
+        """Encode and identify only the tracks whose cached identity is due.
+
+        Each is encoded from its best shot; tracks without a usable shot that
+        has not been encoded yet wait. Returns how many faces were encoded.
+        """
+        due, shots = [], []
+        for t in tracks:
+            if not t.identity_due(now):
+                continue
+            shot = t.best_shot(now)
+            if shot is None or shot.get("encoded"):
+                if not t.waiting:   # Once per due check, not once per frame it waits
+                    self.identity_stats["avoided"] += 1
+                    t.waiting = True
+                continue
+            due.append(t)
+            shots.append(shot)
+        if not due:
+            return 0
+        t_enc = time.time()
+        encs  = [face_recognition.face_encodings(cv2.cvtColor(sh["crop"], cv2.COLOR_BGR2RGB), [sh["loc"]])[0]
+                 for sh in shots]
+        enc_ms = (time.time() - t_enc) * 1000
+        self.timers["encode"].observe(enc_ms)
+        self.calls["encoding"].inc(len(due))
+        with self.timers["identify"].time():
+            matches = self.db.identify_many(encs)
+        per_face_ms = enc_ms / len(due)
+        for track, shot, enc, (name, conf) in zip(due, shots, encs, matches):
+            shot["encoded"] = True
+            track.embedding = np.asarray(enc, float)
+            track.observe_identity(name, conf, now)
+
+        st = self.identity_stats
+        st["encode_ms"] = per_face_ms if not st["encoded"] else 0.9*st["encode_ms"] + 0.1*per_face_ms
+        st["encoded"]  += len(due)
+        return len(due)
+
+    def identity_report(self) -> dict:
+        """Embeddings computed vs skipped, relative to encoding every face every frame."""
+        st    = self.identity_stats
+        total = st["encoded"] + st["skipped"]
+        return {"encoded": st["encoded"], "skipped": st["skipped"], "avoided": st["avoided"],
+                "scored": self.quality_stats["scored"], "rejected": self.quality_stats["rejected"],
+                "skipped_pct": round(100 * st["skipped"] / total, 1) if total else 0.0,
+                "saved_ms":    round(st["skipped"] * st["encode_ms"])}
+
+
+# ── Pipeline Plumbing ─────────────────────────────────────────────────────────
+class StageStats:
+    """Latency, throughput, drop and error counters for one pipeline stage."""
+    def __init__(self, name: str):
+        self.name       = name
+        self.processed  = 0
+        self.dropped    = 0
+        self.errors     = 0      # Items abandoned because processing raised
+        self.latency_ms = 0.0    # Exponential moving average
+        self._lock      = threading.Lock()
+        self.hist       = METRICS.histogram("facecv_stage_ms", "Latency per item of a pipeline stage", stage=name)
+        self.drops      = METRICS.counter("facecv_dropped_total", "Items dropped by a pipeline stage", stage=name)
+        self.failures   = METRICS.counter("facecv_errors_total", "Items a pipeline stage failed on", stage=name)
+
+    def record(self, seconds: float):
+        ms = seconds * 1000
+        self.hist.observe(ms)
+        with self._lock:
+            self.processed += 1
+            self.latency_ms = ms if self.processed == 1 else 0.9*self.latency_ms + 0.1*ms
+
+    def drop(self):
+        self.drops.inc()
+        with self._lock:
+            self.dropped += 1
+
+    def error(self):
+        self.failures.inc()
+        with self._lock:
+            self.errors += 1
+
+    def snapshot(self, depth: int = 0) -> dict:
+        with self._lock:
+            return {"queue": depth, "latency_ms": round(self.latency_ms, 1),
+                    "processed": self.processed, "dropped": self.dropped, "errors": self.errors}
+
+
+class RateMeter:
+    """Events per second, refreshed about once a second."""
     def __init__(self):
-        self.db            = FaceDatabase()
-        self.logger        = AttendanceLogger()
-        self.alerter       = EmailAlerter()
-        self.live_data     = LiveDataWriter()
-        SCREENSHOTS_DIR.mkdir(exist_ok=True)
+        self.rate   = 0.0
+        self._count = 0
+        self._t0    = time.time()
+        self._lock  = threading.Lock()
+
+    def tick(self):
+        with self._lock:
+            self._count += 1
+            now = time.time()
+            if now - self._t0 >= 1.0:
+                self.rate   = self._count / (now - self._t0)
+                self._count = 0
+                self._t0    = now
+
+
+class DropQueue:
+    """Bounded queue that discards its oldest item instead of blocking the producer.
+
+    Drops are charged to the consuming stage(s), since they are the ones falling behind.
+    """
+    def __init__(self, maxsize: int, *stats: StageStats, on_drop=None):
+        self._q      = queue.Queue(maxsize)
+        self.stats   = stats
+        self.on_drop = on_drop   # Called with each discarded item, e.g. to free its frame slot
+
+    def put(self, item):
+        while True:
+            try:
+                self._q.put_nowait(item)
+                return
+            except queue.Full:
+                try:
+                    dropped = self._q.get_nowait()
+                    for st in self.stats:
+                        st.drop()
+                    if self.on_drop:
+                        self.on_drop(dropped)
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout: float = 0.1):
+        try:
+            return self._q.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def get_nowait(self):
+        try:
+            return self._q.get_nowait()
+        except queue.Empty:
+            return None
+
+    def qsize(self) -> int:
+        return self._q.qsize()
+
+
+# ── Frame Transport ───────────────────────────────────────────────────────────
+class FrameRing:
+    """Fixed slots of frames in shared memory, handed out as NumPy views.
+
+    Frames are decoded straight into a slot and read in place by any thread,
+    or by any process the ring is passed to, instead of being pickled through
+    a queue; only the sequence number travels. Each slot carries its sequence
+    number and a reader count: the writer reuses the oldest slot nobody
+    holds and drops the frame when every slot is held.
+    """
+    def __init__(self, shape: tuple, slots: int = FRAME_RING_SLOTS, name: str | None = None,
+                 cond=None):
+        self.shape = tuple(shape)
+        self.slots = slots
+        self.owner = name is None
+        head_bytes = -(-slots * 16 // 64) * 64   # Frames start on a cache line
+        size       = head_bytes + slots * int(np.prod(self.shape))
+        self.shm   = shared_memory.SharedMemory(create=True, size=size) if self.owner \
+                     else shared_memory.SharedMemory(name=name)
+        # Per slot: [seq, readers]; seq 0 = empty, -1 = being written
+        self.head   = np.ndarray((slots, 2), np.int64, self.shm.buf)
+        self.frames = np.ndarray((slots, *self.shape), np.uint8, self.shm.buf, offset=head_bytes)
+        if self.owner:
+            self.head[:] = 0
+        self.cond    = cond or multiprocessing.Condition()
+        self.dropped = 0
+
+    def __reduce__(self):
+        # A child process attaches to the same block by name
+        return FrameRing, (self.shape, self.slots, self.shm.name, self.cond)
+
+    def claim(self):
+        """(slot, writable view) of the oldest free slot, or (None, None) if all are held."""
+        with self.cond:
+            seqs, readers = self.head[:, 0], self.head[:, 1]
+            free = np.flatnonzero((readers == 0) & (seqs >= 0))
+            if not len(free):
+                self.dropped += 1
+                return None, None
+            slot = int(free[np.argmin(seqs[free])])
+            self.head[slot] = (-1, 0)
+        return slot, self.frames[slot]
+
+    def publish(self, slot: int, hold: bool = False) -> int:
+        """Makes a claimed slot readable. ``hold`` keeps one reader lease on it
+        for whoever the sequence number is handed to; they release() it."""
+        with self.cond:
+            seq = int(self.head[:, 0].max()) + 1
+            self.head[slot] = (seq, 1 if hold else 0)
+            self.cond.notify_all()
+        return seq
+
+    def abandon(self, slot: int):
+        with self.cond:
+            self.head[slot] = (0, 0)
+
+    def write(self, frame: np.ndarray, hold: bool = False) -> int | None:
+        """Copies ``frame`` into a free slot (resizing if needed); None when all are held."""
+        slot, view = self.claim()
+        if slot is None:
+            return None
+        if frame.shape == self.shape:
+            np.copyto(view, frame)
+        else:
+            cv2.resize(frame, (self.shape[1], self.shape[0]), dst=view)
+        return self.publish(slot, hold)
+
+    def _slot(self, seq: int) -> int | None:
+        hit = np.flatnonzero(self.head[:, 0] == seq)
+        return int(hit[0]) if len(hit) else None
+
+    def get(self, seq: int) -> np.ndarray | None:
+        """View of a frame the caller holds a lease on."""
+        with self.cond:
+            slot = self._slot(seq)
+        return None if slot is None else self.frames[slot]
+
+    def latest(self, after: int = 0, timeout: float = 0.0):
+        """Leases the newest frame past ``after``: (seq, view), or (None, None) on timeout."""
+        with self.cond:
+            if not self.cond.wait_for(lambda: self.head[:, 0].max() > after, timeout):
+                return None, None
+            slot = int(np.argmax(self.head[:, 0]))
+            self.head[slot, 1] += 1
+            return int(self.head[slot, 0]), self.frames[slot]
+
+    def release(self, seq: int):
+        with self.cond:
+            slot = self._slot(seq)
+            if slot is not None and self.head[slot, 1] > 0:
+                self.head[slot, 1] -= 1
+
+    def close(self):
+        self.head = self.frames = None
+        try:
+            self.shm.close()
+        except BufferError:
+            pass   # Views are still referenced; the mapping goes away with the process
+        if self.owner:
+            self.shm.unlink()
+
+
+# ── Camera Sources ────────────────────────────────────────────────────────────
+class CameraSource:
+    """One video input: a device index, a video file, or a network (RTSP/HTTP) URL.
+
+    Files are paced at their native frame rate so they can stand in for a
+    live stream; network streams are reopened when they drop.
+    """
+    def __init__(self, spec: str, name: str, db: FaceDatabase, detect_stats: StageStats):
+        self.spec   = spec
+        self.name   = name
+        self.target = int(spec) if spec.isdigit() else spec
+        self.is_file = isinstance(self.target, str) and Path(spec).exists()
+        self.stats  = StageStats(name)   # Detection latency and drops for this camera
+        self.queue  = DropQueue(DETECT_QUEUE_SIZE, self.stats, detect_stats, on_drop=self.release)
+        self.proc   = FrameProcessor(db, None)
+        self.capture_rate = RateMeter()
+        self.process_rate = RateMeter()
+        self.ring         = None   # Created on the first frame, once its size is known
+        self.ring_slots   = FRAME_RING_SLOTS
+        self.active_faces = 0
+        self.finished     = False
+        self.cap          = None
+
+    @staticmethod
+    def parse(spec: str, index: int) -> tuple[str, str]:
+        """``"lobby=rtsp://…"`` names a source; otherwise it is cam<index>."""
+        name, sep, rest = spec.partition("=")
+        if sep and name.isidentifier():
+            return name, rest
+        return f"cam{index}", spec
+
+    def open(self) -> bool:
+        self.cap = cv2.VideoCapture(self.target)
+        if not self.cap.isOpened():
+            return False
+        if isinstance(self.target, int):
+            self.cap.set(cv2.CAP_PROP_FRAME_WIDTH,  CAPTURE_WIDTH)
+            self.cap.set(cv2.CAP_PROP_FRAME_HEIGHT, CAPTURE_HEIGHT)
+        return True
+
+    def grab(self) -> tuple[bool, int | None]:
+        """Decodes the next frame straight into a free ring slot.
 
-        self.show_emotion    = True
-        self.show_age_gender = True
-        self.logging_active  = True
+        Returns (ok, seq); the caller holds the frame until release(). seq is
+        None when every slot was still held downstream and the frame was dropped.
+        """
+        if self.ring is None:
+            ret, frame = self.cap.read()
+            if not ret:
+                return False, None
+            self.ring = FrameRing(frame.shape, self.ring_slots)
+            return True, self.ring.write(frame, hold=True)
+        slot, view = self.ring.claim()
+        if slot is None:
+            ret, _ = self.cap.read()   # Keep the device drained
+            return ret, None
+        ret, frame = self.cap.read(view)
+        if not ret:
+            self.ring.abandon(slot)
+            return False, None
+        if not np.shares_memory(frame, view):   # Stream changed resolution
+            if frame.shape == view.shape:
+                np.copyto(view, frame)
+            else:
+                cv2.resize(frame, (view.shape[1], view.shape[0]), dst=view)
+        return True, self.ring.publish(slot, hold=True)
+
+    def release(self, packet: dict):
+        """Frees the ring slot behind a packet once nothing downstream needs it."""
+        self.ring.release(packet["seq"])
+
+    def snapshot(self) -> np.ndarray | None:
+        """Private copy of the newest frame, e.g. for registering a face."""
+        if self.ring is None:
+            return None
+        seq, view = self.ring.latest()
+        if seq is None:
+            return None
+        frame = view.copy()
+        self.ring.release(seq)
+        return frame
+
+    def frame_interval(self) -> float:
+        """Seconds between frames when pacing a file, else 0."""
+        if not self.is_file:
+            return 0.0
+        fps = self.cap.get(cv2.CAP_PROP_FPS)
+        return 1.0 / fps if fps and fps > 0 else 1.0 / 25
+
+    def reconnect(self) -> bool:
+        """Network streams get reopened after a drop; devices and files just end."""
+        if self.is_file or isinstance(self.target, int):
+            return False
+        self.cap.release()
+        time.sleep(SOURCE_RECONNECT_SECS)
+        print(f" [{self.name}] reconnecting to {self.spec}")
+        return self.open()
+
+    def report(self) -> dict:
+        snap = self.stats.snapshot(self.queue.qsize())
+        return {"capture_fps": round(self.capture_rate.rate, 1), "fps": round(self.process_rate.rate, 1),
+                "dropped": snap["dropped"], "queue": snap["queue"], "latency_ms": snap["latency_ms"],
+                "faces": self.active_faces, "scheduler": self.proc.scheduler.report(),
+                "finished": self.finished}
+
+
+class FairScheduler:
+    """Hands frames from many cameras to a pool of shared detection workers.
+
+    Cameras are served round-robin, so a busy camera cannot starve a quiet
+    one. Each camera is served by at most one worker at a time: its tracker
+    is not thread-safe and its frames must be processed in order.
+    """
+    def __init__(self, cameras: list):
+        self.cameras = cameras
+        self._busy   = set()
+        self._next   = 0
+        self._cond   = threading.Condition()
+
+    def notify(self):
+        with self._cond:
+            self._cond.notify()
+
+    def acquire(self, timeout: float = 0.1):
+        """Returns (camera, packet), or (None, None) if nothing arrived in time."""
+        deadline = time.time() + timeout
+        with self._cond:
+            while True:
+                n = len(self.cameras)
+                for k in range(n):
+                    cam = self.cameras[(self._next + k) % n]
+                    if cam.name in self._busy:
+                        continue
+                    packet = cam.queue.get_nowait()
+                    if packet is not None:
+                        self._busy.add(cam.name)
+                        self._next = (self._next + k + 1) % n
+                        return cam, packet
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return None, None
+                self._cond.wait(remaining)
+
+    def release(self, cam: CameraSource):
+        with self._cond:
+            self._busy.discard(cam.name)
+            self._cond.notify_all()
+
+    def idle(self) -> bool:
+        """True when no worker holds a frame it has yet to pass on."""
+        with self._cond:
+            return not self._busy
 
-        self.frame_count   = 0
-        self.fps           = 0.0
-        self.fps_timer     = time.time()
-        self.fps_frames    = 0
 
-        self.analysis_cache: dict = {}
-        self.prev_locations: list = []
+# ── Main App ──────────────────────────────────────────────────────────────────
+class FaceEmotionApp:
+    def __init__(self, sources: list | None = None, detector: str = DETECTOR_BACKEND,
+                 detect_workers: int = DETECT_WORKERS, profile_hz: float = METRICS_PROFILE_HZ):
+        try:
+            self.db            = FaceDatabase()
+            self.logger        = AttendanceLogger()
+            self.writer        = ImageWriter()
+            self.alerter       = EmailAlerter()
+            self.unknowns      = UnknownClusters()
+            self.rollup        = EmotionRollup(self.logger.store)
+            self.live_data     = LiveDataWriter(self.rollup)
+            self.analyzer      = BatchAttributeAnalyzer()
+            self.overlay       = OverlayRenderer()
+            self.metrics       = MetricsPublisher(METRICS, profile_hz)
+            SCREENSHOTS_DIR.mkdir(exist_ok=True)
+
+            self.show_emotion    = True
+            self.show_age_gender = True
+            self.show_pipeline   = False
+            self.logging_active  = True
+
+            self.fps           = 0.0
+            self.fps_timer     = time.time()
+            self.fps_frames    = 0
+
+            # Keyed by (camera name, track id)
+            self.analysis_cache:   dict = {}
+            self.pending_analysis: dict = {}   # face key -> time the job was queued
+            self.scheduler = AnalysisScheduler()
+            self.cache_lock             = threading.Lock()
+
+            # capture (one thread per camera) -> shared detect workers -> render,
+            # with detect also feeding analyze on the side so a slow DeepFace call
+            # never holds up the displayed frame.
+            self.stages    = {n: StageStats(n) for n in ("capture", "detect", "analyze", "render")}
+            self.cameras   = [CameraSource(spec, name, self.db, self.stages["detect"])
+                              for name, spec in (CameraSource.parse(sp, i) for i, sp in enumerate(sources or ["0"]))]
+            self.by_name   = {cam.name: cam for cam in self.cameras}
+            self.fair      = FairScheduler(self.cameras)
+            self.detector_name  = detector
+            self.detect_workers = max(1, detect_workers)
+            self.analyze_q = DropQueue(ANALYZE_QUEUE_SIZE, self.stages["analyze"])
+            render_size    = RENDER_QUEUE_SIZE * len(self.cameras)
+            self.render_q  = DropQueue(render_size, self.stages["render"], on_drop=self._release_frame)
+            # Frames held at once per camera: both queues, one per busy stage, one being decoded
+            for cam in self.cameras:
+                cam.ring_slots = max(FRAME_RING_SLOTS, DETECT_QUEUE_SIZE + render_size + 4)
+            self.running     = threading.Event()
+            self.last_camera = self.cameras[0]
+            self.timers      = {s: METRICS.histogram("facecv_step_ms", "Wall time per call of one processing step", step=s)
+                                for s in ("attributes", "overlay", "publish", "imshow")}
+            self.attr_calls  = METRICS.counter("facecv_model_calls_total", model="attributes")
+            self._register_metrics()
+        except BaseException:
+            self.close()   # Undo the threads and shared memory built so far
+            raise
 
         status = "ENABLED" if EMAIL_ENABLED else "DISABLED (set EMAIL_ENABLED=True in config)"
         print(f" Email alerts: {status}")
-        print(f" Dashboard data: {LIVE_DATA_FILE}")
-
-    def _face_id(self, loc) -> int:
-        top, right, bottom, left = loc
-        cx, cy = (left+right)//2, (top+bottom)//2
-        for i, (_, fy, fx) in enumerate(self.prev_locations):
-            if abs(cx-fx) < 80 and abs(cy-fy) < 80:
-                return i
-        return len(self.prev_locations)
+        print(f" Dashboard data: shared memory '{LIVE_STATS_NAME}' ({LIVE_PUBLISH_HZ}/s)")
+        print(f" Metrics: shared memory '{METRICS_NAME}' (dashboard /metrics)"
+              + (f", profiling at {profile_hz:g} Hz" if profile_hz else ""))
+
+    def _register_metrics(self):
+        """Gauges and counters read at publish time from state the pipeline already keeps."""
+        depths = {"analyze": self.analyze_q.qsize, "render": self.render_q.qsize, "io": self.writer.depth,
+                  "events": self.logger.store.queue.qsize, "alerts": lambda: len(self.alerter.items)}
+        for stage, depth in depths.items():
+            METRICS.callback("facecv_queue_depth", depth, "Items waiting per stage", stage=stage)
+        for cam in self.cameras:
+            METRICS.callback("facecv_queue_depth", cam.queue.qsize, stage=f"detect:{cam.name}")
+            st = cam.proc.identity_stats
+            METRICS.callback("facecv_cache_total", lambda st=st: st["skipped"], "Cache lookups by result",
+                             kind="counter", cache="identity", camera=cam.name, result="hit")
+            METRICS.callback("facecv_cache_total", lambda st=st: st["encoded"], kind="counter",
+                             cache="identity", camera=cam.name, result="miss")
+            METRICS.callback("facecv_model_calls_avoided_total", lambda st=st: st["avoided"],
+                             "Model calls skipped for lack of a fresh good shot", kind="counter",
+                             model="encoding", camera=cam.name)
+        METRICS.callback("facecv_model_calls_avoided_total", lambda: self.scheduler.avoided, kind="counter",
+                         model="attributes")
+        METRICS.callback("facecv_cache_total", lambda: self.overlay.hits, kind="counter",
+                         cache="sprites", result="hit")
+        METRICS.callback("facecv_cache_total", lambda: self.overlay.misses, kind="counter",
+                         cache="sprites", result="miss")
+        METRICS.callback("facecv_fps", lambda: self.fps, "Rendered frames per second")
+        METRICS.callback("facecv_unknown_clusters", lambda: len(self.unknowns.clusters),
+                         "Unknown-face clusters on file")
+
+    def _release_frame(self, packet: dict):
+        self.by_name[packet["camera"]].release(packet)
+
+    def pipeline_stats(self) -> dict:
+        """Per-stage queue depth, latency and drop counts."""
+        depths = {"capture": 0, "detect": sum(c.queue.qsize() for c in self.cameras),
+                  "analyze": self.analyze_q.qsize(), "render": self.render_q.qsize()}
+        stats  = {name: st.snapshot(depths[name]) for name, st in self.stages.items()}
+        stats["analyze"]["scheduler"] = self.scheduler.report()
+        stats["io"]     = self.writer.report()
+        stats["events"] = self.logger.store.stats.snapshot(self.logger.store.queue.qsize())
+        stats["alerts"] = self.alerter.report()
+        return stats
+
+    def camera_stats(self) -> dict:
+        """Per-camera capture/processed FPS, drops and detection plan."""
+        return {cam.name: cam.report() for cam in self.cameras}
+
+    def identity_report(self) -> dict:
+        """Identity-cache savings summed over all cameras."""
+        reports = [cam.proc.identity_report() for cam in self.cameras]
+        encoded = sum(r["encoded"] for r in reports)
+        skipped = sum(r["skipped"] for r in reports)
+        return {"encoded": encoded, "skipped": skipped,
+                "skipped_pct": round(100 * skipped / (encoded + skipped), 1) if encoded + skipped else 0.0,
+                "saved_ms":    sum(r["saved_ms"] for r in reports),
+                "quality":     self.quality_report(reports)}
+
+    def quality_report(self, reports: list | None = None) -> dict:
+        """Crops rejected by the quality gate, and model calls it avoided (embedding + attributes)."""
+        reports  = reports or [cam.proc.identity_report() for cam in self.cameras]
+        sched    = self.scheduler.report()
+        scored   = sum(r["scored"] for r in reports)
+        rejected = sum(r["rejected"] for r in reports)
+        avoided  = sum(r["avoided"] for r in reports) + sched["avoided"]
+        made     = sum(r["encoded"] for r in reports) + sched["analysed"]
+        return {"scored": scored, "rejected_pct": round(100 * rejected / scored, 1) if scored else 0.0,
+                "avoided": avoided, "avoided_pct": round(100 * avoided / (avoided + made), 1) if avoided + made else 0.0}
+
+    # ── Stage workers ─────────────────────────────────────────────────────
+    def _capture_loop(self, cam: CameraSource):
+        interval = cam.frame_interval()
+        next_t = time.time()
+        while self.running.is_set():
+            t0 = time.time()
+            ret, seq = cam.grab()
+            if not ret:
+                if cam.reconnect():
+                    continue
+                break
+            cam.capture_rate.tick()
+            self.stages["capture"].record(time.time() - t0)
+            if seq is None:
+                cam.stats.drop()   # Every slot still held downstream
+            else:
+                cam.queue.put({"seq": seq, "camera": cam.name, "frame": cam.ring.get(seq), "t_capture": t0})
+                self.fair.notify()
+            if interval:
+                next_t = max(next_t + interval, time.time() - interval)
+                time.sleep(max(0.0, next_t - time.time()))
+        cam.finished = True
+        cam.cap.release()
+
+    def _detect_loop(self):
+        detector = build_detector(self.detector_name)   # One instance per worker thread
+        while self.running.is_set():
+            cam, packet = self.fair.acquire()
+            if cam is None:
+                continue
+            try:
+                t0     = time.time()
+                frame  = packet["frame"]
+                tracks = cam.proc.process(frame, t0, detector)
+                self._forget_tracks(cam.name, cam.proc.tracker.pop_evicted())
+                for track in tracks:
+                    if track.name == "Unknown" and track.t_verified == t0:   # Encoded this frame
+                        self._observe_unknown(cam, track, t0)
+
+                faces, shots, candidates = [], {}, []
+                for track in tracks:
+                    top, right, bottom, left = loc = track.loc(t0)
+                    key  = (cam.name, track.id)
+                    shot = track.best_shot(t0)
+                    if shot is not None and not shot.get("analysed"):
+                        shots[key] = shot
+                    faces.append({"loc": loc, "face_id": key, "name": track.name, "conf": track.conf,
+                                  "cluster": track.cluster if track.name == "Unknown" else None})
+                    candidates.append({"key": key, "width": right - left,
+                                       "quality": shots[key]["score"] if key in shots else 0.0})
+
+                with self.cache_lock:
+                    chosen = self.scheduler.select(cam.name, candidates, self.analysis_cache,
+                                                   self.pending_analysis, t0)
+                jobs = []
+                for key in chosen:
+                    # Best shots are private copies, safe to hand to the analysis thread
+                    shots[key]["analysed"] = True
+                    jobs.append((key, shots[key]["crop"]))
+            except Exception as e:
+                # One bad frame must not take the worker (and its frame slot) down with it
+                print(f" Detection failed on {cam.name}: {e!r}")
+                self.stages["detect"].error()
+                cam.stats.error()
+                self._release_frame(packet)
+                continue
+            else:
+                if jobs:
+                    with self.cache_lock:
+                        for face_id, _ in jobs:
+                            self.pending_analysis[face_id] = t0
+                    self.analyze_q.put({"seq": packet["seq"], "jobs": jobs})
+
+                packet["faces"] = faces
+                elapsed = time.time() - t0
+                cam.stats.record(elapsed)
+                cam.process_rate.tick()
+                self.stages["detect"].record(elapsed)
+                self.render_q.put(packet)
+            finally:
+                # Only once the packet is queued: the camera's next frame must land behind it
+                self.fair.release(cam)
+
+    def _observe_unknown(self, cam: CameraSource, track: Track, now: float):
+        """Fold an unknown track's fresh encoding into its cluster; save the shot / alert as due."""
+        shot = track.shot
+        cluster, new_best, alert = self.unknowns.observe(track.embedding, shot["score"], now, track.cluster)
+        track.cluster = cid = cluster["id"]
+        image = Path(cluster["image"])
+        if alert and not new_best and image.exists():
+            self.alerter.send_alert(cid, image, cam.name)
+        elif new_best or alert:
+            # One JPEG per cluster, overwritten by better shots; the alert goes out once it is
+            # on disk, or without a snapshot if the write failed (the cluster is already marked alerted)
+            done = (lambda path, err: self.alerter.send_alert(cid, path, cam.name)) if alert else None
+            self.writer.save(shot["crop"], image, key=f"unknown_{cid}", droppable=not alert, done=done)
+        self.unknowns.save()
+
+    def _forget_tracks(self, camera: str, track_ids: list):
+        """Drop cached attributes of evicted tracks so the cache stays bounded."""
+        if not track_ids:
+            return
+        with self.cache_lock:
+            for tid in track_ids:
+                self.analysis_cache.pop((camera, tid), None)
+                self.pending_analysis.pop((camera, tid), None)
+
+    def _analyze_loop(self):
+        while self.running.is_set():
+            batch = self.analyze_q.get()
+            if batch is None:
+                continue
+            t0 = time.time()
+
+            # Gather crops from frames that arrive within the batch window;
+            # the newest crop of each face wins.
+            jobs     = dict(batch["jobs"])
+            deadline = t0 + ANALYSIS_BATCH_MS / 1000
+            while len(jobs) < ANALYSIS_MAX_BATCH:
+                remaining = deadline - time.time()
+                more = self.analyze_q.get(timeout=remaining) if remaining > 0 else None
+                if more is None:
+                    break
+                jobs.update(more["jobs"])
+
+            face_ids = list(jobs)[:ANALYSIS_MAX_BATCH]
+            t_model  = time.time()
+            results  = self.analyzer.analyze([jobs[i] for i in face_ids])
+            model_ms = (time.time() - t_model) * 1000
+            self.scheduler.record(model_ms, len(face_ids))
+            self.timers["attributes"].observe(model_ms)
+            self.attr_calls.inc(len(face_ids))
+            with self.cache_lock:
+                for face_id, info in zip(face_ids, results):
+                    camera, tid = face_id
+                    if tid not in self.by_name[camera].proc.tracker.tracks:
+                        continue   # Evicted while being analysed
+                    if info is not None:
+                        self.analysis_cache[face_id] = fuse_attributes(self.analysis_cache.get(face_id),
+                                                                       info, time.time())
+                    elif face_id not in self.analysis_cache:
+                        self.analysis_cache[face_id] = {
+                            "emotion":"neutral","emotion_scores":{},"age":"?","gender":"?",
+                            "failed_t": time.time(),
+                        }
+                for face_id in jobs:
+                    self.pending_analysis.pop(face_id, None)
+            self.stages["analyze"].record(time.time() - t0)
+
+    # ── Render stage (main thread, since cv2.imshow must run there) ────────
+    def _render(self, packet: dict):
+        t0    = time.time()
+        frame = packet["frame"]
+        faces = packet["faces"]
+        cam   = self.by_name[packet["camera"]]
+        cam.active_faces = len(faces)
+        frame_data = []   # Collect per-face info for live_data
+        overlay    = []   # ... and what to draw for it
+
+        for face in faces:
+            top, right, bottom, left = face["loc"]
+            name, conf = face["name"], face["conf"]
+
+            with self.cache_lock:
+                info = self.analysis_cache.get(face["face_id"], {})
+            emotion = info.get("emotion", "neutral")
+            scores  = info.get("emotion_scores", {})
+            age     = info.get("age", "?")
+            gender  = info.get("gender", "?")
+
+            frame_data.append({"name": name, "emotion": emotion, "age": age, "gender": gender,
+                               "cluster": face["cluster"]})
+
+            if self.logging_active:
+                self.logger.log(name, emotion, age, gender, cam.name)
+                self.logger.sighting(cam.name, face["face_id"][1], name, conf, emotion, age, gender)
+            # Emotion dwell time is dashboard data, not attendance: kept even while logging is off
+            self.rollup.observe(cam.name, face["face_id"][1], name, emotion, t0)
+
+            overlay.append({"loc": face["loc"], "name": name, "conf": conf, "emotion": emotion,
+                            "emotion_scores": scores, "age": age, "gender": gender,
+                            "cluster": face["cluster"]})
+
+        with self.timers["overlay"].time():
+            self.overlay.draw_faces(frame, overlay, self.show_emotion, self.show_age_gender)
+
+        # ── FPS ───────────────────────────────────────────────────────
+        self.fps_frames += 1
+        now = time.time()
+        if now - self.fps_timer >= 1.0:
+            self.fps       = self.fps_frames / (now - self.fps_timer + 1e-9)
+            self.fps_timer  = now
+            self.fps_frames = 0
+
+        # Update live data for dashboard
+        with self.timers["publish"].time():
+            self.live_data.update(frame_data, self.fps, lambda: {
+                "pipeline": self.pipeline_stats(), "identity": self.identity_report(),
+                "cameras":  self.camera_stats()})
+
+        # ── HUD ───────────────────────────────────────────────────────
+        cam_stats = cam.report()
+        hud = [f"FPS: {cam_stats['fps']:.1f}", f"Faces: {len(faces)}",
+               f"Known: {len(self.db.names)}", f"Log: {'ON' if self.logging_active else 'OFF'}",
+               f"Email: {'ON' if EMAIL_ENABLED else 'OFF'}"]
+        if self.show_pipeline:
+            pipeline, identity = self.pipeline_stats(), self.identity_report()
+            hud += [f"{n[:7]:7s} q{st['queue']} {st['latency_ms']:5.0f}ms d{st['dropped']}"
+                    for n, st in pipeline.items()]
+            plan = cam_stats["scheduler"]
+            hud.append(f"{cam.name[:8]} in {cam_stats['capture_fps']:.0f}fps d{cam_stats['dropped']}")
+            hud.append(f"Det {plan['mode']} x{plan['scale']:.2f} ({plan['regions']})")
+            hud.append(f"Enc skip {identity['skipped_pct']:.0f}% ~{identity['saved_ms']/1000:.0f}s")
+            hud.append(f"Quality rej {identity['quality']['rejected_pct']:.0f}% "
+                       f"avoid {identity['quality']['avoided_pct']:.0f}%")
+            sched = pipeline["analyze"]["scheduler"]
+            hud.append(f"Attr {sched['per_frame']:.2f}/f {sched['cost_ms']:.0f}ms age {sched['mean_age_s']:.1f}s")
+            sprites = self.overlay.report()
+            hud.append(f"Overlay {sprites['sprites']} sprites {sprites['hit_pct']:.0f}% hit")
+        hud_w = 250 if self.show_pipeline else 165
+        self.overlay.draw_hud(frame, [(line, (0,230,120) if "ON" in line else (180,180,180)) for line in hud], hud_w)
+        self.overlay.draw_hint(frame, "[R] Register  [S] Screenshot  [A] Attendance  [E] Emotion  "
+                                      "[G] Age/Gender  [P] Pipeline  [Q] Quit")
+
+        title = "Face Recognition & Emotion Detection v2"
+        with self.timers["imshow"].time():
+            cv2.imshow(title if len(self.cameras) == 1 else f"{title} — {cam.name}", frame)
+        self.last_camera = cam
+        self.stages["render"].record(time.time() - t0)
+
+    def _handle_key(self, key: int, frame) -> bool:
+        """Returns False when the user asked to quit."""
+        if key == ord("q"):
+            return False
+        elif key == ord("r"):
+            print("\n REGISTER NEW FACE")
+            name_in = input("  Enter name: ").strip()
+            snap    = self.last_camera.snapshot()
+            if name_in and snap is not None:
+                self.db.register(snap, name_in)
+        elif key == ord("s") and frame is not None:
+            ts   = datetime.now().strftime("%Y%m%d_%H%M%S")
+            path = SCREENSHOTS_DIR / f"capture_{ts}.jpg"
+            self.writer.save(frame, path, droppable=False,
+                             done=lambda p, err: err is None and print(f" Screenshot: {p}"))
+        elif key == ord("a"):
+            self.logging_active = not self.logging_active
+            print(f" Attendance: {'ON' if self.logging_active else 'OFF'}")
+        elif key == ord("e"):
+            self.show_emotion = not self.show_emotion
+        elif key == ord("g"):
+            self.show_age_gender = not self.show_age_gender
+        elif key == ord("p"):
+            self.show_pipeline = not self.show_pipeline
+        return True
 
     def run(self):
-        cap = cv2.VideoCapture(0)
-        if not cap.isOpened():
-            print(" Cannot open webcam.")
-            return
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH,  1280)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-        print(" Camera ready!")
-        print("  [R] Register  [S] Screenshot  [A] Attendance  [E] Emotion  [G] Age/Gender  [Q] Quit\n")
+        workers = []
+        shown   = None   # Last displayed packet; its slot is held for [S] until the next one
+        try:
+            for cam in self.cameras:
+                if not cam.open():
+                    print(f" Cannot open {cam.name} ({cam.spec}).")
+                    return
+                print(f" {cam.name} ready: {cam.spec}")
+            print("  [R] Register  [S] Screenshot  [A] Attendance  [E] Emotion  [G] Age/Gender  [P] Pipeline  [Q] Quit\n")
+
+            self.running.set()
+            self.metrics.start()
+            workers  = [threading.Thread(target=self._capture_loop, args=(cam,), name=f"capture-{cam.name}",
+                                         daemon=True) for cam in self.cameras]
+            workers += [threading.Thread(target=self._detect_loop, name=f"detect-{i}", daemon=True)
+                        for i in range(self.detect_workers)]
+            workers += [threading.Thread(target=self._analyze_loop, name="analyze", daemon=True)]
+            for w in workers:
+                w.start()
+
+            while self.running.is_set():
+                packet = self.render_q.get(timeout=0.02)
+                if packet is not None:
+                    self._render(packet)
+                    if shown is not None:
+                        self._release_frame(shown)
+                    shown = packet
+                elif (all(c.finished and not c.queue.qsize() for c in self.cameras)
+                      and self.fair.idle() and not self.render_q.qsize()):
+                    break   # Every source ended and everything was shown (idle first: workers queue, then release)
+                key = cv2.waitKey(1) & 0xFF
+                if not self._handle_key(key, shown["frame"] if shown else None):
+                    break
+        finally:
+            self.running.clear()
+            for w in workers:
+                w.join(timeout=2.0)
+            cv2.destroyAllWindows()
+            shown = packet = None
+            self.close()
+        print("\n Session ended.")
 
-        while True:
+    def close(self):
+        """Releases the sources and shared memory and flushes every writer.
+
+        Also safe on an app whose __init__ failed part way: only what was
+        built gets closed.
+        """
+        for cam in getattr(self, "cameras", ()):
+            if cam.cap is not None:
+                cam.cap.release()
+            if cam.ring is not None:
+                cam.ring.close()
+        steps = (("live_data", LiveDataWriter.close),
+                 ("metrics",   MetricsPublisher.close),
+                 ("rollup",    EmotionRollup.flush),
+                 ("logger",    AttendanceLogger.close),
+                 ("unknowns",  lambda u: u.save(force=True)),
+                 ("writer",    ImageWriter.close),     # Before the alerter: finished snapshots queue their alerts
+                 ("alerter",   EmailAlerter.close))
+        for name, step in steps:
+            if hasattr(self, name):
+                step(getattr(self, name))
+
+
+# ── Offline Batch Mode ────────────────────────────────────────────────────────
+BATCH_COLUMNS = ["source", "segment", "frame", "time_s", "track_id", "top", "right", "bottom", "left",
+                 "name", "conf", "emotion", "age", "gender"]
+
+_batch_state: dict = {}   # Per worker process: database, detector, analyzer
+
+
+def plan_segments(inputs: list, segment_frames: int = BATCH_SEGMENT_FRAMES) -> list:
+    """Split video files and image folders into independent frame ranges."""
+    segments = []
+    for inp in inputs:
+        path = Path(inp)
+        if path.is_dir():
+            files = sorted(str(f) for f in path.iterdir() if f.suffix.lower() in IMAGE_EXTS)
+            for start in range(0, len(files), segment_frames):
+                segments.append({"kind": "images", "source": str(path), "start": start,
+                                 "files": files[start:start+segment_frames], "fps": BATCH_IMAGE_FPS})
+            continue
+        cap = cv2.VideoCapture(str(path))
+        if not cap.isOpened():
+            print(f" Skipping {path}: cannot open")
+            continue
+        total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        fps   = cap.get(cv2.CAP_PROP_FPS) or 25.0
+        cap.release()
+        if total <= 0:   # Unknown length (some containers): one sequential segment
+            segments.append({"kind": "video", "source": str(path), "start": 0, "end": 1 << 62, "fps": fps})
+        for start in range(0, max(total, 0), segment_frames):
+            segments.append({"kind": "video", "source": str(path), "start": start,
+                             "end": min(total, start+segment_frames), "fps": fps})
+    for i, seg in enumerate(segments):
+        seg["index"] = i
+    return segments
+
+
+def _batch_init(detector: str, attributes: bool, detect_every: int, pooled: bool = False):
+    """Pool initializer: one database, detector and model set per worker process."""
+    if pooled:
+        cv2.setNumThreads(1)   # Parallelism comes from the processes
+    _batch_state["db"]           = FaceDatabase(workers=1)
+    _batch_state["detector"]     = build_detector(detector)
+    _batch_state["analyzer"]     = BatchAttributeAnalyzer() if attributes else None
+    _batch_state["detect_every"] = detect_every
+
+
+def _segment_frames(segment: dict):
+    """Yields (frame index, BGR frame) for one segment."""
+    if segment["kind"] == "images":
+        for idx, f in enumerate(segment["files"], segment["start"]):
+            frame = cv2.imread(f)
+            if frame is not None:
+                yield idx, frame
+        return
+    cap = cv2.VideoCapture(segment["source"])
+    cap.set(cv2.CAP_PROP_POS_FRAMES, segment["start"])
+    try:
+        for idx in range(segment["start"], segment["end"]):
             ret, frame = cap.read()
             if not ret:
                 break
+            yield idx, frame
+    finally:
+        cap.release()
 
-            self.frame_count  += 1
-            self.fps_frames   += 1
-            rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-
-            # ── Face detection ───────────────────────────────────────────
-            small     = cv2.resize(rgb, (0,0), fx=0.5, fy=0.5)
-            face_locs = face_recognition.face_locations(small, model="hog")
-            face_locs = [(t*2,r*2,b*2,l*2) for t,r,b,l in face_locs]
-            face_encs = face_recognition.face_encodings(rgb, face_locs)
-
-            new_prev   = []
-            frame_data = []   # Collect per-face info for live_data
-
-            for loc, enc in zip(face_locs, face_encs):
-                top, right, bottom, left = loc
-                face_id = self._face_id(loc)
-                cx, cy  = (left+right)//2, (top+bottom)//2
-                new_prev.append((loc, cy, cx))
-
-                # Identity
-                name, conf = self.db.identify(enc)
-
-                # Email alert for unknowns
-                if name == "Unknown":
-                    self.alerter.send_alert(frame)
-
-                # DeepFace every N frames
-                if self.frame_count % ANALYSIS_EVERY_N == 0 or face_id not in self.analysis_cache:
-                    try:
-                        crop = frame[max(0,top-20):bottom+20, max(0,left-20):right+20]
-                        if crop.size > 0:
-                            r = DeepFace.analyze(crop, actions=["emotion","age","gender"],
-                                                 enforce_detection=False, silent=True)[0]
-                            self.analysis_cache[face_id] = {
-                                "emotion":        r["dominant_emotion"],
-                                "emotion_scores": r["emotion"],
-                                "age":            str(r["age"]),
-                                "gender":         r["dominant_gender"],
-                            }
-                    except Exception:
-                        if face_id not in self.analysis_cache:
-                            self.analysis_cache[face_id] = {
-                                "emotion":"neutral","emotion_scores":{},"age":"?","gender":"?"
-                            }
-
-                info    = self.analysis_cache.get(face_id, {})
-                emotion = info.get("emotion", "neutral")
-                scores  = info.get("emotion_scores", {})
-                age     = info.get("age", "?")
-                gender  = info.get("gender", "?")
-
-                frame_data.append({"name": name, "emotion": emotion, "age": age, "gender": gender})
-
-                if self.logging_active:
-                    self.logger.log(name, emotion, age, gender)
-
-                # ── Draw ─────────────────────────────────────────────────
-                color = EMOTION_COLORS.get(emotion, (180,180,180))
-                draw_rounded_rect(frame, left, top, right, bottom, color, 2)
-
-                # Corner accents
-                for ax, ay, dx, dy in [(left,top,1,1),(right,top,-1,1),(left,bottom,1,-1),(right,bottom,-1,-1)]:
-                    cv2.line(frame, (ax,ay), (ax+dx*20, ay),    color, 3)
-                    cv2.line(frame, (ax,ay), (ax, ay+dy*20),    color, 3)
-
-                # Name banner
-                by = max(0, top-32)
-                label = f"{name}  {conf*100:.0f}%" if name != "Unknown" else "⚠ Unknown"
-                (tw,th),_ = cv2.getTextSize(label, cv2.FONT_HERSHEY_SIMPLEX, 0.6, 1)
-                banner_color = color if name != "Unknown" else (30,30,200)
-                draw_filled_rect(frame, left, by, left+tw+12, by+th+10, banner_color, 0.75)
-                text(frame, label, (left+6, by+th+2), scale=0.6, color=(255,255,255))
-
-                # Emotion bars
-                if self.show_emotion and scores:
-                    for ei, (emo, sc) in enumerate(sorted(scores.items(), key=lambda x:-x[1])[:5]):
-                        draw_emotion_bar(frame, right+10, top+ei*18, emo, sc/100)
-
-                # Age/gender
-                if self.show_age_gender:
-                    gy = top + (5*18 if self.show_emotion else 0) + 8
-                    text(frame, f"Age: {age}",    (right+10, gy),    scale=0.5)
-                    text(frame, f"Sex: {gender}", (right+10, gy+18), scale=0.5)
-
-            self.prev_locations = new_prev
-
-            # ── FPS ───────────────────────────────────────────────────────
-            now = time.time()
-            if now - self.fps_timer >= 1.0:
-                self.fps       = self.fps_frames / (now - self.fps_timer + 1e-9)
-                self.fps_timer  = now
-                self.fps_frames = 0
-
-            # Update live data for dashboard
-            self.live_data.update(frame_data, self.fps)
-
-            # ── HUD ───────────────────────────────────────────────────────
-            hud = [f"FPS: {self.fps:.1f}", f"Faces: {len(face_locs)}",
-                   f"Known: {len(self.db.names)}", f"Log: {'ON' if self.logging_active else 'OFF'}",
-                   f"Email: {'ON' if EMAIL_ENABLED else 'OFF'}"]
-            draw_filled_rect(frame, 8, 8, 165, 8+len(hud)*22, (20,20,20), 0.65)
-            for i, line in enumerate(hud):
-                color = (0,230,120) if "ON" in line else (180,180,180)
-                text(frame, line, (14, 26+i*22), scale=0.52, color=color)
-
-            h, w = frame.shape[:2]
-            hint = "[R] Register  [S] Screenshot  [A] Attendance  [E] Emotion  [G] Age/Gender  [Q] Quit"
-            draw_filled_rect(frame, 0, h-28, w, h, (10,10,10), 0.7)
-            text(frame, hint, (10, h-10), scale=0.42, color=(160,160,160))
-
-            cv2.imshow("Face Recognition & Emotion Detection v2", frame)
-            key = cv2.waitKey(1) & 0xFF
-
-            if key == ord("q"):
-                break
-            elif key == ord("r"):
-                print("\n REGISTER NEW FACE")
-                name_in = input("  Enter name: ").strip()
-                if name_in:
-                    ret2, snap = cap.read()
-                    if ret2:
-                        self.db.register(snap, name_in)
-            elif key == ord("s"):
-                ts   = datetime.now().strftime("%Y%m%d_%H%M%S")
-                path = SCREENSHOTS_DIR / f"capture_{ts}.jpg"
-                cv2.imwrite(str(path), frame)
-                print(f" Screenshot: {path}")
-            elif key == ord("a"):
-                self.logging_active = not self.logging_active
-                print(f" Attendance: {'ON' if self.logging_active else 'OFF'}")
-            elif key == ord("e"):
-                self.show_emotion = not self.show_emotion
-            elif key == ord("g"):
-                self.show_age_gender = not self.show_age_gender
 
-        cap.release()
-        cv2.destroyAllWindows()
-        print("\n Session ended.")
+def _batch_segment(segment: dict) -> dict:
+    """Process one segment headlessly; returns its detection rows as columns."""
+    st     = _batch_state
+    video  = segment["kind"] == "video"
+    proc   = FrameProcessor(st["db"], st["detector"], st["detect_every"]) if video else None
+    every  = BATCH_ANALYSIS_EVERY if video else 1
+    cols   = {c: [] for c in BATCH_COLUMNS}
+    attrs  = {}   # track id -> fused attribute estimate
+    first  = segment["index"] * BATCH_TRACK_ID_SPAN   # Added to tracker ids in the output
+    t0, frames = time.time(), 0
+
+    for idx, frame in _segment_frames(segment):
+        now    = idx / segment["fps"]
+        if not video:
+            # Image folders are not continuous footage: each image gets its own
+            # tracker, so no face inherits a track (and its identity) from the last
+            proc  = FrameProcessor(st["db"], st["detector"], 1)
+            attrs = {}
+        tracks = proc.process(frame, now)
+        frames += 1
+        for tid in proc.tracker.pop_evicted():
+            attrs.pop(tid, None)
+
+        locs = {t.id: t.loc(now) for t in tracks}
+        if st["analyzer"] is not None:
+            ids, crops = [], []
+            for t in tracks:
+                if t.id in attrs and idx % every:
+                    continue
+                shot = t.best_shot(now)
+                if shot is not None and not shot.get("analysed"):
+                    shot["analysed"] = True
+                    ids.append(t.id)
+                    crops.append(shot["crop"])
+            for tid, info in zip(ids, st["analyzer"].analyze(crops)):
+                if info is not None:
+                    attrs[tid] = fuse_attributes(attrs.get(tid), info, now) if video else info
+
+        for t in tracks:
+            top, right, bottom, left = locs[t.id]
+            info = attrs.get(t.id, {})
+            for col, val in zip(BATCH_COLUMNS, (segment["source"], segment["index"], idx, round(now, 3),
+                                                first + t.id,
+                                                top, right, bottom, left, t.name, round(t.conf, 3),
+                                                info.get("emotion", ""), info.get("age", ""),
+                                                info.get("gender", ""))):
+                cols[col].append(val)
+        if not video:
+            first += max((t.id for t in tracks), default=0)   # Next image's tracker restarts at 1
+    return {"columns": cols, "frames": frames, "seconds": time.time() - t0}
+
+
+def write_columns(columns: dict, out: Path) -> Path:
+    """Parquet when an engine (pyarrow/fastparquet) is installed, else CSV."""
+    df = pd.DataFrame(columns, columns=BATCH_COLUMNS)
+    if out.suffix.lower() != ".csv":
+        try:
+            df.to_parquet(out, index=False)
+            return out
+        except ImportError:
+            print(" No parquet engine (pip install pyarrow) — writing CSV instead")
+            out = out.with_suffix(".csv")
+    df.to_csv(out, index=False)
+    return out
+
+
+def run_batch(inputs: list, out: Path, workers: int = 0, detector: str = DETECTOR_BACKEND,
+              attributes: bool = True, detect_every: int = DETECT_EVERY_N,
+              segment_frames: int = BATCH_SEGMENT_FRAMES):
+    """Headless reprocessing of recorded footage; doubles as the pipeline throughput benchmark."""
+    segments = plan_segments(inputs, segment_frames)
+    if not segments:
+        print(" Nothing to process.")
+        return
+    workers = min(workers or os.cpu_count() or 1, len(segments))
+    FaceDatabase(workers=workers)   # Bring the encoding cache up to date once, before forking
+    print(f" Batch: {len(segments)} segment(s) from {len(inputs)} input(s) on {workers} worker(s)")
+
+    initargs = (detector, attributes, detect_every)
+    pool     = None
+    if workers > 1:
+        pool    = multiprocessing.Pool(workers, initializer=_batch_init, initargs=(*initargs, True))
+        results = pool.imap(_batch_segment, segments)
+    else:
+        _batch_init(*initargs)
+        results = map(_batch_segment, segments)
+
+    columns = {c: [] for c in BATCH_COLUMNS}
+    t0, frames = time.time(), 0
+    try:
+        for done, res in enumerate(results, 1):
+            for c in BATCH_COLUMNS:
+                columns[c].extend(res["columns"][c])
+            frames += res["frames"]
+            print(f"  segment {done}/{len(segments)}  {frames} frames  "
+                  f"{frames/(time.time()-t0+1e-9):.1f} frames/s", end="\r", flush=True)
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+    elapsed = time.time() - t0
+    print()
+    path    = write_columns(columns, Path(out))
+    print(f" Processed {frames} frame(s) in {elapsed:.1f}s — {frames/(elapsed+1e-9):.1f} frames/s, "
+          f"{len(columns['frame'])} face row(s) → {path}")
 
 
 if __name__ == "__main__":
+    ap = argparse.ArgumentParser(description="Face Recognition & Emotion Detection v2")
+    ap.add_argument("--enroll", action="store_true",
+                    help="bulk-enroll known_faces/ into the encoding cache and exit")
+    ap.add_argument("--workers", type=int, default=ENROLL_WORKERS,
+                    help="processes used for enrollment and batch mode (0 = one per CPU core)")
+    ap.add_argument("--detector", choices=sorted(DETECTOR_BACKENDS), default=DETECTOR_BACKEND,
+                    help="face detector backend")
+    ap.add_argument("--export-attendance", nargs="?", const=str(ATTENDANCE_FILE), metavar="CSV",
+                    help=f"write the attendance table to CSV (default: {ATTENDANCE_FILE}) and exit")
+    ap.add_argument("--source", action="append", metavar="[NAME=]SOURCE",
+                    help="camera index, video file or stream URL; repeat for several cameras (default: 0)")
+    ap.add_argument("--detect-workers", type=int, default=DETECT_WORKERS,
+                    help="detection threads shared by all cameras")
+    ap.add_argument("--profile", type=float, nargs="?", const=100.0, default=METRICS_PROFILE_HZ, metavar="HZ",
+                    help="sample thread stacks HZ times a second (default 100) into the metrics")
+    ap.add_argument("--unknowns", action="store_true",
+                    help="list the unknown-face clusters and exit")
+    ap.add_argument("--promote", nargs=2, metavar=("CLUSTER", "NAME"),
+                    help="enrol unknown-face cluster CLUSTER as NAME and exit (run while the app is stopped)")
+    ap.add_argument("--batch", nargs="+", metavar="INPUT",
+                    help="headless: process video files / image folders instead of the webcam")
+    ap.add_argument("--out", default="detections.parquet",
+                    help="batch output (.parquet, or .csv)")
+    ap.add_argument("--no-attributes", action="store_true",
+                    help="batch: skip DeepFace emotion/age/gender")
+    ap.add_argument("--detect-every", type=int, default=DETECT_EVERY_N,
+                    help="batch: run the detector every N video frames")
+    args = ap.parse_args()
+
     print("""
 ╔══════════════════════════════════════════════════════════════╗
 ║   Face Recognition & Emotion Detection v2                   ║
 ║   Email Alerts + Dashboard Integration                       ║
 ╚══════════════════════════════════════════════════════════════╝
 """)
-    FaceEmotionApp().run()
+    if args.export_attendance:
+        store = EventStore()
+        count = store.export_csv(Path(args.export_attendance))
+        store.close()
+        print(f" Exported {count} attendance rows to {args.export_attendance}")
+    elif args.enroll:
+        FaceDatabase(workers=args.workers)
+    elif args.unknowns:
+        for c in UnknownClusters().summary():
+            print(f" #{c['id']:<5} seen {c['sightings']:>4}x  last {datetime.fromtimestamp(c['last_seen']):%Y-%m-%d %H:%M}"
+                  f"  {'alerted' if c['alerted'] else '':8} {c['image']}")
+    elif args.promote:
+        UnknownClusters().promote(int(args.promote[0]), args.promote[1], FaceDatabase(workers=args.workers))
+    elif args.batch:
+        run_batch(args.batch, Path(args.out), workers=args.workers, detector=args.detector,
+                  attributes=not args.no_attributes, detect_every=args.detect_every)
+    else:
+        FaceEmotionApp(sources=args.source, detector=args.detector,
+                       detect_workers=args.detect_workers, profile_hz=args.profile).run()